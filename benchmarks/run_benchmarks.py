@@ -0,0 +1,136 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from skedcheck import (
+    AirportRegistry, DutyTable, FAR117Calculator, RollingWindowIndex, build_duties, evaluate_days,
+    get_daily_remaining_range, parse_bid_dump, parse_bid_packet, parse_ical_rotations, parse_trip_dump,
+    screen_pairings
+)
+from zoneinfo import ZoneInfo
+
+from synthetic import generate_schedule
+
+# Times each stage of the schedule pipeline on synthetic schedules and appends one JSON record
+# per run to the results file, so numbers from different commits can be compared.
+#
+#   python benchmarks/run_benchmarks.py                 # 100, 1k and 10k legs
+#   python benchmarks/run_benchmarks.py --sizes 1000 --years 2 --repeat 5
+DEFAULT_SIZES = [100, 1000, 10000]
+GRID_DAYS = 84
+RESULTS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results.jsonl')
+
+def time_stage(fn, repeat):
+    timings = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        timings.append(time.perf_counter() - start)
+    return result, {'min_s': min(timings), 'median_s': statistics.median(timings), 'repeat': repeat}
+
+def feed_calculator(processed_duties, airports_tz):
+    calc = FAR117Calculator(airports_tz)
+    for duty in processed_duties:
+        if duty['type'] == 'flight':
+            calc.add_flight_duty(duty['report_utc'], duty['release_utc'], duty['flights'])
+        else:
+            calc.add_generic_duty(duty['report_utc'], duty['release_utc'])
+    return calc
+
+def run_size(n_legs, years, seed, repeat):
+    sched = generate_schedule(n_legs, years=years, seed=seed)
+    airports_tz = sched['airports_tz']
+    base_tz = ZoneInfo(sched['base_tz'])
+    days = [sched['start'] + timedelta(days=i) for i in range((sched['end'] - sched['start']).days + 1)]
+    stages = {}
+    state = {}
+
+    def record(name, fn, items):
+        try:
+            state[name], stats = time_stage(fn, repeat)
+            stats['items'] = items
+        except Exception as e:
+            stats = {'error': f"{type(e).__name__}: {e}"}
+        stages[name] = stats
+
+    record('parse_trip_dump', lambda: [parse_trip_dump(text, eff) for text, eff in sched['trip_dumps']], len(sched['trip_dumps']))
+    record('parse_bid_dump', lambda: [parse_bid_dump(text, start) for text, start in sched['bid_dumps']], len(sched['bid_dumps']))
+    record('parse_bid_packet', lambda: parse_bid_packet(sched['bid_packet'], sched['start']), len(sched['bid_dumps']))
+    record('parse_ical', lambda: parse_ical_rotations(sched['ical'], AirportRegistry(airports_tz)), sched['legs'])
+    record('build_duties', lambda: build_duties(sched['rotations'], sched['blackouts'], airports_tz, base_tz), len(sched['rotations']))
+
+    processed = state.get('build_duties', {}).get('processed_duties')
+    if processed is not None:
+        record('far117_calculator', lambda: feed_calculator(processed, airports_tz), len(processed))
+        record('window_index', lambda: RollingWindowIndex(DutyTable(processed)), len(processed))
+        index = state.get('window_index')
+        if index is not None:
+            record('evaluate_days', lambda: evaluate_days(index, days, base_tz), len(days))
+        grid = days[:GRID_DAYS]
+        record('get_daily_remaining_range', lambda: [get_daily_remaining_range(d, processed, base_tz) for d in grid], len(grid))
+        # Each rotation screened against the whole schedule (so against itself too; every check still runs).
+        if index is not None:
+            schedule = dict(state['build_duties'], window_index=index)
+            record('screen_pairings', lambda: screen_pairings(schedule, processed, airports_tz, base_tz), len(sched['rotations']))
+
+    return {
+        'target_legs': n_legs,
+        'legs': sched['legs'],
+        'rotations': len(sched['rotations']),
+        'blackouts': len(sched['blackouts']),
+        'days': len(days),
+        'stages': stages
+    }
+
+def git_commit():
+    try:
+        out = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__)))
+        return out.stdout.strip() or None
+    except OSError:
+        return None
+
+def main():
+    parser = argparse.ArgumentParser(description="Time the SkedCheck pipeline on synthetic schedules.")
+    parser.add_argument('--sizes', type=int, nargs='+', default=DEFAULT_SIZES, help="leg counts to generate")
+    parser.add_argument('--years', type=float, default=None, help="spread each schedule over this many years")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage; min and median are kept")
+    parser.add_argument('--output', default=RESULTS_FILE, help="JSON Lines file the run is appended to")
+    args = parser.parse_args()
+
+    runs = []
+    for n_legs in args.sizes:
+        run = run_size(n_legs, args.years, args.seed, args.repeat)
+        runs.append(run)
+        print(f"{run['legs']} legs, {run['rotations']} rotations, {run['blackouts']} blackouts, {run['days']} days")
+        for name, stats in run['stages'].items():
+            if 'error' in stats:
+                print(f"  {name:<26} ERROR {stats['error']}")
+            else:
+                print(f"  {name:<26} {stats['min_s'] * 1000:10.2f} ms  (median {stats['median_s'] * 1000:.2f} ms, {stats['items']} items)")
+
+    record = {
+        'timestamp': datetime.now(timezone.utc).isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'seed': args.seed,
+        'years': args.years,
+        'runs': runs
+    }
+    with open(args.output, 'a') as f:
+        f.write(json.dumps(record) + '\n')
+    print(f"Results appended to {args.output}")
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+import json
+import random
+from datetime import date, datetime, time, timedelta
+from zoneinfo import ZoneInfo
+
+from skedcheck import INITIAL_AIRPORTS
+
+# Synthetic line-holder schedules for the benchmarks: rotations out of a single base, mixed
+# domestic and international, with training, reserve and vacation blocks in between. Every
+# rotation is also rendered as a trip dump, a bid dump (alone and as part of one bid packet)
+# and iCal events so the parsers can be timed on the same data.
+AIRPORTS_TZ = dict(INITIAL_AIRPORTS)
+BASE = 'SEA'
+BASE_TZ = AIRPORTS_TZ[BASE]
+DOMESTIC = sorted(code for code, tz in AIRPORTS_TZ.items() if len(code) == 3 and code != BASE and tz.startswith('America/'))
+INTERNATIONAL = sorted(code for code, tz in AIRPORTS_TZ.items() if len(code) == 3 and tz.split('/')[0] in ('Europe', 'Asia', 'Australia'))
+MONTHS = ['JAN', 'FEB', 'MAR', 'APR', 'MAY', 'JUN', 'JUL', 'AUG', 'SEP', 'OCT', 'NOV', 'DEC']
+
+def hhmm(hours):
+    minutes = int(round(hours * 60))
+    return f"{minutes // 60}.{minutes % 60:02d}"
+
+def plan_blocks(n_legs, rng):
+    # Shape of each block (kind, length in days, legs per day) and the days off after it.
+    blocks = []
+    legs = 0
+    while legs < n_legs:
+        roll = rng.random()
+        if roll < 0.70:
+            days = rng.randint(1, 4)
+            per_day = [rng.randint(1, 4) for _ in range(days)]
+            blocks.append({'kind': 'domestic', 'days': days, 'legs': per_day})
+            legs += sum(per_day)
+        elif roll < 0.85:
+            blocks.append({'kind': 'international', 'days': 3, 'legs': [1, 0, 1]})
+            legs += 2
+        elif roll < 0.92:
+            blocks.append({'kind': 'reserve', 'days': rng.randint(2, 4)})
+        elif roll < 0.97:
+            blocks.append({'kind': 'training', 'days': rng.randint(1, 3)})
+        else:
+            blocks.append({'kind': 'vacation', 'days': 7})
+        blocks[-1]['gap'] = rng.randint(1, 3)
+    return blocks
+
+def place_blocks(blocks, start, years):
+    # Stretches the days off so the schedule spans `years` when given; otherwise blocks follow
+    # each other with their natural gaps.
+    used = sum(b['days'] + b['gap'] for b in blocks)
+    slack = max(0, int(years * 365) - used) if years else 0
+    current = start
+    for i, b in enumerate(blocks):
+        b['start'] = current
+        extra = (i + 1) * slack // len(blocks) - i * slack // len(blocks)
+        current += timedelta(days=b['days'] + b['gap'] + extra)
+
+def make_leg(flt, dep, arr, dep_local, block, report_local=None):
+    dep_tz = ZoneInfo(AIRPORTS_TZ[dep])
+    arr_local = (dep_local.replace(tzinfo=dep_tz) + timedelta(hours=block)).astimezone(ZoneInfo(AIRPORTS_TZ[arr]))
+    return {
+        'date': dep_local.strftime('%Y-%m-%d'),
+        'dep': dep,
+        'dep_time': dep_local.strftime('%H:%M'),
+        'arr': arr,
+        'arr_time': arr_local.strftime('%H:%M'),
+        'arr_date': arr_local.strftime('%Y-%m-%d'),
+        'report_time': report_local.strftime('%H:%M') if report_local else 'MANUAL',
+        'report_date': dep_local.strftime('%Y-%m-%d'),
+        'block': round(block * 12) / 12,
+        'turn': 0.5,
+        'flt': str(flt),
+        'layover_duration': None,
+        'hotel': None
+    }
+
+def build_rotation(b, rng):
+    flights = []
+    here = BASE
+    for offset, count in enumerate(b['legs']):
+        if not count:
+            continue
+        day = b['start'] + timedelta(days=offset)
+        last_day = offset == len(b['legs']) - 1
+        if b['kind'] == 'international':
+            dep_local = datetime.combine(day, time(rng.randint(10, 15), rng.choice([0, 15, 30, 45])))
+            block = rng.uniform(9.0, 12.0)
+        else:
+            dep_local = datetime.combine(day, time(rng.randint(5, 9), rng.choice([0, 15, 30, 45])))
+            block = rng.uniform(1.0, 4.5)
+        report_local = dep_local - timedelta(hours=1.5 if b['kind'] == 'international' else 1.0)
+
+        for n in range(count):
+            # Long days stop early; the last day still has to end at base.
+            late = dep_local >= datetime.combine(day, time(21, 0))
+            if late and not (last_day and here != BASE):
+                break
+            if (last_day and n == count - 1) or late:
+                arr = BASE
+            elif b['kind'] == 'international':
+                arr = rng.choice(INTERNATIONAL)
+            else:
+                arr = rng.choice([code for code in DOMESTIC if code != here])
+            leg = make_leg(rng.randint(1000, 9999), here, arr, dep_local, block, report_local)
+            flights.append(leg)
+            here = arr
+            if late:
+                break
+            arr_local = datetime.strptime(leg['arr_date'] + ' ' + leg['arr_time'], '%Y-%m-%d %H:%M')
+            dep_local = arr_local + timedelta(minutes=rng.randint(45, 90))
+            block = rng.uniform(1.0, 4.5)
+        if not last_day:
+            flights[-1]['layover_duration'] = hhmm(rng.uniform(10.0, 30.0))
+            flights[-1]['hotel'] = f"HOTEL {here}"
+    return flights
+
+def build_blackouts(b, block_id, first_id):
+    base_tz = ZoneInfo(BASE_TZ)
+    utc = ZoneInfo('UTC')
+    if b['kind'] == 'vacation':
+        spans = [(datetime.combine(b['start'], time.min, tzinfo=base_tz),
+                  datetime.combine(b['start'] + timedelta(days=b['days'] - 1), time.max, tzinfo=base_tz))]
+    else:
+        start_t, end_t = (time(8, 0), time(17, 0)) if b['kind'] == 'training' else (time(0, 0), time(23, 59))
+        spans = [
+            (datetime.combine(b['start'] + timedelta(days=d), start_t, tzinfo=base_tz),
+             datetime.combine(b['start'] + timedelta(days=d), end_t, tzinfo=base_tz))
+            for d in range(b['days'])
+        ]
+    return [
+        {
+            'id': first_id + i,
+            'type': b['kind'],
+            'start_datetime_utc': start.astimezone(utc).isoformat(),
+            'end_datetime_utc': end.astimezone(utc).isoformat(),
+            'block_id': block_id
+        }
+        for i, (start, end) in enumerate(spans)
+    ]
+
+def trip_dump(flights, effective):
+    # Same layout parse_trip_dump reads: day-of-month on the first leg of each day, a pay
+    # report line per duty day and a layover line after the last leg of the day.
+    lines = [f"EFFECTIVE {MONTHS[effective.month - 1]}{effective.day}"]
+    first_report = flights[0]['report_time'].replace(':', '')
+    lines.append(f"ACTUAL REPORT TIME {first_report}")
+    current = None
+    for f in flights:
+        day = int(f['date'][8:])
+        if f['date'] != current:
+            current = f['date']
+            lines.append(f"PAY REPORT TIME {f['report_time'].replace(':', '')}/{day}")
+            prefix = f"{day:2d} "
+        else:
+            prefix = "   "
+        lines.append(f"{prefix}{f['flt']} {f['dep']} {f['dep_time'].replace(':', '')} {f['arr']} {f['arr_time'].replace(':', '')} {hhmm(f['block'])}")
+        if f['layover_duration']:
+            lines.append(f"{f['arr']} {f['layover_duration']}/{f['hotel']}")
+    return '\n'.join(lines)
+
+def bid_dump(flights, start):
+    # Bid packet layout read by parse_bid_dump: a day letter (A = start date) on the first leg
+    # of each day and an optional turn column.
+    lines = [f"CHECK-IN AT {flights[0]['report_time'].replace(':', '.')}"]
+    current = None
+    for f in flights:
+        if f['date'] != current:
+            current = f['date']
+            letter = chr(ord('A') + (datetime.strptime(f['date'], '%Y-%m-%d').date() - start).days)
+        else:
+            letter = ' '
+        lines.append(f"{letter} {f['flt']} {f['dep']} {f['dep_time'].replace(':', '')} {f['arr']} {f['arr_time'].replace(':', '')} {hhmm(f['block'])} {hhmm(f['turn'])}")
+        if f['layover_duration']:
+            lines.append(f"   {f['arr']} {f['layover_duration']}/{f['hotel']}")
+    return '\n'.join(lines)
+
+def ical_events(flights):
+    utc = ZoneInfo('UTC')
+    lines = []
+    for f in flights:
+        dep = datetime.strptime(f['date'] + ' ' + f['dep_time'], '%Y-%m-%d %H:%M').replace(tzinfo=ZoneInfo(AIRPORTS_TZ[f['dep']]))
+        arr = datetime.strptime(f['arr_date'] + ' ' + f['arr_time'], '%Y-%m-%d %H:%M').replace(tzinfo=ZoneInfo(AIRPORTS_TZ[f['arr']]))
+        lines.extend([
+            "BEGIN:VEVENT",
+            f"UID:{f['date']}-{f['flt']}-{f['dep']}@synthetic",
+            f"DTSTART:{dep.astimezone(utc).strftime('%Y%m%dT%H%M%SZ')}",
+            f"DTEND:{arr.astimezone(utc).strftime('%Y%m%dT%H%M%SZ')}",
+            f"SUMMARY:XX {f['flt']} {f['dep']}-{f['arr']}",
+            "END:VEVENT"
+        ])
+    return lines
+
+def generate_schedule(n_legs, years=None, seed=0, start=date(2024, 1, 1)):
+    rng = random.Random(seed)
+    blocks = plan_blocks(n_legs, rng)
+    place_blocks(blocks, start, years)
+
+    rotations = []
+    blackouts = []
+    trips = []
+    bids = []
+    packet = []
+    ical_lines = ["BEGIN:VCALENDAR", "VERSION:2.0", "PRODID:-//SkedCheckBenchmark//EN"]
+    for i, b in enumerate(blocks):
+        if b['kind'] in ('domestic', 'international'):
+            flights = build_rotation(b, rng)
+            rotations.append({
+                'id': len(rotations) + 1,
+                'rotation_id': f"{1000 + i}",
+                'start_date': b['start'].strftime('%Y-%m-%d'),
+                'data': json.dumps(flights),
+                'is_cancelled': 0
+            })
+            trips.append((trip_dump(flights, b['start']), b['start']))
+            bids.append((bid_dump(flights, b['start']), b['start']))
+            packet.append(f"PAIRING #{rotations[-1]['rotation_id']} {b['start'].day:02d}{MONTHS[b['start'].month - 1]}\n{bids[-1][0]}")
+            ical_lines.extend(ical_events(flights))
+        else:
+            blackouts.extend(build_blackouts(b, f"block-{i}", len(blackouts) + 1))
+    ical_lines.append("END:VCALENDAR")
+
+    legs = sum(len(json.loads(r['data'])) for r in rotations)
+    end = max(b['start'] + timedelta(days=b['days']) for b in blocks)
+    return {
+        'rotations': rotations,
+        'blackouts': blackouts,
+        'airports_tz': dict(AIRPORTS_TZ),
+        'base_tz': BASE_TZ,
+        'trip_dumps': trips,
+        'bid_dumps': bids,
+        'bid_packet': '\n'.join(packet),
+        'ical': '\n'.join(ical_lines),
+        'legs': legs,
+        'start': start,
+        'end': end
+    }
@@ -0,0 +1,44 @@
+# Parsing, duty building and FAR 117 legality checks, importable without Streamlit.
+from . import perf
+from .times import parse_local_datetime, local_to_utc, leg_utc_times, hours_to_hhmm
+from .airports import INITIAL_AIRPORTS, AirportRegistry
+from .parsing import (
+    get_date_for_day, find_effective_date, parse_hhmm_time, parse_time_str_to_float,
+    parse_trip_dump, parse_bid_dump, parse_bid_packet, BidPairing
+)
+from .far117 import (
+    FLIGHT_TIME_TABLE_A, FDP_TABLE_B, FDP_TABLE_C_MAX, AUGMENTED_FLIGHT_TIME_LIMIT,
+    THEATER_OFFSET_HOURS, ACCLIMATION_HOURS, ACCLIMATION_REST_HOURS, UNACCLIMATED_FDP_REDUCTION,
+    FAR117Calculator
+)
+from .legality import (
+    BLOCK_WINDOW_HOURS, BLOCK_LIMIT_HOURS, FDP_WINDOW_HOURS, FDP_LIMIT_HOURS,
+    REST_WINDOW_HOURS, MIN_REST_HOURS, LEGALITY_REACH_HOURS, DUTY_TYPE_CODES,
+    CumulativeTimeline, RangeMinTable, DutyTable, RollingWindowIndex, DaySummaryCache,
+    day_bounds, get_daily_remaining_range, evaluate_days
+)
+from .duties import build_duties, assemble_schedule
+from .ical import parse_ical_rotations, VEventCache, VEVENT_CACHE, duty_uid, generate_ical_export
+from .feed import ICalFeed, ICalFeedServer, FeedCache
+from .bulk import split_bid_packet, parse_bid_packet_bulk
+from .screening import SCREEN_CONSTRAINTS, PairingScreener, screen_pairings
+
+__all__ = [
+    'perf',
+    'parse_local_datetime', 'local_to_utc', 'leg_utc_times', 'hours_to_hhmm',
+    'INITIAL_AIRPORTS', 'AirportRegistry',
+    'get_date_for_day', 'find_effective_date', 'parse_hhmm_time', 'parse_time_str_to_float', 'parse_trip_dump',
+    'parse_bid_dump', 'parse_bid_packet', 'BidPairing',
+    'FLIGHT_TIME_TABLE_A', 'FDP_TABLE_B', 'FDP_TABLE_C_MAX', 'AUGMENTED_FLIGHT_TIME_LIMIT',
+    'THEATER_OFFSET_HOURS', 'ACCLIMATION_HOURS', 'ACCLIMATION_REST_HOURS', 'UNACCLIMATED_FDP_REDUCTION',
+    'FAR117Calculator',
+    'BLOCK_WINDOW_HOURS', 'BLOCK_LIMIT_HOURS', 'FDP_WINDOW_HOURS', 'FDP_LIMIT_HOURS', 'REST_WINDOW_HOURS',
+    'MIN_REST_HOURS', 'LEGALITY_REACH_HOURS', 'DUTY_TYPE_CODES', 'CumulativeTimeline', 'RangeMinTable',
+    'DutyTable', 'RollingWindowIndex', 'DaySummaryCache', 'day_bounds', 'get_daily_remaining_range',
+    'evaluate_days',
+    'build_duties', 'assemble_schedule',
+    'parse_ical_rotations', 'VEventCache', 'VEVENT_CACHE', 'duty_uid', 'generate_ical_export',
+    'ICalFeed', 'ICalFeedServer', 'FeedCache',
+    'split_bid_packet', 'parse_bid_packet_bulk',
+    'SCREEN_CONSTRAINTS', 'PairingScreener', 'screen_pairings'
+]
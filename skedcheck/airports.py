@@ -0,0 +1,43 @@
+from zoneinfo import ZoneInfo
+
+# Seeded into the airports table on first run; users add the rest from the sidebar.
+INITIAL_AIRPORTS = [
+    ('SEA', 'America/Los_Angeles'), ('LAX', 'America/Los_Angeles'), ('SFO', 'America/Los_Angeles'),
+    ('PDX', 'America/Los_Angeles'), ('SAN', 'America/Los_Angeles'), ('GEG', 'America/Los_Angeles'),
+    ('SLC', 'America/Denver'), ('DEN', 'America/Denver'), ('PHX', 'America/Phoenix'),
+    ('MSP', 'America/Chicago'), ('ORD', 'America/Chicago'), ('DFW', 'America/Chicago'), ('IAH', 'America/Chicago'),
+    ('ATL', 'America/New_York'), ('DTW', 'America/Detroit'), ('JFK', 'America/New_York'),
+    ('LGA', 'America/New_York'), ('EWR', 'America/New_York'), ('BOS', 'America/New_York'),
+    ('MIA', 'America/New_York'), ('CLT', 'America/New_York'), ('DCA', 'America/New_York'), ('PHL', 'America/New_York'),
+    ('CVG', 'America/New_York'),
+    ('CLE', 'America/New_York'), ('ATW', 'America/Chicago'), ('MEM', 'America/Chicago'),
+    ('AMS', 'Europe/Amsterdam'),
+    ('HNL', 'Pacific/Honolulu'), ('ANC', 'America/Anchorage'),
+    ('YVR', 'America/Vancouver'), ('YYC', 'America/Denver'), ('YYZ', 'America/Toronto'), ('YUL', 'America/Toronto'),
+    ('LHR', 'Europe/London'), ('CDG', 'Europe/Paris'), ('AMS', 'Europe/Amsterdam'),
+    ('FRA', 'Europe/Berlin'), ('MUC', 'Europe/Berlin'), ('FCO', 'Europe/Rome'),
+    ('BCN', 'Europe/Madrid'), ('MAD', 'Europe/Madrid'), ('DUB', 'Europe/Dublin'),
+    ('ZRH', 'Europe/Zurich'), ('CPH', 'Europe/Copenhagen'), ('ARN', 'Europe/Stockholm'),
+    ('HND', 'Asia/Tokyo'), ('NRT', 'Asia/Tokyo'), ('ICN', 'Asia/Seoul'),
+    ('PEK', 'Asia/Shanghai'), ('PVG', 'Asia/Shanghai'), ('HKG', 'Asia/Hong_Kong'),
+    ('TPE', 'Asia/Taipei'), ('SIN', 'Asia/Singapore'), ('BKK', 'Asia/Bangkok'), ('DXB', 'Asia/Dubai'),
+    ('SYD', 'Australia/Sydney'), ('MEL', 'Australia/Sydney'), ('AKL', 'Pacific/Auckland'),
+    ('MEX', 'America/Mexico_City'), ('BOG', 'America/Bogota'), ('GRU', 'America/Sao_Paulo'),
+    ('EZE', 'America/Argentina/Buenos_Aires'), ('SCL', 'America/Santiago'), ('PTY', 'America/Panama'),
+    ('CYFB', 'America/Iqaluit'), ('PASY', 'America/Adak'), ('EINN', 'Europe/Dublin'),
+]
+
+class AirportRegistry:
+    # Airport code -> tz name, plus the resolved ZoneInfo for each code.
+    def __init__(self, tz_names):
+        self.tz_names = tz_names
+        self.zones = {}
+        for code, tz in tz_names.items():
+            try:
+                self.zones[code] = ZoneInfo(tz)
+            except (ValueError, KeyError):
+                # Bad tz names fail where they are used, as before.
+                pass
+                
+    def zone(self, code):
+        return self.zones.get(code) or ZoneInfo(self.tz_names[code])
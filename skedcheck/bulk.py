@@ -0,0 +1,64 @@
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from .parsing import BID_FLIGHT_RE, BID_PAIRING_RE, LAYOVER_RE, parse_bid_packet
+
+# Whole bid packets (thousands of pairings) are split into per-pairing blocks in one pass
+# and parsed in batches. Small packets are parsed in-process, where starting workers would
+# cost more than it saves; the pool uses spawned workers so it is safe to start from a
+# threaded server.
+PARALLEL_MIN_PAIRINGS = 2000
+PAIRINGS_PER_TASK = 500
+
+def split_bid_packet(dump_text):
+    # {pairing_id: [lines]} with the header lines kept, so each block parses on its own exactly
+    # as parse_bid_packet would parse it inside the whole packet. Same header test as there.
+    blocks = {}
+    block = None
+    lines = dump_text.split('\n') if isinstance(dump_text, str) else dump_text
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        if '#' in line and not BID_FLIGHT_RE.match(line) and not LAYOVER_RE.match(line):
+            match = BID_PAIRING_RE.search(line)
+            if match:
+                block = blocks.setdefault(match.group(1), [])
+        if block is not None:
+            block.append(line)
+    return blocks
+
+def parse_pairing_blocks(texts, start_date):
+    # Worker entry point: a batch of pairing blocks, each parsed as its own packet.
+    parsed = {}
+    for text in texts:
+        parsed.update(parse_bid_packet(text, start_date))
+    return parsed
+
+def parse_bid_packet_bulk(dump_text, start_date, workers=None, progress=None):
+    # Same result as parse_bid_packet, in packet order. progress(done, total) is called as
+    # batches of pairings finish.
+    texts = ['\n'.join(lines) for lines in split_bid_packet(dump_text).values()]
+    total = len(texts)
+    batches = [texts[i:i + PAIRINGS_PER_TASK] for i in range(0, total, PAIRINGS_PER_TASK)]
+    parsed = {}
+    done = 0
+
+    if total < PARALLEL_MIN_PAIRINGS or (workers or os.cpu_count() or 1) < 2:
+        results = (parse_pairing_blocks(batch, start_date) for batch in batches)
+        for batch, result in zip(batches, results):
+            parsed.update(result)
+            done += len(batch)
+            if progress is not None:
+                progress(done, total)
+        return parsed
+
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('spawn')) as executor:
+        results = executor.map(parse_pairing_blocks, batches, [start_date] * len(batches))
+        for batch, result in zip(batches, results):
+            parsed.update(result)
+            done += len(batch)
+            if progress is not None:
+                progress(done, total)
+    return parsed
@@ -0,0 +1,223 @@
+import json
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from . import perf
+from .far117 import FAR117Calculator
+from .legality import DutyTable, RollingWindowIndex
+from .times import leg_utc_times
+
+def rotation_flights(rot, legs_by_rotation):
+    flights = legs_by_rotation.get(rot['id'])
+    if flights:
+        return flights
+    with perf.stage('json_decode'):
+        return json.loads(rot['data'])
+
+def build_duties(rotations, blackouts, airports_tz, base_tz, legs_by_rotation=None):
+    if isinstance(base_tz, str):
+        base_tz = ZoneInfo(base_tz)
+    calendar_blackouts = []
+    processed_duties = []
+    errors = []
+
+    vacation_events = []
+    training_events = []
+    reserve_events = []
+    for b in blackouts:
+        start_utc = datetime.fromisoformat(b['start_datetime_utc'])
+        end_utc = datetime.fromisoformat(b['end_datetime_utc'])
+    
+        # MODIFIED: Map types
+        event_type_map = {'vacation': 'VAC', 'training': 'TRNG', 'reserve': 'RES'}
+        event_id = event_type_map.get(b['type'], 'EVENT')
+    
+        event_obj = {
+            'type': b['type'],
+            'id': b['id'],
+            'label': event_id,
+            'start_utc': start_utc,
+            'end_utc': end_utc,
+            'block_id': b.get('block_id'),
+            'updated_at': b.get('updated_at') or b.get('created_at')
+        }
+    
+        if b['type'] == 'vacation':
+            vacation_events.append(event_obj)
+        # UPDATED: Standard 'training' check
+        elif b['type'] == 'training':
+            training_events.append(event_obj)
+        elif b['type'] == 'reserve':
+            reserve_events.append(event_obj)
+        
+    if legs_by_rotation is None:
+        legs_by_rotation = {}
+        
+    rotation_covered_dates = set()
+    for rot in rotations:
+        try:
+            flights = rotation_flights(rot, legs_by_rotation)
+            if not flights:
+                continue
+            min_date = datetime.strptime(rot['start_date'], '%Y-%m-%d').date()
+            max_date = max(datetime.strptime(f['arr_date'], '%Y-%m-%d').date() for f in flights)
+            date = min_date
+        
+            while date <= max_date:
+                rotation_covered_dates.add(date)
+                date += timedelta(days=1)
+        except:
+            pass
+        
+        flights_by_day = {}
+    
+        for f in flights:
+            # Legs from the legs table arrive with UTC times precomputed.
+            if f.get('report_utc') is None:
+                if f['dep'] not in airports_tz or f['arr'] not in airports_tz:
+                    errors.append((f"Error processing rotation {rot['rotation_id']}. Unknown airport: {f['dep']} or {f['arr']}. Please add it via the 'Add Airport Timezone' tool and re-submit this rotation.", "✈️"))
+                    continue
+                    
+                try:
+                    with perf.stage('tz_conversion'):
+                        f['report_utc'], f['dep_utc'], f['arr_utc'], f['release_utc'] = leg_utc_times(f, airports_tz)
+                except ValueError as e:
+                    errors.append((f"Rotation {rot['rotation_id']} has invalid time data: {e}", None))
+                    continue
+        
+            report_date_str = f['report_date']
+            if report_date_str not in flights_by_day:
+                flights_by_day[report_date_str] = []
+            flights_by_day[report_date_str].append(f)
+        
+        for report_date, flights_on_this_day in flights_by_day.items():
+            if not flights_on_this_day:
+                continue
+            
+            first_flight = flights_on_this_day[0]
+            last_flight = flights_on_this_day[-1]
+        
+            fdp_obj = {
+                'type': 'flight',
+                'report_utc': first_flight['report_utc'],
+                'dep_utc': first_flight['dep_utc'],
+                'arr_utc': last_flight['arr_utc'],
+                'release_utc': last_flight['release_utc'],
+                'duty_hours': (last_flight['release_utc'] - first_flight['report_utc']).total_seconds() / 3600,
+                'block': sum(fl.get('block', 0) for fl in flights_on_this_day),
+                'rotation_id': rot['rotation_id'],
+                'flights': list(flights_on_this_day),
+                'flight': first_flight,
+                'rotation_db_id': rot['id'],
+                'rotation_start_date': rot['start_date'],
+                'rotation_updated_at': rot.get('updated_at')
+            }
+            processed_duties.append(fdp_obj)
+        
+    calendar_blackouts.extend(vacation_events)
+
+    calendar_blackouts.extend(training_events)
+
+    for event in training_events:
+        # UPDATED: Add training as 'training' type to processed_duties for rest calculation
+        processed_duties.append({
+            'type': 'training', 
+            'report_utc': event['start_utc'],
+            'dep_utc': event['start_utc'],
+            'arr_utc': event['end_utc'],
+            'release_utc': event['end_utc'],
+            'duty_hours': (event['end_utc'] - event['start_utc']).total_seconds() / 3600,
+            'block': 0.0,
+            'rotation_id': event['label'],
+            'flight': None,
+            'flights': [],
+            'blackout_id': event['id'],
+            'block_id': event['block_id'],
+            'updated_at': event['updated_at']
+        })
+    
+    for event in reserve_events:
+        reserve_day = event['start_utc'].astimezone(base_tz).date()
+        if reserve_day in rotation_covered_dates:
+            continue
+        
+        is_overridden = False
+        event_midpoint_utc = event['start_utc'] + (event['end_utc'] - event['start_utc']) / 2
+            
+        for vac in vacation_events:
+            if vac['start_utc'] <= event_midpoint_utc <= vac['end_utc']:
+                is_overridden = True
+                break
+        if is_overridden: continue
+    
+        # Check against training
+        for trng in training_events:
+            if trng['start_utc'] <= event_midpoint_utc <= trng['end_utc']:
+                is_overridden = True
+                break
+        if is_overridden: continue
+    
+        calendar_blackouts.append(event)
+        processed_duties.append({
+            'type': 'reserve',
+            'report_utc': event['start_utc'],
+            'dep_utc': event['start_utc'],
+            'arr_utc': event['end_utc'],
+            'release_utc': event['end_utc'],
+            'duty_hours': (event['end_utc'] - event['start_utc']).total_seconds() / 3600,
+            'block': 0.0,
+            'rotation_id': event['label'],
+            'flight': None,
+            'flights': [],
+            'blackout_id': event['id'],
+            'block_id': event['block_id'],
+            'updated_at': event['updated_at']
+        })
+    
+    processed_duties.sort(key=lambda duty: duty['report_utc'])
+    
+    display_errors = []
+    rotation_display_ranges = {}
+    for rot in rotations:
+        try:
+            flights = rotation_flights(rot, legs_by_rotation)
+            if not flights:
+                continue
+            min_date = datetime.strptime(rot['start_date'], '%Y-%m-%d').date()
+            max_date = max(datetime.strptime(f['arr_date'], '%Y-%m-%d').date() for f in flights)
+            rotation_display_ranges[rot['id']] = {
+                'id': rot['rotation_id'],
+                'start': min_date,
+                'end': max_date,
+                'db_id': rot['id'],
+                'raw_data': rot
+            }
+        except (json.JSONDecodeError, ValueError, TypeError):
+            display_errors.append(f"Could not display rotation {rot.get('rotation_id', 'Unknown')}. Data may be corrupt or incomplete.")
+    
+    return {
+        'processed_duties': processed_duties,
+        'calendar_blackouts': calendar_blackouts,
+        'rotation_display_ranges': rotation_display_ranges,
+        'errors': errors,
+        'display_errors': display_errors
+    }
+
+def assemble_schedule(rotations, blackouts, airports_tz, base_tz_str, legs=None):
+    perf.count('schedule_builds')
+    with perf.stage('build_duties'):
+        schedule = build_duties(rotations, blackouts, airports_tz, base_tz_str, legs)
+    with perf.stage('window_index'):
+        schedule['duty_table'] = DutyTable(schedule['processed_duties'])
+        schedule['window_index'] = RollingWindowIndex(schedule['duty_table'])
+    
+    calc = FAR117Calculator(airports_tz)
+    with perf.stage('far117_calculator'):
+        if not schedule['errors']:
+            for duty in schedule['processed_duties']:
+                if duty['type'] == 'flight': # UPDATED: Only flight counts for main FDP calc
+                    calc.add_flight_duty(duty['report_utc'], duty['release_utc'], duty['flights'])
+                else:
+                    calc.add_generic_duty(duty['report_utc'], duty['release_utc'])
+    schedule['calculator'] = calc
+    return schedule
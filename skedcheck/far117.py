@@ -0,0 +1,249 @@
+from collections import deque
+from datetime import timedelta
+from zoneinfo import ZoneInfo
+
+from .times import leg_utc_times
+
+
+# FAR 117 Table A (max flight time) and Table B (max FDP, unaugmented, by segment count
+# 1..7+) indexed by the hour of report in acclimated local time. Every row boundary in both
+# tables falls on the hour, so a 24-entry lookup covers them.
+FLIGHT_TIME_TABLE_A = [8.0] * 5 + [9.0] * 15 + [8.0] * 4
+FDP_TABLE_B = (
+    [(9, 9, 9, 9, 9, 9, 9)] * 4
+    + [(10, 10, 10, 10, 9, 9, 9)]
+    + [(12, 12, 12, 12, 11.5, 11, 10.5)]
+    + [(13, 13, 12, 12, 11.5, 11, 10.5)]
+    + [(14, 14, 13, 13, 12.5, 12, 11.5)] * 5
+    + [(13, 13, 13, 13, 12.5, 12, 11.5)]
+    + [(12, 12, 12, 12, 11.5, 11, 10.5)] * 4
+    + [(12, 12, 11, 11, 10, 9, 9)] * 5
+    + [(11, 11, 10, 10, 9, 9, 9)]
+    + [(10, 10, 10, 9, 9, 9, 9)]
+)
+# Table C (augmented FDP) for 4 pilots with class 1 rest facilities, and the augmented flight
+# time limit. The schedule doesn't record crew complement, so a duty over the Table A limit
+# (only legal if augmented) is held to these most permissive limits instead.
+FDP_TABLE_C_MAX = [17.0] * 6 + [18.5] + [19.0] * 6 + [18.5] * 4 + [17.0] * 7
+AUGMENTED_FLIGHT_TIME_LIMIT = 17.0
+THEATER_OFFSET_HOURS = 4
+ACCLIMATION_HOURS = 72
+ACCLIMATION_REST_HOURS = 36
+UNACCLIMATED_FDP_REDUCTION = 0.5
+
+class FAR117Calculator:
+    # Flight duties go through add_flight_duty (or leg by leg through add_flight), which
+    # checks the Table A/B limits for the duty and then the rest rules in add_generic_duty.
+    # Simplifications: every leg counts as a segment (deadheads included), FDP runs from
+    # report to the last block-in, and augmentation is inferred from the flight time.
+    def __init__(self, airports_tz=None):
+        self.duties = []
+        self.last_release_utc = None
+        self.acclimated = True
+        self.unacclimated_until = None
+        self.last_offset = None
+        self.violations = []
+        
+        self.airports_tz = airports_tz or {}
+        self.theater_tz = None
+        self.duty_limits = []
+        self.open_duty = None
+        
+        # Accepted duties still inside the trailing 168h (report, release, out_of_order), and a
+        # decreasing deque of the rest gaps in front of them, so the 30-in-168 check is
+        # amortized O(1) per add when duties arrive in report order.
+        self.rest_window = deque()
+        self.rest_gaps = deque()
+        self.out_of_order_in_window = 0
+        self.latest_check = None
+        
+    def check_30_in_168(self, start_time):
+        return self.max_rest_in_168(start_time) >= 30
+    
+    def max_rest_in_168(self, start_time):
+        if self.latest_check is not None and start_time < self.latest_check:
+            return self.scan_rest_in_168(start_time, self.duties)
+        self.latest_check = start_time
+        
+        window_start = start_time - timedelta(hours=168)
+        had_out_of_order = self.out_of_order_in_window > 0
+        while self.rest_window and self.rest_window[0][1] <= window_start:
+            if self.rest_window.popleft()[2]:
+                self.out_of_order_in_window -= 1
+        if had_out_of_order and not self.out_of_order_in_window:
+            # Gaps recorded around the out-of-order duties are stale; rebuild from the window.
+            self.rest_gaps.clear()
+            for k in range(1, len(self.rest_window)):
+                self.push_rest_gap(self.rest_window[k][0], self.rest_window[k - 1][1])
+        if not self.rest_window:
+            return 168.0
+        # A duty released before its report, or reported before the one ahead of it, breaks
+        # the sorted-window shortcuts; scan just the window until it drops out.
+        if self.out_of_order_in_window or self.rest_window[-1][0] >= start_time:
+            return self.scan_rest_in_168(
+                start_time, [{'report_utc': report, 'release_utc': release} for report, release, _ in self.rest_window]
+            )
+            
+        first_report = self.rest_window[0][0]
+        while self.rest_gaps and self.rest_gaps[0][0] <= first_report:
+            self.rest_gaps.popleft()
+        rests = []
+        if first_report > window_start:
+            rests.append((first_report - window_start).total_seconds() / 3600)
+        if self.rest_gaps and self.rest_gaps[0][1] > 0:
+            rests.append(self.rest_gaps[0][1])
+        prev_end = max(window_start, self.rest_window[-1][1])
+        if start_time > prev_end:
+            rests.append((start_time - prev_end).total_seconds() / 3600)
+        return max(rests) if rests else 168.0
+    
+    def scan_rest_in_168(self, start_time, duties):
+        window_start = start_time - timedelta(hours=168)
+        relevant_duties = [d for d in duties if d['release_utc'] > window_start and d['report_utc'] < start_time]
+        if not relevant_duties:
+            return 168.0
+        relevant_duties = sorted(relevant_duties, key=lambda d: d['report_utc'])
+        rests = []
+        prev_end = window_start
+        for d in relevant_duties:
+            if d['report_utc'] > prev_end:
+                rest = (d['report_utc'] - prev_end).total_seconds() / 3600
+                rests.append(rest)
+            prev_end = max(prev_end, d['release_utc'])
+        if start_time > prev_end:
+            rest = (start_time - prev_end).total_seconds() / 3600
+            rests.append(rest)
+        return max(rests) if rests else 168.0
+    
+    def add_generic_duty(self, report_utc, release_utc, is_flight_duty=False):
+        if is_flight_duty:
+            max_rest = self.max_rest_in_168(report_utc)
+            if max_rest < 30:
+                self.violations.append({'rule': '30_in_168', 'report_utc': report_utc, 'release_utc': release_utc, 'rest_hours': max_rest})
+                return False
+                
+            if self.last_release_utc:
+                rest_hours = (report_utc - self.last_release_utc).total_seconds() / 3600
+                if rest_hours < 10:
+                    self.violations.append({'rule': 'min_rest_10', 'report_utc': report_utc, 'release_utc': release_utc, 'rest_hours': rest_hours})
+                    return False
+        
+        if self.last_release_utc and report_utc < self.last_release_utc:
+            self.violations.append({'rule': 'overlap', 'report_utc': report_utc, 'release_utc': release_utc, 'rest_hours': None})
+            return False
+             
+        self.last_release_utc = release_utc
+        self.duties.append({'report_utc': report_utc, 'release_utc': release_utc})
+        
+        out_of_order = release_utc < report_utc or bool(self.rest_window and report_utc < self.rest_window[-1][0])
+        self.out_of_order_in_window += out_of_order
+        if self.rest_window:
+            self.push_rest_gap(report_utc, self.rest_window[-1][1])
+        self.rest_window.append((report_utc, release_utc, out_of_order))
+        return True
+    
+    def push_rest_gap(self, report_utc, prev_release_utc):
+        gap = (report_utc - prev_release_utc).total_seconds() / 3600
+        while self.rest_gaps and self.rest_gaps[-1][1] <= gap:
+            self.rest_gaps.pop()
+        self.rest_gaps.append((report_utc, gap))
+    
+    def add_flight(self, date_str, dep_airport, local_dep_time, arr_airport, local_arr_time, arr_date_str=None, report_time=None, report_date_str=None, block=None, turn=0.0):
+        # Legs sharing a report date form one duty, as in the schedule build; the open duty
+        # is checked once the next duty starts or close_duty() is called.
+        f = {
+            'date': date_str, 'dep': dep_airport, 'dep_time': local_dep_time,
+            'arr': arr_airport, 'arr_time': local_arr_time, 'arr_date': arr_date_str or date_str,
+            'report_time': report_time, 'report_date': report_date_str or date_str, 'turn': turn
+        }
+        f['report_utc'], f['dep_utc'], f['arr_utc'], f['release_utc'] = leg_utc_times(f, self.airports_tz)
+        f['block'] = block if block is not None else (f['arr_utc'] - f['dep_utc']).total_seconds() / 3600
+        
+        if self.open_duty is not None and self.open_duty[0]['report_date'] != f['report_date']:
+            self.close_duty()
+        if self.open_duty is None:
+            self.open_duty = []
+        self.open_duty.append(f)
+        return f
+    
+    def close_duty(self):
+        if not self.open_duty:
+            return None
+        flights, self.open_duty = self.open_duty, None
+        return self.add_flight_duty(flights[0]['report_utc'], flights[-1]['release_utc'], flights)
+    
+    def add_flight_duty(self, report_utc, release_utc, flights):
+        self.check_duty_limits(report_utc, flights)
+        return self.add_generic_duty(report_utc, release_utc, is_flight_duty=True)
+    
+    def update_acclimation(self, report_utc, dep_tz):
+        if self.theater_tz is None:
+            self.theater_tz = dep_tz
+            self.last_offset = report_utc.astimezone(ZoneInfo(dep_tz)).utcoffset()
+        if self.acclimated:
+            return
+        rested = self.last_release_utc and (report_utc - self.last_release_utc).total_seconds() / 3600 >= ACCLIMATION_REST_HOURS
+        if rested or report_utc >= self.unacclimated_until:
+            self.acclimated = True
+            self.theater_tz = dep_tz
+            self.unacclimated_until = None
+            
+    def record_arrival(self, arr_utc, arr_tz):
+        arr_offset = arr_utc.astimezone(ZoneInfo(arr_tz)).utcoffset()
+        theater_offset = arr_utc.astimezone(ZoneInfo(self.theater_tz)).utcoffset()
+        if abs((arr_offset - theater_offset).total_seconds()) / 3600 <= THEATER_OFFSET_HOURS:
+            # Back in (or still in) the theater last acclimated to.
+            self.acclimated = True
+            self.unacclimated_until = None
+        elif self.acclimated or abs((arr_offset - self.last_offset).total_seconds()) / 3600 > THEATER_OFFSET_HOURS:
+            # Arrived in a new theater: acclimated to it after 72h there (or 36h free of duty).
+            self.acclimated = False
+            self.unacclimated_until = arr_utc + timedelta(hours=ACCLIMATION_HOURS)
+        self.last_offset = arr_offset
+        
+    def check_duty_limits(self, report_utc, flights):
+        dep_tz = self.airports_tz.get(flights[0]['dep'])
+        arr_tz = self.airports_tz.get(flights[-1]['arr'])
+        if dep_tz:
+            self.update_acclimation(report_utc, dep_tz)
+        theater_tz = self.theater_tz or dep_tz or 'UTC'
+        
+        report_hour = report_utc.astimezone(ZoneInfo(theater_tz)).hour
+        segments = len(flights)
+        fdp_hours = (flights[-1]['arr_utc'] - report_utc).total_seconds() / 3600
+        flight_hours = sum(f.get('block', 0) for f in flights)
+        
+        augmented = flight_hours > FLIGHT_TIME_TABLE_A[report_hour]
+        if augmented:
+            fdp_limit = FDP_TABLE_C_MAX[report_hour]
+            flight_time_limit = AUGMENTED_FLIGHT_TIME_LIMIT
+        else:
+            fdp_limit = FDP_TABLE_B[report_hour][min(segments, 7) - 1]
+            flight_time_limit = FLIGHT_TIME_TABLE_A[report_hour]
+        if not self.acclimated:
+            fdp_limit -= UNACCLIMATED_FDP_REDUCTION
+            
+        limits = {
+            'report_utc': report_utc,
+            'release_utc': flights[-1]['release_utc'],
+            'segments': segments,
+            'acclimated': self.acclimated,
+            'augmented': augmented,
+            'fdp_hours': fdp_hours,
+            'fdp_limit': fdp_limit,
+            'flight_hours': flight_hours,
+            'flight_time_limit': flight_time_limit,
+            'fdp_exceeded': fdp_hours > fdp_limit,
+            'flight_time_exceeded': flight_hours > flight_time_limit
+        }
+        self.duty_limits.append(limits)
+        if limits['fdp_exceeded']:
+            rule = 'fdp_table_c' if augmented else 'fdp_table_b'
+            self.violations.append({'rule': rule, 'report_utc': report_utc, 'release_utc': limits['release_utc'], 'hours': fdp_hours, 'limit_hours': fdp_limit})
+        if limits['flight_time_exceeded']:
+            rule = 'flight_time_augmented' if augmented else 'flight_time_table_a'
+            self.violations.append({'rule': rule, 'report_utc': report_utc, 'release_utc': limits['release_utc'], 'hours': flight_hours, 'limit_hours': flight_time_limit})
+            
+        if arr_tz and self.theater_tz:
+            self.record_arrival(flights[-1]['arr_utc'], arr_tz)
+        return limits
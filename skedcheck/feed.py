@@ -0,0 +1,170 @@
+import hmac
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+# Calendar subscription feed: serves each profile's iCal export over plain HTTP so calendar
+# apps can poll it instead of the user re-importing a downloaded file.
+#
+#   GET /ical/<profile_id>/<token>.ics?tz=America/Los_Angeles
+#
+# Profile ids are just counters, so each profile has a random token that has to match; a
+# wrong token gets the same 404 as a missing profile.
+# The ETag is the profile's data version, so a poll with If-None-Match only costs one
+# version lookup. Last-Modified is when this process first served that version (the DB
+# doesn't keep a time per version), which is enough for clients that only send
+# If-Modified-Since. Rendered feeds are kept per (profile, tz); a newer version replaces the
+# old one and the least recently polled feeds are dropped past max_entries.
+FEED_CACHE_ENTRIES = 16
+FEED_PATH_RE = re.compile(r'^/ical/(\d+)/([A-Za-z0-9_-]+)(?:\.ics)?/?$')
+
+class FeedCache:
+    def __init__(self, max_entries=FEED_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None:
+                self.entries.move_to_end(key)
+            return entry
+
+    def put(self, key, entry):
+        with self.lock:
+            self.entries[key] = entry
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+
+def feed_etag(profile_id, tz_name, version):
+    return f'"{profile_id}-{version}-{tz_name}"'
+
+def etag_matches(header, etag):
+    if header is None:
+        return False
+    candidates = [tag.strip() for tag in header.split(',')]
+    return '*' in candidates or etag in candidates or f"W/{etag}" in candidates
+
+class ICalFeed:
+    # data_version(profile_id) -> the profile's data version, or None if there is no such
+    # profile; render(profile_id, tz_name) -> the profile's iCal text; feed_token(profile_id)
+    # -> the token its feed URL carries, or None. All are called from the server's request threads.
+    def __init__(self, data_version, render, default_tz, feed_token, max_entries=FEED_CACHE_ENTRIES):
+        self.data_version = data_version
+        self.render = render
+        self.default_tz = default_tz
+        self.feed_token = feed_token
+        self.cache = FeedCache(max_entries)
+        self.render_lock = threading.Lock()
+
+    def entry(self, profile_id, tz_name, version):
+        key = (profile_id, tz_name)
+        entry = self.cache.get(key)
+        if entry is not None and entry['version'] == version:
+            return entry
+        # One render at a time; a client that waited on the lock usually finds it done.
+        with self.render_lock:
+            entry = self.cache.get(key)
+            if entry is not None and entry['version'] == version:
+                return entry
+            now = datetime.now(timezone.utc).replace(microsecond=0)
+            if entry is not None:
+                # HTTP dates have one-second resolution: keep a new version strictly newer.
+                now = max(now, entry['last_modified'] + timedelta(seconds=1))
+            body = self.render(profile_id, tz_name).encode('utf-8')
+            entry = {'version': version, 'last_modified': now, 'body': body}
+            self.cache.put(key, entry)
+            return entry
+
+    def respond(self, path, headers):
+        # Returns (status, headers, body) for a GET; headers is any mapping with .get().
+        url = urlsplit(path)
+        match = FEED_PATH_RE.match(url.path)
+        if not match:
+            return 404, {}, b"Not found\n"
+        profile_id = int(match.group(1))
+        token = self.feed_token(profile_id)
+        if token is None or not hmac.compare_digest(token, match.group(2)):
+            return 404, {}, b"No such profile\n"
+        tz_name = parse_qs(url.query).get('tz', [self.default_tz])[0]
+        try:
+            ZoneInfo(tz_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            return 400, {}, b"Unknown time zone\n"
+
+        version = self.data_version(profile_id)
+        if version is None:
+            return 404, {}, b"No such profile\n"
+
+        etag = feed_etag(profile_id, tz_name, version)
+        cached = self.cache.get((profile_id, tz_name))
+        if etag_matches(headers.get('If-None-Match'), etag):
+            return 304, {'ETag': etag}, b""
+
+        if headers.get('If-None-Match') is None and headers.get('If-Modified-Since') and cached is not None and cached['version'] == version:
+            try:
+                since = parsedate_to_datetime(headers.get('If-Modified-Since'))
+            except (TypeError, ValueError):
+                since = None
+            if since is not None and since.tzinfo is not None and since >= cached['last_modified']:
+                return 304, {'ETag': etag, 'Last-Modified': format_datetime(cached['last_modified'], usegmt=True)}, b""
+
+        entry = self.entry(profile_id, tz_name, version)
+        return 200, {
+            'Content-Type': 'text/calendar; charset=utf-8',
+            'ETag': etag,
+            'Last-Modified': format_datetime(entry['last_modified'], usegmt=True),
+            'Cache-Control': 'no-cache'
+        }, entry['body']
+
+class FeedRequestHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send(include_body=True)
+
+    def do_HEAD(self):
+        self.send(include_body=False)
+
+    def send(self, include_body):
+        try:
+            status, headers, body = self.server.feed.respond(self.path, self.headers)
+        except Exception:
+            status, headers, body = 500, {}, b"Could not build the calendar feed\n"
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        if status != 304:
+            self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        if include_body and status != 304:
+            self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+class ICalFeedServer(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, feed):
+        super().__init__(address, FeedRequestHandler)
+        self.feed = feed
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.serve_forever, name='skedcheck-ical-feed', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
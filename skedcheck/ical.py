@@ -0,0 +1,378 @@
+import io
+import re
+import threading
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+from . import perf
+from .times import hours_to_hhmm
+
+# iCal import. Airline calendar exports are scanned line by line for VEVENT blocks, keeping
+# only DTSTART/DTEND/SUMMARY/DESCRIPTION, so multi-year files never become a full object
+# model. Files the scanner doesn't follow (no single VCALENDAR, unknown TZIDs, flights
+# without DTEND, ...) are handed to the ics library instead, which is only imported then.
+ICAL_FLIGHT_RE = re.compile(r'(\w{2,3})\s*(\d+)\s*([A-Z]{3})-([A-Z]{3})')
+ICAL_TIME_RE = re.compile(r'(\d{4})(\d{2})(\d{2})(?:T(\d{2})(\d{2})(\d{2})(Z?))?$')
+ICAL_TEXT_ESCAPE_RE = re.compile(r'\\([\\;,nN])')
+ICAL_FIELDS = ('DTSTART', 'DTEND', 'SUMMARY', 'DESCRIPTION')
+ROTATION_GAP_HOURS = 36
+
+class UnusualICal(ValueError):
+    pass
+
+def unfold_lines(lines):
+    # A line starting with a space or tab continues the one before it (RFC 5545 folding).
+    # Blank lines are dropped, as ics drops them.
+    current = None
+    for line in lines:
+        line = line.rstrip('\r\n')
+        if not line.strip():
+            continue
+        if current is not None and line[:1] in (' ', '\t'):
+            current += line[1:]
+            continue
+        if current is not None:
+            yield current
+        current = line
+    if current is not None:
+        yield current
+
+def split_content_line(line):
+    # NAME;PARAM=VALUE;...:VALUE -> (NAME, {PARAM: VALUE}, VALUE). Quoted parameter values may
+    # hold ':' and ';'. None for lines without a value.
+    colon = line.find(':')
+    semi = line.find(';')
+    if colon < 0:
+        return None
+    if semi < 0 or semi > colon:
+        return line[:colon].upper(), {}, line[colon + 1:]
+    params = {}
+    i = semi
+    while i < len(line) and line[i] == ';':
+        eq = line.find('=', i)
+        if eq < 0:
+            return None
+        j = eq + 1
+        if line[j:j + 1] == '"':
+            close = line.find('"', j + 1)
+            if close < 0:
+                return None
+            value, j = line[j + 1:close], close + 1
+        else:
+            k = j
+            while k < len(line) and line[k] not in ';:':
+                k += 1
+            value, j = line[j:k], k
+        params[line[i + 1:eq].upper()] = value
+        i = j
+    if i >= len(line) or line[i] != ':':
+        return None
+    return line[:semi].upper(), params, line[i + 1:]
+
+def ical_text(value):
+    return ICAL_TEXT_ESCAPE_RE.sub(lambda m: '\n' if m.group(1) in 'nN' else m.group(1), value)
+
+def ical_datetime(params, value):
+    # DATE-TIME in UTC, with a TZID, or floating; plain DATEs are midnight. Floating times and
+    # dates are read as UTC, as ics reads them.
+    match = ICAL_TIME_RE.match(value.strip())
+    if not match:
+        raise UnusualICal(f"Unreadable time {value!r}")
+    year, month, day, hour, minute, second, utc = match.groups()
+    if hour is None:
+        return datetime(int(year), int(month), int(day), tzinfo=UTC)
+    tz = UTC
+    if not utc and 'TZID' in params:
+        try:
+            tz = ZoneInfo(params['TZID'])
+        except (ValueError, KeyError):
+            raise UnusualICal(f"Unknown TZID {params['TZID']!r}")
+    return datetime(int(year), int(month), int(day), int(hour), int(minute), int(second), tzinfo=tz)
+
+def scan_vevents(lines):
+    # Yields {field: (params, value)} for each VEVENT, holding only ICAL_FIELDS. Properties of
+    # components nested in an event (VALARM) are skipped.
+    calendars = 0
+    event = None
+    nested = 0
+    for line in unfold_lines(lines):
+        parts = split_content_line(line)
+        if parts is None:
+            continue
+        name, params, value = parts
+        if name == 'BEGIN':
+            component = value.strip().upper()
+            if event is not None:
+                nested += 1
+            elif component == 'VCALENDAR':
+                calendars += 1
+                if calendars > 1:
+                    raise UnusualICal("Several calendars in one file")
+            elif component == 'VEVENT':
+                event = {}
+        elif name == 'END':
+            if event is None:
+                continue
+            if nested:
+                nested -= 1
+            elif value.strip().upper() == 'VEVENT':
+                yield event
+                event = None
+        elif event is not None and not nested and name in ICAL_FIELDS:
+            event[name] = (params, value)
+    if not calendars:
+        raise UnusualICal("No VCALENDAR")
+
+def stream_flight_events(lines):
+    # (flight match, departure, arrival) for each flight event, in file order.
+    for event in scan_vevents(lines):
+        summary = ical_text(event['SUMMARY'][1]) if 'SUMMARY' in event else ""
+        description = ical_text(event['DESCRIPTION'][1]) if 'DESCRIPTION' in event else ""
+        match = ICAL_FLIGHT_RE.search(f"{summary} {description}")
+        if match:
+            if 'DTSTART' not in event or 'DTEND' not in event:
+                raise UnusualICal("Flight event without DTSTART/DTEND")
+            yield match, ical_datetime(*event['DTSTART']), ical_datetime(*event['DTEND'])
+
+def ics_flight_events(file_contents):
+    from ics import Calendar
+    cal = Calendar(file_contents)
+    for event in sorted(cal.events, key=lambda e: e.begin):
+        match = ICAL_FLIGHT_RE.search(f"{event.name or ''} {event.description or ''}")
+        if match:
+            yield match, event.begin.datetime, event.end.datetime
+
+def ical_flights(flight_events, registry, skipped):
+    # Flight dicts for save_rotation (plus dep_utc/arr_utc for grouping). Flights with an
+    # unknown airport go to skipped as (departure, message).
+    for match, dep_utc, arr_utc in flight_events:
+        flt_num = match.group(2)
+        dep_apt = match.group(3)
+        arr_apt = match.group(4)
+        
+        if dep_apt not in registry.tz_names or arr_apt not in registry.tz_names:
+            skipped.append((dep_utc, f"Skipping flight {flt_num} ({dep_apt}-{arr_apt}) on {dep_utc.date()}: Unknown airport code. Please add it manually."))
+            continue
+        
+        dep_local = dep_utc.astimezone(registry.zone(dep_apt))
+        arr_local = arr_utc.astimezone(registry.zone(arr_apt))
+        
+        block_hours = (arr_utc - dep_utc).total_seconds() / 3600
+        
+        yield {
+            'date': dep_local.strftime('%Y-%m-%d'),
+            'dep': dep_apt,
+            'dep_time': dep_local.strftime('%H:%M'),
+            'arr': arr_apt,
+            'arr_time': arr_local.strftime('%H:%M'),
+            'arr_date': arr_local.strftime('%Y-%m-%d'),
+            'report_time': 'MANUAL',
+            'report_date': dep_local.strftime('%Y-%m-%d'),
+            'block': block_hours,
+            'turn': 0.5,
+            'flt': flt_num,
+            'dep_utc': dep_utc,
+            'arr_utc': arr_utc
+        }
+
+def group_rotations(flights):
+    # Flights in departure order; a gap of ROTATION_GAP_HOURS or more starts a new rotation.
+    rotation = []
+    last_arrival = None
+    for flight in flights:
+        if rotation and (flight['dep_utc'] - last_arrival).total_seconds() >= ROTATION_GAP_HOURS * 3600:
+            yield rotation
+            rotation = []
+        rotation.append(flight)
+        last_arrival = flight['arr_utc']
+    if rotation:
+        yield rotation
+
+def parse_ical_rotations(file_contents, registry):
+    # Flight events grouped into rotations (a gap of 36h or more starts a new one). Returns the
+    # rotations, ready for save_rotation, and a message for every flight that was skipped.
+    skipped = []
+    try:
+        with perf.stage('ical_scan'):
+            flights = sorted(ical_flights(stream_flight_events(io.StringIO(file_contents)), registry, skipped), key=lambda f: f['dep_utc'])
+    except UnusualICal:
+        perf.count('ical_ics_fallbacks')
+        skipped = []
+        with perf.stage('ical_ics'):
+            flights = sorted(ical_flights(ics_flight_events(file_contents), registry, skipped), key=lambda f: f['dep_utc'])
+    
+    rotations = list(group_rotations(flights))
+    for rot in rotations:
+        for f in rot:
+            f.pop('dep_utc', None)
+            f.pop('arr_utc', None)
+    
+    return rotations, [message for _, message in sorted(skipped, key=lambda s: s[0])]
+
+UTC = ZoneInfo('UTC')
+UID_DOMAIN = 'skedcheck'
+VEVENT_CACHE_ENTRIES = 20000
+
+def ical_utc(dt):
+    return dt.astimezone(UTC).strftime('%Y%m%dT%H%M%SZ')
+
+def db_timestamp(value):
+    # SQLite CURRENT_TIMESTAMP values are UTC without an offset; missing or unparseable -> None.
+    if not isinstance(value, str) or not value:
+        return None
+    try:
+        dt = datetime.fromisoformat(value)
+    except ValueError:
+        return None
+    return dt.replace(tzinfo=UTC) if dt.tzinfo is None else dt.astimezone(UTC)
+
+def uid_part(value):
+    return re.sub(r'[^A-Za-z0-9_.-]', '_', str(value))
+
+def duty_uid(duty):
+    # UIDs come from what identifies the duty (rotation + start date + duty day, or the
+    # blackout block + day) instead of being random, so a re-import or feed refresh updates
+    # events in place rather than adding copies.
+    if duty['type'] == 'flight':
+        first_day = duty['flights'][0]['date'].replace('-', '')
+        return f"{uid_part(duty['rotation_id'])}-{duty['rotation_start_date'].replace('-', '')}-{first_day}@{UID_DOMAIN}"
+    block = duty.get('block_id') or duty.get('blackout_id')
+    return f"{duty['type']}-{uid_part(block)}-{duty['report_utc'].astimezone(UTC).strftime('%Y%m%d')}@{UID_DOMAIN}"
+
+def vacation_uid(event):
+    return f"vacation-{uid_part(event.get('block_id') or event['id'])}-{event['start_utc'].strftime('%Y%m%d')}@{UID_DOMAIN}"
+
+class VEventCache:
+    # Rendered VEVENT text keyed on the event's UID, its last-modified time and everything else
+    # that goes into it, so regenerating an export only renders the duties that changed.
+    # Shared by every session (and the feed thread), hence the lock.
+    def __init__(self, max_entries=VEVENT_CACHE_ENTRIES):
+        self.max_entries = max_entries
+        self.fragments = OrderedDict()
+        self.lock = threading.Lock()
+
+    def get(self, key, render):
+        with self.lock:
+            text = self.fragments.get(key)
+            if text is not None:
+                self.fragments.move_to_end(key)
+                return text
+        text = render()
+        perf.count('vevents_rendered')
+        with self.lock:
+            self.fragments[key] = text
+            while len(self.fragments) > self.max_entries:
+                self.fragments.popitem(last=False)
+        return text
+
+    def clear(self):
+        with self.lock:
+            self.fragments.clear()
+
+VEVENT_CACHE = VEventCache()
+
+def revision_lines(modified):
+    # DTSTAMP follows LAST-MODIFIED so an unchanged event renders byte-identical every time;
+    # SEQUENCE is the modification time in epoch seconds, which only ever goes up.
+    if modified is None:
+        return [f"DTSTAMP:{ical_utc(datetime.now(UTC))}", "SEQUENCE:0"]
+    stamp = ical_utc(modified)
+    return [f"DTSTAMP:{stamp}", f"LAST-MODIFIED:{stamp}", f"SEQUENCE:{int(modified.timestamp())}"]
+
+def render_duty(duty, uid, modified):
+    start_utc = duty['report_utc']
+    end_utc = duty['release_utc']
+    
+    if duty['type'] == 'flight':
+        fdp_flights = duty['flights']
+        first_flight = fdp_flights[0]
+        last_flight = fdp_flights[-1]
+        
+        route = f"{first_flight['dep']}-{last_flight['arr']}"
+        if len(fdp_flights) > 1:
+            route = f"{first_flight['dep']}...{last_flight['arr']}"
+        
+        summary = f"✈️ {duty['rotation_id']} ({route})"
+        
+        description_parts = [
+            f"Rotation: {duty['rotation_id']}",
+            f"FDP: {hours_to_hhmm(duty['duty_hours'])}",
+            f"Block: {hours_to_hhmm(duty['block'])}",
+            "--- Flights ---"
+        ]
+        for f in fdp_flights:
+            flt_num = f.get('flt', f.get('flt_num', ''))
+            description_parts.append(
+                f" {flt_num} {f['dep']} {f['dep_time']} - {f['arr']} {f['arr_time']}"
+            )
+        
+        description = "\\n".join(description_parts)
+        location = f"{first_flight['dep']} to {last_flight['arr']}"
+    elif duty['type'] == 'training':
+        summary = f" 🧑‍✈️ TRAINING: {duty['rotation_id']}"
+        description = "Training Duty"
+        location = "Training Center"
+    else:
+        summary = f" RES: {duty['rotation_id']}"
+        description = "Reserve Duty"
+        location = "Base"
+    
+    return "\n".join([
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        *revision_lines(modified),
+        f"DTSTART:{ical_utc(start_utc)}",
+        f"DTEND:{ical_utc(end_utc)}",
+        f"SUMMARY:{summary}",
+        f"DESCRIPTION:{description}",
+        f"LOCATION:{location}",
+        "END:VEVENT"
+    ])
+
+def render_vacation(event, uid, modified):
+    return "\n".join([
+        "BEGIN:VEVENT",
+        f"UID:{uid}",
+        *revision_lines(modified),
+        f"DTSTART;VALUE=DATE:{event['start_utc'].strftime('%Y%m%d')}",
+        f"DTEND;VALUE=DATE:{(event['end_utc'] + timedelta(days=1)).strftime('%Y%m%d')}",
+        "SUMMARY:🌴 VACATION",
+        "DESCRIPTION:Vacation Days",
+        "END:VEVENT"
+    ])
+
+def generate_ical_export(processed_duties, calendar_blackouts, cache=VEVENT_CACHE):
+    cal_lines = [
+        "BEGIN:VCALENDAR",
+        "VERSION:2.0",
+        "PRODID:-//SkedCheckApp//EN",
+    ]
+    
+    for duty in processed_duties:
+        if duty['type'] == 'flight':
+            if not duty['flights']:
+                continue
+            modified = db_timestamp(duty.get('rotation_updated_at'))
+            content = (duty['rotation_id'], duty['block'], tuple(
+                (f.get('flt', f.get('flt_num', '')), f['dep'], f['dep_time'], f['arr'], f['arr_time'])
+                for f in duty['flights']
+            ))
+        elif duty['type'] in ('training', 'reserve'):
+            modified = db_timestamp(duty.get('updated_at'))
+            content = duty['rotation_id']
+        else:
+            continue
+        uid = duty_uid(duty)
+        key = (uid, modified, duty['report_utc'], duty['release_utc'], content)
+        cal_lines.append(cache.get(key, lambda: render_duty(duty, uid, modified)))
+    
+    for event in calendar_blackouts:
+        if event['type'] == 'vacation':
+            uid = vacation_uid(event)
+            modified = db_timestamp(event.get('updated_at'))
+            key = (uid, modified, event['start_utc'], event['end_utc'])
+            cal_lines.append(cache.get(key, lambda: render_vacation(event, uid, modified)))
+    
+    cal_lines.append("END:VCALENDAR")
+    return "\n".join(cal_lines)
@@ -0,0 +1,718 @@
+from bisect import bisect_left, bisect_right
+from collections import Counter
+from datetime import datetime
+from fractions import Fraction
+
+import numpy as np
+
+from . import perf
+
+BLOCK_WINDOW_HOURS = 672
+BLOCK_LIMIT_HOURS = 100.0
+FDP_WINDOW_HOURS = 168
+FDP_LIMIT_HOURS = 60.0
+REST_WINDOW_HOURS = 168
+MIN_REST_HOURS = 30
+
+BLOCK_LIMIT_SECONDS = round(BLOCK_LIMIT_HOURS * 3600)
+FDP_LIMIT_SECONDS = round(FDP_LIMIT_HOURS * 3600)
+
+# Block and FDP are accumulated in whole seconds so sums and differences of windows stay exact
+# and a window holding exactly the limit compares equal to it. Hours are produced once, at the end.
+def _seconds(hours):
+    return round(hours * 3600)
+
+def _whole(value):
+    # ints have a denominator of 1 too
+    return value.numerator if value.denominator == 1 else value
+
+def _exact(t):
+    # Epoch seconds as an int (duty times always are whole seconds), else an exact Fraction.
+    if isinstance(t, int):
+        return t
+    t = float(t)
+    return int(t) if t.is_integer() else Fraction(t)
+
+def _ratio(numerator, denominator):
+    if isinstance(numerator, int) and isinstance(denominator, int) and numerator % denominator == 0:
+        return numerator // denominator
+    return _whole(Fraction(numerator, denominator))
+
+def _hours(seconds):
+    if isinstance(seconds, Fraction):
+        return float(seconds / 3600)
+    return seconds / 3600
+
+def _overlap_seconds(start, end, seconds, window_start, window_end):
+    overlap_start = max(start, window_start)
+    overlap_end = min(end, window_end)
+    if overlap_end > overlap_start:
+        return _ratio(seconds * (_exact(overlap_end) - _exact(overlap_start)), _exact(end) - _exact(start))
+    return 0
+
+class CumulativeTimeline:
+    # Running total of amounts (hours) spread evenly over [start, end] intervals (UTC epoch
+    # seconds). seconds_at() interpolates between prefix sums at sorted breakpoints, so the
+    # amount falling inside any window is two binary searches away. Totals are kept exactly, in
+    # seconds: whole numbers, or a Fraction inside an interval whose amount does not divide evenly.
+    def __init__(self, intervals):
+        deltas = {}
+        for start, end, amount in intervals:
+            seconds = _seconds(amount)
+            if end <= start or seconds == 0:
+                continue
+            start, end = _exact(start), _exact(end)
+            deltas.setdefault(start, []).append(((seconds, end - start), 1))
+            deltas.setdefault(end, []).append(((seconds, end - start), -1))
+            
+        # Rates are kept as (numerator, denominator) per segment; a Fraction is only built where
+        # intervals with uneven rates overlap.
+        self.times = sorted(deltas)
+        self.values = []
+        self.rate_nums = []
+        self.rate_dens = []
+        total = 0
+        num, den = 0, 1
+        active = {}
+        prev_t = None
+        for t in self.times:
+            if num:
+                # total is an int or a Fraction that is not whole, so only a fractional step can make it whole.
+                step_seconds = num * (t - prev_t)
+                if step_seconds % den:
+                    total = _whole(total + Fraction(step_seconds, den))
+                else:
+                    total += step_seconds // den
+            for key, step in deltas[t]:
+                count = active.get(key, 0) + step
+                if count:
+                    active[key] = count
+                else:
+                    del active[key]
+            if not active:
+                num, den = 0, 1
+            elif len(active) == 1:
+                (seconds, duration), count = next(iter(active.items()))
+                num, den = seconds * count, duration
+            else:
+                rate = sum(Fraction(seconds * count, duration) for (seconds, duration), count in active.items())
+                num, den = rate.numerator, rate.denominator
+            self.values.append(total)
+            self.rate_nums.append(num)
+            self.rate_dens.append(den)
+            prev_t = t
+        self.times_arr = np.array([float(t) for t in self.times], dtype=np.float64)
+        self.values_arr = np.array([float(v) for v in self.values], dtype=np.float64)
+        self.rate_num = np.array(self.rate_nums, dtype=np.float64)
+        self.rate_den = np.array(self.rate_dens, dtype=np.float64)
+    
+    def seconds_at(self, t):
+        t = _exact(t)
+        i = bisect_right(self.times, t) - 1
+        if i < 0:
+            return 0
+        if not self.rate_nums[i]:
+            return self.values[i]
+        return _whole(self.values[i] + _ratio(self.rate_nums[i] * (t - self.times[i]), self.rate_dens[i]))
+    
+    def value_at(self, t):
+        return _hours(self.seconds_at(t))
+    
+    def _split_many(self, ts):
+        # Breakpoint totals and the share accrued since, kept apart so a window's value does not
+        # pick up rounding from how much came before it.
+        ts = np.asarray(ts, dtype=np.float64)
+        if not len(self.times):
+            return np.zeros(len(ts)), np.zeros(len(ts))
+        i = np.searchsorted(self.times_arr, ts, side='right') - 1
+        j = np.maximum(i, 0)
+        base = np.where(i < 0, 0.0, self.values_arr[j])
+        accrued = np.where(i < 0, 0.0, self.rate_num[j] * (ts - self.times_arr[j]) / self.rate_den[j])
+        return base, accrued
+    
+    def values_at(self, ts):
+        # value_at over an array of times.
+        base, accrued = self._split_many(ts)
+        return (base + accrued) / 3600
+    
+    def window_seconds(self, window_start, window_end):
+        return _whole(self.seconds_at(window_end) - self.seconds_at(window_start))
+    
+    def window(self, window_start, window_end):
+        return _hours(self.window_seconds(window_start, window_end))
+    
+    def windows_seconds(self, window_starts, window_ends):
+        base_start, accrued_start = self._split_many(window_starts)
+        base_end, accrued_end = self._split_many(window_ends)
+        return (base_end - base_start) + (accrued_end - accrued_start)
+    
+    def windows(self, window_starts, window_ends):
+        return self.windows_seconds(window_starts, window_ends) / 3600
+
+class RangeMinTable:
+    # Sparse table over a static list: the minimum of any half-open slice in O(1).
+    def __init__(self, values):
+        self.levels = [list(values)]
+        span = 1
+        while span * 2 <= len(values):
+            prev = self.levels[-1]
+            self.levels.append([min(prev[i], prev[i + span]) for i in range(len(prev) - span)])
+            span *= 2
+        self.table = np.full((len(self.levels), max(len(values), 1)), np.inf)
+        for level, row in enumerate(self.levels):
+            self.table[level, :len(row)] = row
+        self.level_of = np.array([0] + [length.bit_length() - 1 for length in range(1, len(values) + 1)], dtype=np.int64)
+            
+    def query(self, lo, hi):
+        level = (hi - lo).bit_length() - 1
+        row = self.levels[level]
+        return min(row[lo], row[hi - (1 << level)])
+    
+    def query_many(self, lo, hi):
+        # query() over arrays of bounds; empty slices give +inf.
+        lo = np.asarray(lo, dtype=np.int64)
+        hi = np.asarray(hi, dtype=np.int64)
+        out = np.full(len(lo), np.inf)
+        ok = hi > lo
+        if ok.any():
+            lo, hi = lo[ok], hi[ok]
+            level = self.level_of[hi - lo]
+            out[ok] = np.minimum(self.table[level, lo], self.table[level, hi - (1 << level)])
+        return out
+
+DUTY_TYPE_CODES = {'flight': 0, 'training': 1, 'reserve': 2}
+
+class DutyTable:
+    # Columnar copy of a processed_duties list, sorted by report time. Times are int64 UTC
+    # epoch seconds; leg columns are flattened with leg_duty pointing back at the duty row.
+    # Iterating or indexing still yields the original duty dicts, which the calendar and
+    # exports read for flight details.
+    __slots__ = (
+        'duties', 'report', 'release', 'dep', 'arr', 'type_code', 'block', 'rotation_idx',
+        'leg_duty', 'leg_dep', 'leg_arr', 'leg_block'
+    )
+    
+    def __init__(self, processed_duties):
+        self.duties = sorted(processed_duties, key=lambda d: d['report_utc'])
+        n = len(self.duties)
+        self.report = np.fromiter((d['report_utc'].timestamp() for d in self.duties), dtype=np.int64, count=n)
+        self.release = np.fromiter((d['release_utc'].timestamp() for d in self.duties), dtype=np.int64, count=n)
+        self.dep = np.fromiter((d['dep_utc'].timestamp() for d in self.duties), dtype=np.int64, count=n)
+        self.arr = np.fromiter((d['arr_utc'].timestamp() for d in self.duties), dtype=np.int64, count=n)
+        self.type_code = np.fromiter((DUTY_TYPE_CODES.get(d['type'], -1) for d in self.duties), dtype=np.int8, count=n)
+        self.block = np.fromiter((d['block'] for d in self.duties), dtype=np.float64, count=n)
+        
+        rotation_ids = {}
+        self.rotation_idx = np.fromiter(
+            (rotation_ids.setdefault(d['rotation_db_id'], len(rotation_ids)) if 'rotation_db_id' in d else -1 for d in self.duties),
+            dtype=np.int32, count=n
+        )
+        
+        legs = []
+        for i, duty in enumerate(self.duties):
+            for flight in duty.get('flights', []) or ([duty['flight']] if duty.get('flight') else []):
+                if not flight or not flight.get('dep_utc') or not flight.get('arr_utc'):
+                    continue
+                legs.append((i, flight['dep_utc'].timestamp(), flight['arr_utc'].timestamp(), flight.get('block', 0)))
+        self.leg_duty = np.array([leg[0] for leg in legs], dtype=np.int32)
+        self.leg_dep = np.array([leg[1] for leg in legs], dtype=np.int64)
+        self.leg_arr = np.array([leg[2] for leg in legs], dtype=np.int64)
+        self.leg_block = np.array([leg[3] for leg in legs], dtype=np.float64)
+        
+    def __len__(self):
+        return len(self.duties)
+    
+    def __getitem__(self, i):
+        return self.duties[i]
+    
+    def __iter__(self):
+        return iter(self.duties)
+
+# Longest FAR 117 window a calendar day looks through, backward or forward.
+LEGALITY_REACH_HOURS = max(BLOCK_WINDOW_HOURS, FDP_WINDOW_HOURS, REST_WINDOW_HOURS)
+
+def day_bounds(day_data, base_tz):
+    day_start_ts = datetime(day_data.year, day_data.month, day_data.day, 0, 0, 0, tzinfo=base_tz).timestamp()
+    day_end_ts = datetime(day_data.year, day_data.month, day_data.day, 23, 59, 59, tzinfo=base_tz).timestamp()
+    return day_start_ts, day_end_ts
+
+class RollingWindowIndex:
+    # Precomputed FAR 117 rolling-window state for a DutyTable (or a processed_duties list).
+    # Block accrues evenly across each leg (dep -> arr), FDP across each flight duty
+    # (report -> release), matching the partial-overlap rules of the calendar checks.
+    def __init__(self, duties):
+        table = duties if isinstance(duties, DutyTable) else DutyTable(duties)
+        self.table = table
+        self.duties = table.duties
+        self.report_ts = table.report.tolist()
+        self.release_ts = table.release.tolist()
+        self.inverted_idx = np.flatnonzero(table.release < table.report).tolist()
+        
+        is_flight = table.type_code == DUTY_TYPE_CODES['flight']
+        self.flight_idx = np.flatnonzero(is_flight).tolist()
+        self.rest_idx = np.flatnonzero(is_flight | (table.type_code == DUTY_TYPE_CODES['training'])).tolist()
+        self.duty_fdp = {
+            i: (self.report_ts[i], self.release_ts[i], (self.release_ts[i] - self.report_ts[i]) / 3600)
+            for i in np.flatnonzero(is_flight & (table.release > table.report)).tolist()
+        }
+        
+        # Block only accrues on flight duties with block time, over legs that actually fly.
+        self.duty_legs = {i: [] for i in np.flatnonzero(is_flight & (table.block > 0)).tolist()}
+        leg_mask = (table.leg_block != 0) & (table.leg_arr > table.leg_dep)
+        all_legs = []
+        for i, dep, arr, block in zip(table.leg_duty[leg_mask].tolist(), table.leg_dep[leg_mask].tolist(),
+                                      table.leg_arr[leg_mask].tolist(), table.leg_block[leg_mask].tolist()):
+            if i in self.duty_legs:
+                self.duty_legs[i].append((dep, arr, block))
+                all_legs.append((dep, arr, block))
+                
+        self.block = CumulativeTimeline(all_legs)
+        self.fdp = CumulativeTimeline(self.duty_fdp.values())
+        self.flight_report_ts = [self.report_ts[i] for i in self.flight_idx]
+        self.rest_report_ts = [self.report_ts[i] for i in self.rest_idx]
+        self.max_rest_duty_secs = max([self.release_ts[i] - self.report_ts[i] for i in self.rest_idx] + [0.0])
+        
+        # Interval arrays (duty row, start, end, seconds) for the whole-grid path.
+        leg_rows = [i for i in sorted(self.duty_legs) for _ in self.duty_legs[i]]
+        self.leg_arrays = (
+            np.array(leg_rows, dtype=np.int64),
+            np.array([leg[0] for i in sorted(self.duty_legs) for leg in self.duty_legs[i]], dtype=np.float64),
+            np.array([leg[1] for i in sorted(self.duty_legs) for leg in self.duty_legs[i]], dtype=np.float64),
+            np.array([_seconds(leg[2]) for i in sorted(self.duty_legs) for leg in self.duty_legs[i]], dtype=np.float64)
+        )
+        fdp_rows = sorted(self.duty_fdp)
+        self.fdp_arrays = (
+            np.array(fdp_rows, dtype=np.int64),
+            np.array([self.duty_fdp[i][0] for i in fdp_rows], dtype=np.float64),
+            np.array([self.duty_fdp[i][1] for i in fdp_rows], dtype=np.float64),
+            np.array([_seconds(self.duty_fdp[i][2]) for i in fdp_rows], dtype=np.float64)
+        )
+        self.flight_report_arr = np.array(self.flight_report_ts, dtype=np.float64)
+        
+        # 30-in-168: for rest/training duties in report order, the latest release so far and
+        # the gap each report opens after it. A window's longest rest is a range max of gaps.
+        self.rest_report_arr = np.array(self.rest_report_ts, dtype=np.float64)
+        rest_release = np.array([self.release_ts[i] for i in self.rest_idx], dtype=np.float64)
+        self.rest_release_max = np.maximum.accumulate(rest_release) if len(rest_release) else rest_release
+        self.rest_prev_release = np.concatenate(([-np.inf], self.rest_release_max[:-1])) if len(rest_release) else rest_release
+        self.rest_gaps = RangeMinTable((self.rest_prev_release - self.rest_report_arr).tolist())
+        
+        # Forward constraint index: slack left (in seconds) in the lookback window ending at
+        # each future flight duty report, ready for range-min queries.
+        self.block_slack = RangeMinTable([
+            BLOCK_LIMIT_SECONDS - self.block.window_seconds(t - BLOCK_WINDOW_HOURS * 3600, t) for t in self.flight_report_ts
+        ])
+        self.fdp_slack = RangeMinTable([
+            FDP_LIMIT_SECONDS - self.fdp.window_seconds(t - FDP_WINDOW_HOURS * 3600, t) for t in self.flight_report_ts
+        ])
+        
+    def block_used(self, window_start, window_end):
+        return self.block.window(window_start, window_end)
+    
+    def fdp_used(self, window_start, window_end):
+        return self.fdp.window(window_start, window_end)
+    
+    def contained_duties(self, start_ts, end_ts):
+        lo = bisect_left(self.report_ts, start_ts)
+        hi = bisect_right(self.report_ts, end_ts)
+        contained = [i for i in range(lo, hi) if self.release_ts[i] <= end_ts]
+        # A duty released before its report (bad leg times) passes the same
+        # report/release test wherever its report falls.
+        contained += [i for i in self.inverted_idx if self.report_ts[i] > end_ts and self.release_ts[i] <= end_ts]
+        return contained
+    
+    def min_future_slack(self, slack_table, timeline, window_hours, limit, excluded, t_now):
+        # Smallest slack, in seconds, over the flight duty reports in (t_now, t_now + window].
+        # Each of those windows gets back the share of the excluded (today's) intervals it holds;
+        # check points that hold all of them are answered by one range-min query.
+        window_secs = window_hours * 3600
+        limit = _seconds(limit)
+        excluded = [(start, end, _seconds(amount)) for start, end, amount in excluded]
+        lo = bisect_right(self.flight_report_ts, t_now)
+        hi = bisect_right(self.flight_report_ts, t_now + window_secs)
+        if lo >= hi:
+            return limit
+        if not excluded:
+            return min(limit, slack_table.query(lo, hi))
+        
+        min_slack = limit
+        covered_lo = max(lo, bisect_left(self.flight_report_ts, max(end for _, end, _ in excluded)))
+        covered_hi = min(hi, bisect_right(self.flight_report_ts, min(start for start, _, _ in excluded) + window_secs))
+        if covered_lo < covered_hi:
+            min_slack = min(min_slack, slack_table.query(covered_lo, covered_hi) + sum(amount for _, _, amount in excluded))
+        else:
+            covered_lo = covered_hi = lo
+            
+        for k in list(range(lo, covered_lo)) + list(range(covered_hi, hi)):
+            check_point = self.flight_report_ts[k]
+            window_start = check_point - window_secs
+            used = timeline.window_seconds(window_start, check_point)
+            used -= sum(_overlap_seconds(start, end, seconds, window_start, check_point) for start, end, seconds in excluded)
+            min_slack = min(min_slack, limit - used)
+        return min_slack
+    
+    def added_slack(self, slack_table, timeline, window_hours, limit, added, check_points):
+        # Smallest slack once the added (start, end, amount) intervals are put on top of the
+        # schedule: at the given extra check points, and at every flight duty report whose
+        # lookback reaches them. Reports whose window holds all of them are one range-min query.
+        window_secs = window_hours * 3600
+        limit = _seconds(limit)
+        added = [(start, end, _seconds(amount)) for start, end, amount in added]
+        min_slack = limit
+        for check_point in check_points:
+            window_start = check_point - window_secs
+            used = timeline.window_seconds(window_start, check_point)
+            used += sum(_overlap_seconds(start, end, seconds, window_start, check_point) for start, end, seconds in added)
+            min_slack = min(min_slack, limit - used)
+        if not added:
+            return _hours(min_slack)
+        
+        first_start = min(start for start, _, _ in added)
+        last_end = max(end for _, end, _ in added)
+        lo = bisect_right(self.flight_report_ts, first_start)
+        hi = bisect_left(self.flight_report_ts, last_end + window_secs)
+        covered_lo = max(lo, bisect_left(self.flight_report_ts, last_end))
+        covered_hi = min(hi, bisect_right(self.flight_report_ts, first_start + window_secs))
+        if covered_lo < covered_hi:
+            min_slack = min(min_slack, slack_table.query(covered_lo, covered_hi) - sum(amount for _, _, amount in added))
+        else:
+            covered_lo = covered_hi = lo
+        
+        for k in list(range(lo, covered_lo)) + list(range(covered_hi, hi)):
+            check_point = self.flight_report_ts[k]
+            window_start = check_point - window_secs
+            used = timeline.window_seconds(window_start, check_point)
+            used += sum(_overlap_seconds(start, end, seconds, window_start, check_point) for start, end, seconds in added)
+            min_slack = min(min_slack, limit - used)
+        return _hours(min_slack)
+    
+    def max_rest_before(self, t_now, added=()):
+        # added: extra (report, release) rest duties on top of the schedule's own.
+        window_start = t_now - REST_WINDOW_HOURS * 3600
+        lo = bisect_left(self.rest_report_ts, window_start - self.max_rest_duty_secs)
+        hi = bisect_left(self.rest_report_ts, t_now)
+        relevant = [
+            (self.report_ts[i], self.release_ts[i])
+            for i in (self.rest_idx[k] for k in range(lo, hi)) if self.release_ts[i] > window_start
+        ]
+        if added:
+            relevant = sorted(relevant + [(report, release) for report, release in added if report < t_now and release > window_start])
+        if not relevant:
+            return float(REST_WINDOW_HOURS)
+        
+        rests = []
+        prev_end = window_start
+        for report, release in relevant:
+            if report > prev_end:
+                rests.append((report - prev_end) / 3600)
+            prev_end = max(prev_end, release)
+        if t_now > prev_end:
+            rests.append((t_now - prev_end) / 3600)
+        return max(rests) if rests else float(REST_WINDOW_HOURS)
+    
+    def day_summary(self, day_data, base_tz):
+        # 1. Setup Timestamps for "Today"
+        # We define the reference point 't' as the end of the selected day in UTC.
+        day_start_ts, day_end_ts = day_bounds(day_data, base_tz)
+        return self.summary_between(day_start_ts, day_end_ts)
+    
+    def summary_between(self, day_start_ts, day_end_ts):
+        t_now = day_end_ts
+        
+        # 2. Backward look: what history already uses up to the end of today
+        used_block_backward = self.block.window_seconds(t_now - BLOCK_WINDOW_HOURS * 3600, t_now)
+        used_fdp_backward = self.fdp.window_seconds(t_now - FDP_WINDOW_HOURS * 3600, t_now)
+        
+        # 3. Forward constraint: every future flight duty report is a check point whose
+        # lookback covers today. Duties wholly inside today are the variable we solve
+        # for, so their share of each future window is taken back out.
+        today_duties = self.contained_duties(day_start_ts, day_end_ts)
+        today_legs = [leg for i in today_duties for leg in self.duty_legs.get(i, [])]
+        today_fdp = [self.duty_fdp[i] for i in today_duties if i in self.duty_fdp]
+        
+        min_future_block_slack = self.min_future_slack(
+            self.block_slack, self.block, BLOCK_WINDOW_HOURS, BLOCK_LIMIT_HOURS, today_legs, t_now
+        )
+        min_future_fdp_slack = self.min_future_slack(
+            self.fdp_slack, self.fdp, FDP_WINDOW_HOURS, FDP_LIMIT_HOURS, today_fdp, t_now
+        )
+        
+        # 4. Final Calculation (in seconds, exact; hours only in the result)
+        final_remaining_block = _hours(max(0, min(BLOCK_LIMIT_SECONDS - used_block_backward, min_future_block_slack)))
+        final_remaining_fdp = _hours(max(0, min(FDP_LIMIT_SECONDS - used_fdp_backward, min_future_fdp_slack)))
+        
+        # 5. Rest Calculation (30 in 168, strictly backward from now)
+        max_rest = self.max_rest_before(t_now)
+        has_flight_duty_today = bisect_left(self.flight_report_ts, day_start_ts) < bisect_right(self.flight_report_ts, day_end_ts)
+        
+        fdp_exceeded = used_fdp_backward > FDP_LIMIT_SECONDS
+        rest_conflict = has_flight_duty_today and max_rest < MIN_REST_HOURS
+        
+        return {
+            'min_block': final_remaining_block,
+            'max_block': final_remaining_block, # Max/Min logic can be expanded if 'Today' is variable, currently they are same
+            'min_fdp': final_remaining_fdp,
+            'max_fdp': final_remaining_fdp,
+            'rest_conflict': rest_conflict,
+            'fdp_exceeded': (has_flight_duty_today and fdp_exceeded)
+        }
+    
+    def grid_summaries(self, days, base_tz):
+        bounds = np.array([day_bounds(day_data, base_tz) for day_data in days], dtype=np.float64).reshape(-1, 2)
+        result = self.evaluate_days(bounds[:, 0], bounds[:, 1])
+        return [
+            {
+                'min_block': float(block), 'max_block': float(block),
+                'min_fdp': float(fdp), 'max_fdp': float(fdp),
+                'rest_conflict': bool(rest_conflict), 'fdp_exceeded': bool(fdp_exceeded)
+            }
+            for block, fdp, rest_conflict, fdp_exceeded in zip(
+                result['block_remaining'], result['fdp_remaining'], result['rest_conflict'], result['fdp_exceeded']
+            )
+        ]
+    
+    def evaluate_days(self, day_start_ts, day_end_ts):
+        # Whole-grid version of summary_between. Takes arrays of day boundaries (UTC epoch
+        # seconds, non-overlapping) and returns block/FDP remaining and the two conflict flags
+        # for every day at once, so long horizons cost about the same as the 12-week grid.
+        day_start_ts = np.asarray(day_start_ts, dtype=np.float64)
+        day_end_ts = np.asarray(day_end_ts, dtype=np.float64)
+        n_days = len(day_start_ts)
+        t_now = day_end_ts
+        
+        used_block_backward = self.block.windows_seconds(t_now - BLOCK_WINDOW_HOURS * 3600, t_now)
+        used_fdp_backward = self.fdp.windows_seconds(t_now - FDP_WINDOW_HOURS * 3600, t_now)
+        
+        # Which day (if any) wholly contains each duty.
+        order = np.argsort(day_start_ts, kind='stable')
+        report = self.table.report.astype(np.float64)
+        release = self.table.release.astype(np.float64)
+        k = np.searchsorted(day_start_ts[order], report, side='right') - 1
+        duty_day = np.full(len(report), -1, dtype=np.int64)
+        if n_days:
+            k_ok = np.maximum(k, 0)
+            day_of = order[k_ok]
+            contained = (k >= 0) & (report <= day_end_ts[day_of]) & (release <= day_end_ts[day_of])
+            duty_day[contained] = day_of[contained]
+        
+        min_future_block_slack = self.future_slack_many(
+            self.block_slack, self.block, BLOCK_WINDOW_HOURS, BLOCK_LIMIT_HOURS, self.leg_arrays, duty_day, t_now
+        )
+        min_future_fdp_slack = self.future_slack_many(
+            self.fdp_slack, self.fdp, FDP_WINDOW_HOURS, FDP_LIMIT_HOURS, self.fdp_arrays, duty_day, t_now
+        )
+        
+        final_remaining_block = np.maximum(0.0, np.minimum(BLOCK_LIMIT_SECONDS - used_block_backward, min_future_block_slack))
+        final_remaining_fdp = np.maximum(0.0, np.minimum(FDP_LIMIT_SECONDS - used_fdp_backward, min_future_fdp_slack))
+        
+        max_rest = self.max_rest_many(t_now)
+        has_flight_duty_today = (
+            np.searchsorted(self.flight_report_arr, day_start_ts, side='left')
+            < np.searchsorted(self.flight_report_arr, day_end_ts, side='right')
+        )
+        
+        result = {
+            'block_remaining': final_remaining_block / 3600,
+            'fdp_remaining': final_remaining_fdp / 3600,
+            'rest_conflict': has_flight_duty_today & (max_rest < MIN_REST_HOURS),
+            'fdp_exceeded': has_flight_duty_today & (used_fdp_backward > FDP_LIMIT_SECONDS)
+        }
+        
+        # Whole seconds are exact in float64. A leg whose block time is not its scheduled length
+        # leaves fractions of a second where it crosses a window edge; those days take the exact
+        # scalar path.
+        scalar_days = (final_remaining_block % 1 != 0) | (final_remaining_fdp % 1 != 0)
+        
+        # Duties released before their report (bad leg times) are "today" for every day ending
+        # between release and report, and a rest duty like that is skipped by windows starting
+        # in the same gap. Those days take the scalar path too.
+        if self.inverted_idx and n_days:
+            inverted_release = release[self.inverted_idx][:, None]
+            inverted_report = report[self.inverted_idx][:, None]
+            is_rest = np.isin(self.table.type_code[self.inverted_idx], [DUTY_TYPE_CODES['flight'], DUTY_TYPE_CODES['training']])[:, None]
+            rest_start = t_now[None, :] - REST_WINDOW_HOURS * 3600
+            scalar_days |= (
+                ((inverted_release <= t_now[None, :]) & (t_now[None, :] < inverted_report))
+                | (is_rest & (inverted_release <= rest_start) & (rest_start < inverted_report))
+            ).any(axis=0)
+        for d in np.flatnonzero(scalar_days).tolist():
+            summary = self.summary_between(float(day_start_ts[d]), float(day_end_ts[d]))
+            result['block_remaining'][d] = summary['min_block']
+            result['fdp_remaining'][d] = summary['min_fdp']
+            result['rest_conflict'][d] = summary['rest_conflict']
+            result['fdp_exceeded'][d] = summary['fdp_exceeded']
+        return result
+    
+    def future_slack_many(self, slack_table, timeline, window_hours, limit, intervals, duty_day, t_now):
+        # min_future_slack for every day: check points wholly covering today's intervals and
+        # check points past them are range-min queries; only the few whose window clips
+        # today's intervals are evaluated one by one, with broadcasting. Slack is in seconds.
+        window_secs = window_hours * 3600
+        limit = _seconds(limit)
+        check_points = self.flight_report_arr
+        n_days = len(t_now)
+        lo = np.searchsorted(check_points, t_now, side='right')
+        hi = np.searchsorted(check_points, t_now + window_secs, side='right')
+        
+        rows, starts, ends, amounts = intervals
+        interval_day = duty_day[rows] if len(rows) else np.zeros(0, dtype=np.int64)
+        keep = interval_day >= 0
+        interval_day, starts, ends, amounts = interval_day[keep], starts[keep], ends[keep], amounts[keep]
+        
+        excluded_total = np.bincount(interval_day, weights=amounts, minlength=n_days)
+        excluded_count = np.bincount(interval_day, minlength=n_days)
+        min_start = np.full(n_days, np.inf)
+        max_end = np.full(n_days, -np.inf)
+        np.minimum.at(min_start, interval_day, starts)
+        np.maximum.at(max_end, interval_day, ends)
+        has_excluded = excluded_count > 0
+        
+        result = np.minimum(limit, slack_table.query_many(lo, hi))
+        result = np.where(has_excluded, limit, result)
+        
+        covered_lo = np.maximum(lo, np.searchsorted(check_points, max_end, side='left'))
+        covered_hi = np.minimum(hi, np.searchsorted(check_points, min_start + window_secs, side='right'))
+        covered = has_excluded & (covered_lo < covered_hi)
+        result = np.where(covered, np.minimum(result, slack_table.query_many(covered_lo, covered_hi) + excluded_total), result)
+        covered_lo = np.where(covered, covered_lo, lo)
+        covered_hi = np.where(covered, covered_hi, lo)
+        
+        # Check points at or past max_end + window hold none of today's intervals.
+        clear_from = np.searchsorted(check_points, max_end + window_secs, side='left')
+        partial_ranges = []
+        for range_lo, range_hi in ((lo, covered_lo), (covered_hi, hi)):
+            plain = slack_table.query_many(np.maximum(range_lo, clear_from), range_hi)
+            result = np.where(has_excluded, np.minimum(result, plain), result)
+            partial_ranges.append((range_lo, np.minimum(range_hi, clear_from)))
+            
+        for range_lo, range_hi in partial_ranges:
+            counts = np.where(has_excluded, np.maximum(range_hi - range_lo, 0), 0)
+            if not counts.any():
+                continue
+            pair_day = np.repeat(np.arange(n_days), counts)
+            pair_k = np.repeat(range_lo, counts) + (np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts))
+            check_point = check_points[pair_k]
+            window_start = check_point - window_secs
+            
+            # Pair each check point with its day's intervals.
+            by_day = np.argsort(interval_day, kind='stable')
+            first = np.searchsorted(interval_day[by_day], np.arange(n_days), side='left')
+            per_pair = excluded_count[pair_day]
+            pair_id = np.repeat(np.arange(len(pair_day)), per_pair)
+            offsets = np.arange(per_pair.sum()) - np.repeat(np.cumsum(per_pair) - per_pair, per_pair)
+            interval = by_day[np.repeat(first[pair_day], per_pair) + offsets]
+            
+            overlap_start = np.maximum(starts[interval], window_start[pair_id])
+            overlap_end = np.minimum(ends[interval], check_point[pair_id])
+            share = np.where(
+                overlap_end > overlap_start,
+                amounts[interval] * (overlap_end - overlap_start) / (ends[interval] - starts[interval]),
+                0.0
+            )
+            held = np.bincount(pair_id, weights=share, minlength=len(pair_day))
+            slack = limit - (timeline.windows_seconds(window_start, check_point) - held)
+            np.minimum.at(result, pair_day, slack)
+            
+        return np.where(lo >= hi, limit, result)
+    
+    def max_rest_many(self, t_now):
+        # max_rest_before for every day.
+        window_start = t_now - REST_WINDOW_HOURS * 3600
+        reports = self.rest_report_arr
+        n = len(reports)
+        if not n:
+            return np.full(len(t_now), float(REST_WINDOW_HOURS))
+        before = np.searchsorted(reports, t_now, side='left')
+        after_start = np.searchsorted(reports, window_start, side='right')
+        last_release = np.where(before > 0, self.rest_release_max[np.maximum(before - 1, 0)], -np.inf)
+        any_relevant = last_release > window_start
+        
+        best = np.full(len(t_now), -np.inf)
+        # Reports before any release crosses the window start rest from the window start.
+        split = np.minimum(np.maximum(after_start, np.searchsorted(self.rest_prev_release, window_start, side='right')), before)
+        from_start = split > after_start
+        best = np.where(from_start, (reports[np.maximum(split - 1, 0)] - window_start) / 3600, best)
+        gaps = -self.rest_gaps.query_many(split, before) / 3600
+        best = np.maximum(best, np.where(before > split, gaps, -np.inf))
+        prev_end = np.maximum(window_start, last_release)
+        best = np.maximum(best, np.where(t_now > prev_end, (t_now - prev_end) / 3600, -np.inf))
+        
+        return np.where(any_relevant & (best > 0), best, float(REST_WINDOW_HOURS))
+
+def get_daily_remaining_range(day_data, processed_duties, base_tz):
+    return RollingWindowIndex(processed_duties).day_summary(day_data, base_tz)
+
+def evaluate_days(duties, days, base_tz):
+    # One summary dict per calendar day. `duties` may be the processed duty list, a DutyTable
+    # or an already built RollingWindowIndex.
+    index = duties if isinstance(duties, RollingWindowIndex) else RollingWindowIndex(duties)
+    return index.grid_summaries(list(days), base_tz)
+
+class DaySummaryCache:
+    # Calendar day summaries carried across schedule rebuilds. A duty only moves the numbers of
+    # days whose windows reach it, so when the schedule changes the duties are diffed against the
+    # previous build and only days within LEGALITY_REACH_HOURS of an added or removed duty are dropped.
+    def __init__(self, profile_id, base_tz_str):
+        self.key = (profile_id, base_tz_str)
+        self.index = None
+        self.duty_counts = Counter()
+        self.summaries = {}
+        
+    @staticmethod
+    def duty_signatures(index):
+        return Counter(
+            (duty['type'], index.report_ts[i], index.release_ts[i], tuple(index.duty_legs.get(i, ())))
+            for i, duty in enumerate(index.duties)
+        )
+        
+    def update(self, index, data_window=None):
+        # data_window: (first, last) date of the loaded schedule; days outside it are dropped so
+        # the cache stays the size of what is loaded rather than every day viewed this session.
+        if data_window is not None:
+            first, last = data_window
+            for day in [day for day in self.summaries if not first <= day <= last]:
+                del self.summaries[day]
+        if index is self.index:
+            return
+        counts = self.duty_signatures(index)
+        changed = (counts - self.duty_counts) + (self.duty_counts - counts)
+        self.index = index
+        self.duty_counts = counts
+        if not changed or not self.summaries:
+            return
+        
+        reach = LEGALITY_REACH_HOURS * 3600
+        spans = []
+        for _, report_ts, release_ts, legs in changed:
+            times = [report_ts, release_ts] + [t for dep, arr, _ in legs for t in (dep, arr)]
+            spans.append((min(times) - reach, max(times) + reach))
+        spans.sort()
+        merged = [list(spans[0])]
+        for lo, hi in spans[1:]:
+            if lo <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], hi)
+            else:
+                merged.append([lo, hi])
+        span_starts = [lo for lo, _ in merged]
+        
+        for day, (day_start_ts, day_end_ts, _) in list(self.summaries.items()):
+            k = bisect_right(span_starts, day_end_ts) - 1
+            if k >= 0 and merged[k][1] >= day_start_ts:
+                del self.summaries[day]
+                
+    def grid_summaries(self, days, base_tz):
+        missing = [day_data for day_data in dict.fromkeys(days) if day_data not in self.summaries]
+        perf.count('days_evaluated', len(missing))
+        if missing:
+            for day_data, summary in zip(missing, self.index.grid_summaries(missing, base_tz)):
+                self.summaries[day_data] = day_bounds(day_data, base_tz) + (summary,)
+        return [self.summaries[day_data][2] for day_data in days]
+    
+    def verify(self, days, base_tz):
+        # Debug check: days whose cached summary differs from a fresh full rebuild. Block and FDP
+        # are exact in whole seconds, so the summaries must match exactly.
+        fresh = RollingWindowIndex(self.index.duties)
+        return [
+            day_data for day_data, cached in zip(days, self.grid_summaries(days, base_tz))
+            if cached != fresh.day_summary(day_data, base_tz)
+        ]
@@ -0,0 +1,365 @@
+import calendar
+import re
+from datetime import datetime, time, timedelta
+
+MONTH_NUMBERS = {'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
+                 'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12}
+
+def get_date_for_day(start_date, day):
+    if day < start_date.day:
+        next_month_start = (start_date.replace(day=28) + timedelta(days=4)).replace(day=1)
+        try:
+            return next_month_start.replace(day=day)
+        except ValueError:
+            last_day_of_month = calendar.monthrange(next_month_start.year, next_month_start.month)[1]
+            return next_month_start.replace(day=last_day_of_month)
+    else:
+        try:
+            return start_date.replace(day=day)
+        except ValueError:
+            last_day_of_month = calendar.monthrange(start_date.year, start_date.month)[1]
+            return start_date.replace(day=last_day_of_month)
+
+def find_effective_date(dump_text):
+    match = re.search(r'EFFECTIVE\s+([A-Z]{3})(\d{1,2})', dump_text, re.IGNORECASE)
+    if not match:
+        return None
+    month_str = match.group(1).upper()
+    day = int(match.group(2))
+    month = MONTH_NUMBERS.get(month_str)
+    if not month:
+        return None
+    today = datetime.today().date()
+    current_year = today.year
+    try:
+        potential_date = datetime(current_year, month, day).date()
+        if (potential_date - today).days > 180:
+            return potential_date.replace(year=current_year - 1)
+        elif (today - potential_date).days > 180:
+             return potential_date.replace(year=current_year + 1)
+        else:
+            return potential_date
+    except ValueError:
+        return None
+
+def parse_hhmm_time(time_str):
+    if not isinstance(time_str, str):
+        return None
+        
+    cleaned_str = time_str.replace(":", "").replace(".", "").strip()
+    
+    if not cleaned_str:
+       return None
+       
+    padded_str = cleaned_str.zfill(4)
+    
+    if len(padded_str) == 4 and padded_str.isdigit():
+        try:
+            hh = int(padded_str[0:2])
+            mm = int(padded_str[2:4])
+            if 0 <= hh <= 23 and 0 <= mm <= 59:
+                return time(hh, mm)
+            else:
+                return None
+        except ValueError:
+            return None
+    return None
+
+def parse_time_str_to_float(time_str):
+    if not time_str:
+        return 0.0
+    
+    time_str = time_str.strip()
+    
+    if '.' in time_str:
+        try:
+            parts = time_str.split('.')
+            h = int(parts[0])
+            m_str = parts[1].ljust(2, '0')
+            m = int(m_str[:2])
+            return h + m / 60.0
+        except:
+             pass
+             
+    if ':' in time_str:
+        try:
+            parts = time_str.split(':')
+            h = int(parts[0])
+            m = int(parts[1])
+            return h + m / 60.0
+        except:
+            pass
+            
+    cleaned_str = time_str.replace(':', '').replace('.', '')
+    if cleaned_str.isdigit() and len(cleaned_str) <= 4:
+        padded_str = cleaned_str.zfill(4)
+        h = int(padded_str[:2])
+        m = int(padded_str[2:])
+        return h + m / 60.0
+    
+    try:
+        return float(time_str)
+    except:
+        return 0.0
+
+# Trip dump lines are classified with one anchored pattern: a flight that starts a new day
+# ("12 D 1234 SEA 0700 DEN 1030 2.30"), or a later flight on the same day ("1234 SEA ..."). The
+# day alternative is tried first, so a line that fits both is a day flight. Report-time lines
+# can sit anywhere on a line and are only searched when the line mentions REPORT TIME.
+TRIP_FLIGHT_RE = re.compile(
+    r'^(?:'
+    r'(?P<day>\d{1,2})\s+(?P<indicator>[A-Z]{1,2})?\s*(?P<flt>\d+)\s+(?P<dep>[A-Z]{3})\s*\S*\s*(?P<dep_time>\d{2}:?\d{2})\s+(?P<arr>[A-Z]{3})(?:.\s*)?(?P<arr_time>\d{2}:?\d{2})\s+(?P<block>[\d.:]+)'
+    r'|'
+    r'(?P<sub_flt>\d+)\s+(?P<sub_dep>[A-Z]{3})\s*\S*\s*(?P<sub_dep_time>\d{2}:?\d{2})\s+(?P<sub_arr>[A-Z]{3})(?:.\s*)?(?P<sub_arr_time>\d{2}:?\d{2})\s+(?P<sub_block>[\d.:]+)'
+    r')'
+)
+ACTUAL_REPORT_RE = re.compile(r'ACTUAL REPORT TIME (\d{4})')
+PAY_REPORT_RE = re.compile(r'PAY REPORT TIME (\d{4})/(\d+)')
+LAYOVER_RE = re.compile(r'^\s*(\d+)?\s*([A-Z]{3})\s+([\d.]+)\/(.*)')
+ZERO_BLOCK_INDICATORS = {'D', 'DD', 'L'}
+
+def hhmm_clock(value):
+    h, m = divmod(int(value.replace(':', '')), 100)
+    return h, m, f"{h:02d}:{m:02d}"
+
+def parse_trip_dump(dump_text, effective_date):
+    # dump_text is the pasted text or any iterable of lines (e.g. an open file); either way the
+    # lines are read once. Report times can appear after the flights they apply to, so each
+    # flight's report time is filled in once every line has been seen.
+    start_date = effective_date
+    flights = []
+    flight_days = []
+    report_times = {}
+    header_report = None
+    
+    lines = dump_text.split('\n') if isinstance(dump_text, str) else dump_text
+    
+    current_day = None
+    current_date = None
+    date_str = None
+    last_flight = None
+    for line in lines:
+        line = line.strip()
+        if not line:
+            continue
+        
+        if 'REPORT TIME' in line:
+            if header_report is None and 'ACTUAL REPORT TIME' in line:
+                match = ACTUAL_REPORT_RE.search(line)
+                if match:
+                    header_report = hhmm_clock(match.group(1))[2]
+            match = PAY_REPORT_RE.search(line)
+            if match:
+                report_times[int(match.group(2))] = hhmm_clock(match.group(1))[2]
+        
+        # A layover line belongs to the flight right above it when the airports agree.
+        if last_flight is not None:
+            flight, last_flight = last_flight, None
+            layover_match = LAYOVER_RE.match(line)
+            if layover_match and layover_match.group(2) == flight['arr']:
+                flight['layover_duration'] = layover_match.group(3)
+                flight['hotel'] = layover_match.group(4).strip()
+                continue
+        
+        match = TRIP_FLIGHT_RE.match(line)
+        if match is None:
+            continue
+        if match.group('flt') is not None:
+            current_day = int(match.group('day'))
+            current_date = get_date_for_day(current_date or start_date, current_day)
+            date_str = current_date.strftime('%Y-%m-%d')
+            flt, dep, dep_time, arr, arr_time, block_str = match.group('flt', 'dep', 'dep_time', 'arr', 'arr_time', 'block')
+            indicator = match.group('indicator')
+        elif current_day is not None:
+            flt, dep, dep_time, arr, arr_time, block_str = match.group('sub_flt', 'sub_dep', 'sub_dep_time', 'sub_arr', 'sub_arr_time', 'sub_block')
+            indicator = None
+        else:
+            continue
+        
+        dep_h, dep_m, local_dep = hhmm_clock(dep_time)
+        arr_h, arr_m, local_arr = hhmm_clock(arr_time)
+        arr_date_str = date_str
+        if arr_h * 60 + arr_m < dep_h * 60 + dep_m:
+            arr_date_str = (current_date + timedelta(days=1)).strftime('%Y-%m-%d')
+        
+        block = 0.0 if indicator in ZERO_BLOCK_INDICATORS else parse_time_str_to_float(block_str)
+        
+        last_flight = {
+            'date': date_str,
+            'dep': dep,
+            'dep_time': local_dep,
+            'arr': arr,
+            'arr_time': local_arr,
+            'arr_date': arr_date_str,
+            'report_time': None,
+            'report_date': date_str,
+            'block': block,
+            'turn': 0.5,
+            'flt': flt,
+            'layover_duration': None,
+            'hotel': None
+        }
+        flights.append(last_flight)
+        flight_days.append(current_day)
+    
+    if header_report and start_date.day not in report_times:
+        report_times[start_date.day] = header_report
+    for flight, day in zip(flights, flight_days):
+        flight['report_time'] = report_times.get(day) or (header_report if day == start_date.day else 'MANUAL')
+        
+    return flights
+
+# Bid packet flight line: optional day letter (A = the pairing's start date), optional I
+# (international) and DH/L (deadhead/limo, no block credit), then flight, route, times, block
+# and an optional turn. A pairing header is any line carrying "#<pairing id>", optionally with
+# the start date as DDMMM.
+BID_FLIGHT_RE = re.compile(
+    r'^\s*([A-Z])?\s*(I)?\s*(DH|L)?\s*(\d+)\s+([A-Z]{3})\s+(\d{4})\s+([A-Z]{3})\s+(\d{4})\s+([\d.]+)\s*([\d.]+)?'
+)
+CHECK_IN_RE = re.compile(r'CHECK-IN AT (\d{2})\.(\d{2})')
+BID_PAIRING_RE = re.compile(r'#(\w+)')
+BID_DATE_RE = re.compile(r'\b(\d{1,2})(JAN|FEB|MAR|APR|MAY|JUN|JUL|AUG|SEP|OCT|NOV|DEC)\b')
+
+def bid_header_date(line, start_date):
+    # DDMMM in a pairing header, in whichever year puts it nearest the packet's start date.
+    match = BID_DATE_RE.search(line)
+    if not match:
+        return start_date
+    day, month = int(match.group(1)), MONTH_NUMBERS[match.group(2)]
+    candidates = []
+    for year in (start_date.year - 1, start_date.year, start_date.year + 1):
+        try:
+            candidates.append(start_date.replace(year=year, month=month, day=day))
+        except ValueError:
+            pass
+    return min(candidates, key=lambda d: abs((d - start_date).days)) if candidates else start_date
+
+class BidPairing:
+    # Line-by-line state for one pairing of a bid packet. The check-in time goes on the first
+    # flight of day A; it is filled in by finish() because CHECK-IN AT may follow the flights.
+    def __init__(self, start_date):
+        self.start_date = start_date
+        self.flights = []
+        self.first_flight_of_day_a = None
+        self.seen_dates = set()
+        self.current_day_letter = None
+        self.current_date = None
+        self.check_in = None
+        self.last_flight = None
+
+    def feed(self, line):
+        if self.check_in is None and 'CHECK-IN AT' in line:
+            match = CHECK_IN_RE.search(line)
+            if match:
+                self.check_in = f"{match.group(1)}:{match.group(2)}"
+        
+        # A layover line belongs to the flight right above it when the airports agree.
+        if self.last_flight is not None:
+            flight, self.last_flight = self.last_flight, None
+            layover_match = LAYOVER_RE.match(line)
+            if layover_match and layover_match.group(2) == flight['arr']:
+                flight['layover_duration'] = layover_match.group(3)
+                flight['hotel'] = layover_match.group(4).strip()
+                flight['turn'] = 0.5
+                return
+        
+        match = BID_FLIGHT_RE.match(line)
+        if not match:
+            return
+        day_letter, intl_indicator, dh_flag, flt_num, dep_apt, dep_time, arr_apt, arr_time, block_str, turn_str = match.groups()
+        
+        # A lone I or L is the international or deadhead flag, not a day letter, unless it is
+        # the day right after the current one.
+        if day_letter in ('I', 'L') and not intl_indicator and not dh_flag:
+            if self.current_day_letter is None or ord(day_letter) != ord(self.current_day_letter) + 1:
+                if day_letter == 'L':
+                    dh_flag = 'L'
+                day_letter = None
+        
+        if turn_str and '.' not in turn_str:
+            turn_str = None
+            
+        if day_letter:
+            self.current_day_letter = day_letter
+            self.current_date = self.start_date + timedelta(days=ord(day_letter) - ord('A'))
+        if self.current_date is None:
+            if not self.flights:
+                return
+            self.current_date = datetime.strptime(self.flights[-1]['date'], '%Y-%m-%d').date()
+        
+        date_str = self.current_date.strftime('%Y-%m-%d')
+        
+        dep_h, dep_m = int(dep_time[:2]), int(dep_time[2:])
+        arr_h, arr_m = int(arr_time[:2]), int(arr_time[2:])
+        arr_date_str = date_str
+        if arr_h * 60 + arr_m < dep_h * 60 + dep_m:
+            arr_date_str = (self.current_date + timedelta(days=1)).strftime('%Y-%m-%d')
+        
+        turn = parse_time_str_to_float(turn_str)
+        if turn == 0.0:
+            turn = 0.5
+        
+        flight = {
+            'date': date_str,
+            'dep': dep_apt,
+            'dep_time': f"{dep_h:02d}:{dep_m:02d}",
+            'arr': arr_apt,
+            'arr_time': f"{arr_h:02d}:{arr_m:02d}",
+            'arr_date': arr_date_str,
+            'report_time': 'MANUAL',
+            'report_date': date_str,
+            'block': 0.0 if dh_flag else parse_time_str_to_float(block_str),
+            'turn': turn,
+            'flt': flt_num,
+            'layover_duration': None,
+            'hotel': None
+        }
+        if self.current_day_letter == 'A' and date_str not in self.seen_dates:
+            self.first_flight_of_day_a = flight
+        self.seen_dates.add(date_str)
+        self.flights.append(flight)
+        self.last_flight = flight
+
+    def finish(self):
+        if self.first_flight_of_day_a is not None and self.check_in:
+            self.first_flight_of_day_a['report_time'] = self.check_in
+        if self.flights:
+            self.flights[-1]['turn'] = 0.5
+        return self.flights
+
+def bid_lines(dump_text):
+    lines = dump_text.split('\n') if isinstance(dump_text, str) else dump_text
+    for line in lines:
+        line = line.strip()
+        if line:
+            yield line
+
+def parse_bid_dump(dump_text, start_date):
+    # One pairing; dump_text is the pasted text or any iterable of lines.
+    pairing = BidPairing(start_date)
+    for line in bid_lines(dump_text):
+        pairing.feed(line)
+    return pairing.finish()
+
+def parse_bid_packet(dump_text, start_date):
+    # A whole bid month in one pass: {pairing_id: {'start_date': date, 'flights': [...]}} in
+    # packet order. Each "#<id>" header starts a pairing (a repeated header, as on a page
+    # break, continues it); lines before the first header are ignored. A header without a
+    # DDMMM date starts on start_date.
+    pairings = {}
+    pairing = None
+    for line in bid_lines(dump_text):
+        if '#' in line and not BID_FLIGHT_RE.match(line) and not LAYOVER_RE.match(line):
+            match = BID_PAIRING_RE.search(line)
+            if match:
+                pairing = pairings.get(match.group(1))
+                if pairing is None:
+                    pairing = pairings[match.group(1)] = BidPairing(bid_header_date(line, start_date))
+                pairing.last_flight = None
+                continue
+        if pairing is not None:
+            pairing.feed(line)
+    return {
+        pairing_id: {'start_date': pairing.start_date, 'flights': pairing.finish()}
+        for pairing_id, pairing in pairings.items()
+    }
@@ -0,0 +1,114 @@
+import cProfile
+import io
+import pstats
+import threading
+import time
+
+# Stage timers and counters for one pass through the pipeline (one Streamlit rerun). Core code
+# wraps its stages in stage() and bumps count(); both do nothing unless a run has been started
+# on the current thread, so the engine stays usable on its own. Nested stages are not
+# subtracted from their parent.
+_local = threading.local()
+
+PROFILE_LINES = 40
+
+class PerfRun:
+    def __init__(self, profile=False):
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.stages = {}
+        self.counters = {}
+        self.total = None
+        self.profile_text = None
+        self.profiler = cProfile.Profile() if profile else None
+        if self.profiler:
+            self.profiler.enable()
+
+    def add(self, name, seconds):
+        entry = self.stages.get(name)
+        if entry is None:
+            self.stages[name] = [seconds, 1]
+        else:
+            entry[0] += seconds
+            entry[1] += 1
+
+    def finish(self):
+        self.total = time.perf_counter() - self.start
+        if self.profiler:
+            self.profiler.disable()
+            out = io.StringIO()
+            pstats.Stats(self.profiler, stream=out).sort_stats('cumulative').print_stats(PROFILE_LINES)
+            self.profile_text = out.getvalue()
+            self.profiler = None
+
+    def as_dict(self):
+        return {
+            'started_at': self.started_at,
+            'total_s': self.total,
+            'stages': {name: {'seconds': seconds, 'calls': calls} for name, (seconds, calls) in self.stages.items()},
+            'counters': dict(self.counters),
+            'profile': self.profile_text
+        }
+
+class _Stage:
+    __slots__ = ('run', 'name', 'start')
+
+    def __init__(self, run, name):
+        self.run = run
+        self.name = name
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.run.add(self.name, time.perf_counter() - self.start)
+        return False
+
+    def stop(self):
+        self.__exit__()
+
+class _NoStage:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def stop(self):
+        pass
+
+_NO_STAGE = _NoStage()
+
+def current_run():
+    return getattr(_local, 'run', None)
+
+def start_run(profile=False):
+    # A run left open (the script was stopped by a rerun) is closed and dropped.
+    previous = current_run()
+    if previous is not None:
+        previous.finish()
+    _local.run = PerfRun(profile)
+    return _local.run
+
+def finish_run():
+    run = current_run()
+    _local.run = None
+    if run is not None:
+        run.finish()
+    return run
+
+def stage(name):
+    run = current_run()
+    return _Stage(run, name) if run is not None else _NO_STAGE
+
+def start(name):
+    # For stages that don't fit a with block: start(name) ... .stop()
+    timer = stage(name)
+    timer.__enter__()
+    return timer
+
+def count(name, n=1):
+    run = current_run()
+    if run is not None:
+        run.counters[name] = run.counters.get(name, 0) + n
@@ -0,0 +1,211 @@
+from bisect import bisect_left, bisect_right
+from zoneinfo import ZoneInfo
+
+from . import perf
+from .far117 import FAR117Calculator
+from .legality import (
+    BLOCK_WINDOW_HOURS, BLOCK_LIMIT_HOURS, FDP_WINDOW_HOURS, FDP_LIMIT_HOURS, REST_WINDOW_HOURS, MIN_REST_HOURS,
+    RollingWindowIndex
+)
+
+# Bid screening: which pairings of a bid packet could be added on top of a schedule. The
+# base schedule's rolling-window index is built once; each candidate is then checked against
+# it with a few binary searches and range-min queries instead of rebuilding the schedule.
+#
+# Every check gives a margin in hours (negative when broken) and the smallest one is the
+# binding constraint. Margins only cover what the pairing touches: the rest around and
+# between its own duties, the rolling windows that hold part of it, and its own Table A/B/C
+# limits. A window made only of base duties is left out even when it is tighter (or already
+# broken), so a margin is the room the pairing itself has, not the schedule's overall minimum.
+#
+# Conflicts are flight or training duties and vacation inside the pairing's span; reserve on
+# the pairing's dates gives way to it, as in the schedule build. Table limits start from the
+# acclimation state the base schedule leaves before the pairing.
+MIN_DUTY_REST_HOURS = 10
+LEGAL_TOLERANCE_HOURS = 1e-6
+
+SCREEN_CONSTRAINTS = {
+    'overlap': "Overlaps a scheduled duty",
+    'vacation': "Overlaps vacation",
+    'min_rest_10': "10h rest between duties",
+    '30_in_168': "30h rest in 168h",
+    'block_672': "100h block in 672h",
+    'fdp_168': "60h FDP in 168h",
+    'fdp_table_b': "FDP limit (Table B)",
+    'fdp_table_c': "FDP limit (Table C)",
+    'flight_time_table_a': "Flight time limit (Table A)",
+    'flight_time_augmented': "Flight time limit (augmented)"
+}
+
+def busy_spans(intervals):
+    # (starts, running max of ends) over intervals sorted by start, for overlap tests.
+    intervals = sorted(intervals)
+    ends = []
+    latest = float('-inf')
+    for _, end in intervals:
+        latest = max(latest, end)
+        ends.append(latest)
+    return [start for start, _ in intervals], ends, intervals
+
+def overlap_hours(spans, start, end):
+    # Longest overlap between [start, end] and any of the spans, in hours.
+    starts, end_max, intervals = spans
+    longest = 0.0
+    k = bisect_left(starts, end) - 1
+    while k >= 0 and end_max[k] > start:
+        longest = max(longest, min(end, intervals[k][1]) - max(start, intervals[k][0]))
+        k -= 1
+    return longest / 3600
+
+class PairingScreener:
+    def __init__(self, index, calendar_blackouts=(), airports_tz=None, base_tz=None):
+        self.index = index if isinstance(index, RollingWindowIndex) else RollingWindowIndex(index)
+        self.airports_tz = airports_tz or {}
+        self.base_tz = ZoneInfo(base_tz) if isinstance(base_tz, str) else base_tz
+        self.duty_spans = busy_spans([(self.index.report_ts[i], self.index.release_ts[i]) for i in self.index.rest_idx])
+        # Reserve before or after a pairing still counts for rest, unless it falls on one of
+        # the pairing's dates (base_tz days) and is dropped when the pairing is added.
+        self.reserve_days = {
+            i: duty['report_utc'].astimezone(self.base_tz).date().isoformat() if self.base_tz else None
+            for i, duty in enumerate(self.index.duties) if duty['type'] == 'reserve'
+        }
+        reserves = [(self.index.report_ts[i], self.index.release_ts[i], day) for i, day in self.reserve_days.items()]
+        self.reserves_by_release = sorted(reserves, key=lambda r: r[1])
+        self.reserve_releases = [release for _, release, _ in self.reserves_by_release]
+        self.reserves_by_report = sorted(reserves)
+        self.reserve_reports = [report for report, _, _ in self.reserves_by_report]
+        self.vacation_spans = busy_spans([
+            (event['start_utc'].timestamp(), event['end_utc'].timestamp())
+            for event in calendar_blackouts if event['type'] == 'vacation'
+        ])
+
+        # Acclimation state and last accepted release after each base duty, from one calculator
+        # pass over the base as in assemble_schedule.
+        self.acclimation = []
+        if self.airports_tz:
+            calc = FAR117Calculator(self.airports_tz)
+            for duty in self.index.duties:
+                if duty['type'] == 'flight':
+                    calc.add_flight_duty(duty['report_utc'], duty['release_utc'], duty['flights'])
+                else:
+                    calc.add_generic_duty(duty['report_utc'], duty['release_utc'])
+                self.acclimation.append((calc.theater_tz, calc.acclimated, calc.unacclimated_until, calc.last_offset, calc.last_release_utc))
+
+    def screen(self, pairing_id, duties):
+        # duties: the pairing's flight duties as built by build_duties.
+        duties = sorted((d for d in duties if d['type'] == 'flight'), key=lambda d: d['report_utc'])
+        index = self.index
+        margins = {}
+
+        def bind(rule, margin):
+            if rule not in margins or margin < margins[rule]:
+                margins[rule] = margin
+
+        reports = [d['report_utc'].timestamp() for d in duties]
+        releases = [d['release_utc'].timestamp() for d in duties]
+        span_start, span_end = min(reports), max(releases)
+        # The pairing's dates as ISO strings, start date to last arrival, as build_duties covers them.
+        first_date = duties[0].get('rotation_start_date')
+        last_date = max(f['arr_date'] for d in duties for f in d['flights'])
+
+        def reserve_kept(day):
+            return day is None or first_date is None or not first_date <= day <= last_date
+
+        # Conflicts with the base schedule anywhere inside the pairing
+        for rule, spans in (('overlap', self.duty_spans), ('vacation', self.vacation_spans)):
+            conflict = overlap_hours(spans, span_start, span_end)
+            if conflict > 0:
+                bind(rule, -conflict)
+
+        # 10h rest: from the last duty before the pairing, between its own duties, and to
+        # the next duty after it when that is a flight duty (rest is only checked in front of
+        # flight duties).
+        k = bisect_left(index.rest_report_ts, span_start)
+        previous = [float(index.rest_release_max[k - 1])] if k > 0 and index.rest_release_max[k - 1] <= span_start else []
+        k = bisect_right(self.reserve_releases, span_start)
+        while k > 0 and not reserve_kept(self.reserves_by_release[k - 1][2]):
+            k -= 1
+        if k > 0:
+            previous.append(self.reserve_releases[k - 1])
+        if previous:
+            bind('min_rest_10', (span_start - max(previous)) / 3600 - MIN_DUTY_REST_HOURS)
+        for release, report in zip(releases, reports[1:]):
+            bind('min_rest_10', (report - release) / 3600 - MIN_DUTY_REST_HOURS)
+        k = bisect_left(index.rest_report_ts, span_end)
+        j = bisect_left(self.reserve_reports, span_end)
+        while j < len(self.reserve_reports) and not reserve_kept(self.reserves_by_report[j][2]):
+            j += 1
+        if k < len(index.rest_report_ts) and index.duties[index.rest_idx[k]]['type'] == 'flight':
+            if j == len(self.reserve_reports) or index.rest_report_ts[k] <= self.reserve_reports[j]:
+                bind('min_rest_10', (index.rest_report_ts[k] - span_end) / 3600 - MIN_DUTY_REST_HOURS)
+
+        # Rolling limits: the pairing's own reports and releases, plus every later flight
+        # duty report whose window now holds part of it.
+        legs = [
+            (f['dep_utc'].timestamp(), f['arr_utc'].timestamp(), f.get('block', 0))
+            for d in duties if d['block'] > 0 for f in d['flights']
+            if f.get('block', 0) != 0 and f['arr_utc'] > f['dep_utc']
+        ]
+        fdps = [(report, release, (release - report) / 3600) for report, release in zip(reports, releases) if release > report]
+        check_points = reports + releases
+        bind('block_672', index.added_slack(index.block_slack, index.block, BLOCK_WINDOW_HOURS, BLOCK_LIMIT_HOURS, legs, check_points))
+        bind('fdp_168', index.added_slack(index.fdp_slack, index.fdp, FDP_WINDOW_HOURS, FDP_LIMIT_HOURS, fdps, check_points))
+
+        # 30-in-168 before each of the pairing's duties and each base flight duty within a
+        # week after it.
+        added = list(zip(reports, releases))
+        lo = bisect_left(index.flight_report_ts, span_start)
+        hi = bisect_left(index.flight_report_ts, span_end + REST_WINDOW_HOURS * 3600)
+        for t in reports + index.flight_report_ts[lo:hi]:
+            bind('30_in_168', index.max_rest_before(t, added) - MIN_REST_HOURS)
+
+        # Per-duty FDP and flight time limits, picking up where the base schedule's calculator
+        # pass stands before the pairing (reserve the pairing displaces left out).
+        calc = FAR117Calculator(self.airports_tz)
+        k = bisect_left(index.report_ts, span_start) if self.acclimation else 0
+        while k > 0 and k - 1 in self.reserve_days and not reserve_kept(self.reserve_days[k - 1]):
+            k -= 1
+        if k > 0:
+            calc.theater_tz, calc.acclimated, calc.unacclimated_until, calc.last_offset, calc.last_release_utc = self.acclimation[k - 1]
+        for d in duties:
+            calc.add_flight_duty(d['report_utc'], d['release_utc'], d['flights'])
+        for limits in calc.duty_limits:
+            bind('fdp_table_c' if limits['augmented'] else 'fdp_table_b', limits['fdp_limit'] - limits['fdp_hours'])
+            bind('flight_time_augmented' if limits['augmented'] else 'flight_time_table_a', limits['flight_time_limit'] - limits['flight_hours'])
+
+        binding = min(margins, key=margins.get)
+        first = duties[0]
+        return {
+            'pairing': pairing_id,
+            'rotation_db_id': first.get('rotation_db_id'),
+            'start_date': first.get('rotation_start_date'),
+            'report_utc': first['report_utc'],
+            'release_utc': duties[-1]['release_utc'],
+            'duties': len(duties),
+            'legs': sum(len(d['flights']) for d in duties),
+            'block': sum(d['block'] for d in duties),
+            'legal': margins[binding] >= -LEGAL_TOLERANCE_HOURS,
+            'binding': binding,
+            'margin': margins[binding],
+            'violations': sorted(rule for rule, margin in margins.items() if margin < -LEGAL_TOLERANCE_HOURS),
+            'margins': margins
+        }
+
+    def screen_all(self, candidate_duties):
+        # candidate_duties: processed duties of the candidate pairings, e.g. build_duties over
+        # a what-if profile. Returns one row per pairing, legal ones first, most room first.
+        pairings = {}
+        for duty in candidate_duties:
+            if duty['type'] == 'flight':
+                pairings.setdefault(duty['rotation_db_id'], []).append(duty)
+        perf.count('pairings_screened', len(pairings))
+        with perf.stage('screen_pairings'):
+            rows = [self.screen(duties[0]['rotation_id'], duties) for duties in pairings.values()]
+        rows.sort(key=lambda row: (not row['legal'], -row['margin'], -row['block']))
+        return rows
+
+def screen_pairings(base_schedule, candidate_duties, airports_tz=None, base_tz=None):
+    # base_schedule: an assemble_schedule result (its window index is reused).
+    index = base_schedule.get('window_index') or base_schedule['processed_duties']
+    screener = PairingScreener(index, base_schedule['calendar_blackouts'], airports_tz, base_tz)
+    return screener.screen_all(candidate_duties)
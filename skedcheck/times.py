@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta
+from functools import lru_cache
+from zoneinfo import ZoneInfo
+
+# Schedules repeat the same dates and clock times across legs and reruns, so parsing and
+# local -> UTC conversion are memoized per process. Conversions are keyed by tz name rather
+# than airport code, so they stay valid when an airport's zone is changed.
+@lru_cache(maxsize=65536)
+def parse_local_datetime(value):
+    return datetime.strptime(value, '%Y-%m-%d %H:%M')
+
+@lru_cache(maxsize=65536)
+def local_to_utc(tz_name, local_dt):
+    return local_dt.replace(tzinfo=ZoneInfo(tz_name)).astimezone(ZoneInfo('UTC'))
+
+def leg_utc_times(f, airports_tz):
+    dep_tz = airports_tz[f['dep']]
+    report_tz = dep_tz
+    arr_tz = airports_tz[f['arr']]
+    
+    dep_local = parse_local_datetime(f['date'] + ' ' + f['dep_time'])
+    arr_local = parse_local_datetime(f['arr_date'] + ' ' + f['arr_time'])
+    
+    if f['report_time'] and f['report_time'] != 'MANUAL':
+        try:
+            report_utc = local_to_utc(report_tz, parse_local_datetime(f['report_date'] + ' ' + f['report_time']))
+        except ValueError:
+            report_utc = local_to_utc(dep_tz, dep_local - timedelta(hours=1.5))
+    else:
+        report_utc = local_to_utc(dep_tz, dep_local - timedelta(hours=1.5))
+        
+    arr_utc = local_to_utc(arr_tz, arr_local)
+    return report_utc, local_to_utc(dep_tz, dep_local), arr_utc, arr_utc + timedelta(hours=f.get('turn', 0.5))
+
+def hours_to_hhmm(hours):
+    if hours <= 0:
+        return "00:00"
+    h = int(hours)
+    m_float = (hours - h) * 60
+    m = int(round(m_float))
+    
+    if m == 60:
+        h += 1
+        m = 0
+        
+    return f"{h:02d}:{m:02d}"
@@ -4,15 +4,27 @@ import sqlite3
 from datetime import datetime, timedelta, time
 from zoneinfo import ZoneInfo
 import re
-import calendar
 import pytz
 import os
 import json
+import secrets
+import gzip
+import io
 import uuid
-from ics import Calendar
+import threading
+from contextlib import contextmanager
+from functools import partial
 import streamlit.components.v1 as components
+from skedcheck import (
+    parse_local_datetime, local_to_utc, leg_utc_times, hours_to_hhmm,
+    get_date_for_day, find_effective_date, parse_hhmm_time, parse_time_str_to_float,
+    parse_trip_dump, parse_bid_dump, parse_bid_packet, DaySummaryCache, assemble_schedule,
+    INITIAL_AIRPORTS, AirportRegistry, parse_ical_rotations, generate_ical_export, ICalFeed, ICalFeedServer,
+    parse_bid_packet_bulk, build_duties, screen_pairings, SCREEN_CONSTRAINTS, perf
+)
 
 st.set_page_config(layout="wide", page_title="SkedCheck Schedule Viewer", page_icon="logo.png")
+perf.start_run(profile="profile" in st.query_params or st.session_state.get('perf_profile', False))
 
 st.markdown("""
 <style>
@@ -59,10 +71,63 @@ st.markdown("""
 
 DB_FILE = "SkedCheck.db"
 
+class ConnectionPool:
+    # Reusable SQLite connections shared by every session on this server. Each
+    # connection is checked out by one thread at a time, runs in WAL mode so readers
+    # never wait on a writer, and keeps its own prepared statement cache warm.
+    def __init__(self, db_file, max_idle=8, timeout=30.0):
+        self.db_file = db_file
+        self.max_idle = max_idle
+        self.timeout = timeout
+        self._idle = []
+        self._lock = threading.Lock()
+        
+    def _connect(self):
+        conn = sqlite3.connect(self.db_file, timeout=self.timeout, check_same_thread=False, cached_statements=256)
+        conn.execute('PRAGMA journal_mode = WAL;')
+        conn.execute('PRAGMA synchronous = NORMAL;')
+        conn.execute('PRAGMA foreign_keys = ON;')
+        return conn
+    
+    @contextmanager
+    def connection(self):
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            with self._lock:
+                if len(self._idle) < self.max_idle:
+                    self._idle.append(conn)
+                    conn = None
+            if conn is not None:
+                conn.close()
+                
+    def close_all(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+@st.cache_resource
+def get_connection_pool():
+    return ConnectionPool(DB_FILE)
+
+def db_connection(pool=None):
+    # pool is passed in from threads without a script context (download callbacks, the iCal feed).
+    return (pool or get_connection_pool()).connection()
+
 def init_db():
-    conn = sqlite3.connect(DB_FILE)
-    conn.execute('PRAGMA foreign_keys = ON;')
-    c = conn.cursor()
+    with db_connection() as conn:
+        create_schema(conn.cursor())
+
+def create_schema(c):
     
     c.execute('''
     CREATE TABLE IF NOT EXISTS profiles (
@@ -95,6 +160,7 @@ def init_db():
         end_datetime_utc TEXT,
         created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         block_id TEXT,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
         FOREIGN KEY (profile_id) REFERENCES profiles (id) ON DELETE CASCADE
     )
     ''')
@@ -103,6 +169,54 @@ def init_db():
         c.execute('SELECT block_id FROM blackouts LIMIT 1')
     except sqlite3.OperationalError:
         c.execute('ALTER TABLE blackouts ADD COLUMN block_id TEXT')
+        
+    try:
+        c.execute('SELECT updated_at FROM blackouts LIMIT 1')
+    except sqlite3.OperationalError:
+        # SQLite can't add a column with a CURRENT_TIMESTAMP default; existing rows fall back to created_at.
+        c.execute('ALTER TABLE blackouts ADD COLUMN updated_at TIMESTAMP')
+        
+    try:
+        c.execute('SELECT data_version FROM profiles LIMIT 1')
+    except sqlite3.OperationalError:
+        c.execute('ALTER TABLE profiles ADD COLUMN data_version INTEGER DEFAULT 0')
+        
+    try:
+        c.execute('SELECT feed_token FROM profiles LIMIT 1')
+    except sqlite3.OperationalError:
+        c.execute('ALTER TABLE profiles ADD COLUMN feed_token TEXT')
+    
+    c.execute('''
+    CREATE TABLE IF NOT EXISTS legs (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        rotation_db_id INTEGER NOT NULL,
+        profile_id INTEGER NOT NULL,
+        seq INTEGER NOT NULL,
+        flt TEXT,
+        dep TEXT,
+        arr TEXT,
+        date TEXT,
+        dep_time TEXT,
+        arr_date TEXT,
+        arr_time TEXT,
+        report_date TEXT,
+        report_time TEXT,
+        turn REAL,
+        layover_duration TEXT,
+        hotel TEXT,
+        report_utc TEXT,
+        dep_utc TEXT,
+        arr_utc TEXT,
+        release_utc TEXT,
+        block REAL,
+        FOREIGN KEY (rotation_db_id) REFERENCES rotations (id) ON DELETE CASCADE,
+        FOREIGN KEY (profile_id) REFERENCES profiles (id) ON DELETE CASCADE
+    )
+    ''')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_legs_profile_dep ON legs (profile_id, dep_utc)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_legs_rotation ON legs (rotation_db_id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_rotations_profile_start ON rotations (profile_id, start_date)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_blackouts_profile_start ON blackouts (profile_id, start_datetime_utc)')
     
     c.execute('''
     CREATE TABLE IF NOT EXISTS airports (
@@ -118,32 +232,7 @@ def init_db():
     )
     ''')
     
-    initial_airports = [
-        ('SEA', 'America/Los_Angeles'), ('LAX', 'America/Los_Angeles'), ('SFO', 'America/Los_Angeles'),
-        ('PDX', 'America/Los_Angeles'), ('SAN', 'America/Los_Angeles'), ('GEG', 'America/Los_Angeles'),
-        ('SLC', 'America/Denver'), ('DEN', 'America/Denver'), ('PHX', 'America/Phoenix'),
-        ('MSP', 'America/Chicago'), ('ORD', 'America/Chicago'), ('DFW', 'America/Chicago'), ('IAH', 'America/Chicago'),
-        ('ATL', 'America/New_York'), ('DTW', 'America/Detroit'), ('JFK', 'America/New_York'),
-        ('LGA', 'America/New_York'), ('EWR', 'America/New_York'), ('BOS', 'America/New_York'),
-        ('MIA', 'America/New_York'), ('CLT', 'America/New_York'), ('DCA', 'America/New_York'), ('PHL', 'America/New_York'),
-        ('CVG', 'America/New_York'),
-        ('CLE', 'America/New_York'), ('ATW', 'America/Chicago'), ('MEM', 'America/Chicago'),
-        ('AMS', 'Europe/Amsterdam'),
-        ('HNL', 'Pacific/Honolulu'), ('ANC', 'America/Anchorage'),
-        ('YVR', 'America/Vancouver'), ('YYC', 'America/Denver'), ('YYZ', 'America/Toronto'), ('YUL', 'America/Toronto'),
-        ('LHR', 'Europe/London'), ('CDG', 'Europe/Paris'), ('AMS', 'Europe/Amsterdam'),
-        ('FRA', 'Europe/Berlin'), ('MUC', 'Europe/Berlin'), ('FCO', 'Europe/Rome'),
-        ('BCN', 'Europe/Madrid'), ('MAD', 'Europe/Madrid'), ('DUB', 'Europe/Dublin'),
-        ('ZRH', 'Europe/Zurich'), ('CPH', 'Europe/Copenhagen'), ('ARN', 'Europe/Stockholm'),
-        ('HND', 'Asia/Tokyo'), ('NRT', 'Asia/Tokyo'), ('ICN', 'Asia/Seoul'),
-        ('PEK', 'Asia/Shanghai'), ('PVG', 'Asia/Shanghai'), ('HKG', 'Asia/Hong_Kong'),
-        ('TPE', 'Asia/Taipei'), ('SIN', 'Asia/Singapore'), ('BKK', 'Asia/Bangkok'), ('DXB', 'Asia/Dubai'),
-        ('SYD', 'Australia/Sydney'), ('MEL', 'Australia/Sydney'), ('AKL', 'Pacific/Auckland'),
-        ('MEX', 'America/Mexico_City'), ('BOG', 'America/Bogota'), ('GRU', 'America/Sao_Paulo'),
-        ('EZE', 'America/Argentina/Buenos_Aires'), ('SCL', 'America/Santiago'), ('PTY', 'America/Panama'),
-        ('CYFB', 'America/Iqaluit'), ('PASY', 'America/Adak'), ('EINN', 'Europe/Dublin'),
-    ]
-    for code, tz in initial_airports:
+    for code, tz in INITIAL_AIRPORTS:
         c.execute('INSERT OR IGNORE INTO airports (code, tz) VALUES (?, ?)', (code, tz))
     
     c.execute('SELECT COUNT(*) FROM profiles')
@@ -151,27 +240,34 @@ def init_db():
         c.execute('INSERT INTO profiles (name) VALUES (?)', ("Current Schedule",))
         
     c.execute("INSERT OR IGNORE INTO settings (key, value) VALUES (?, ?)", ('default_tz_name', 'SEA (PST/PDT)'))
-        
-    conn.commit()
-    conn.close()
+    
+    # Upgrade path: rotations saved before the legs table existed get their legs now. Runs
+    # once per database; rotations with no flights (or unreadable data) are settled with it.
+    c.execute('SELECT value FROM settings WHERE key = ?', ('legs_backfilled',))
+    if c.fetchone() is None:
+        c.execute('SELECT id, profile_id, data FROM rotations WHERE id NOT IN (SELECT rotation_db_id FROM legs)')
+        missing = c.fetchall()
+        if missing:
+            airports_tz = load_airports_map(c)
+            for rotation_db_id, profile_id, data in missing:
+                try:
+                    flights = json.loads(data) if data else []
+                except (json.JSONDecodeError, TypeError):
+                    continue
+                write_rotation_legs(c, rotation_db_id, profile_id, flights, airports_tz)
+        c.execute("INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)", ('legs_backfilled', '1'))
 
 def save_setting(key, value):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     try:
-        c.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, value))
-        conn.commit()
+        with db_connection() as conn:
+            conn.execute('INSERT OR REPLACE INTO settings (key, value) VALUES (?, ?)', (key, value))
     except Exception as e:
         st.error(f"Error saving setting: {e}")
-    finally:
-        conn.close()
 
 def load_setting(key, default=None):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     try:
-        c.execute('SELECT value FROM settings WHERE key = ?', (key,))
-        res = c.fetchone()
+        with db_connection() as conn:
+            res = conn.execute('SELECT value FROM settings WHERE key = ?', (key,)).fetchone()
         if res:
             return res[0]
         else:
@@ -179,36 +275,61 @@ def load_setting(key, default=None):
     except Exception as e:
         st.error(f"Error loading setting: {e}")
         return default
-    finally:
-        conn.close()
 
 def load_profiles():
-    conn = sqlite3.connect(DB_FILE)
-    profiles = pd.read_sql_query("SELECT * FROM profiles ORDER BY name", conn)
-    conn.close()
+    with db_connection() as conn:
+        profiles = pd.read_sql_query("SELECT * FROM profiles ORDER BY name", conn)
     return profiles.to_dict('records')
 
+def bump_data_version(c, profile_id):
+    c.execute('UPDATE profiles SET data_version = data_version + 1 WHERE id = ?', (profile_id,))
+
+def load_data_version(profile_id, pool=None):
+    with db_connection(pool) as conn:
+        res = conn.execute('SELECT data_version FROM profiles WHERE id = ?', (profile_id,)).fetchone()
+    return res[0] if res else None
+
+def load_feed_token(profile_id, pool=None):
+    with db_connection(pool) as conn:
+        res = conn.execute('SELECT feed_token FROM profiles WHERE id = ?', (profile_id,)).fetchone()
+    return res[0] if res else None
+
+def profile_feed_token(profile_id):
+    # Created the first time the profile's feed URL is shown.
+    token = load_feed_token(profile_id)
+    if token is None:
+        with db_connection() as conn:
+            conn.execute('UPDATE profiles SET feed_token = ? WHERE id = ? AND feed_token IS NULL', (secrets.token_urlsafe(24), profile_id))
+        token = load_feed_token(profile_id)
+    return token
+
 def create_profile(name, source_profile_id=None):
-    conn = sqlite3.connect(DB_FILE)
-    conn.execute('PRAGMA foreign_keys = ON;')
-    c = conn.cursor()
     try:
-        c.execute('INSERT INTO profiles (name) VALUES (?)', (name,))
-        new_profile_id = c.lastrowid
-        if source_profile_id:
-            c.execute('''
-                INSERT INTO rotations (profile_id, rotation_id, start_date, data, is_cancelled)
-                SELECT ?, rotation_id, start_date, data, is_cancelled
-                FROM rotations
-                WHERE profile_id = ?
-            ''', (new_profile_id, source_profile_id))
-            c.execute('''
-                INSERT INTO blackouts (profile_id, type, start_datetime_utc, end_datetime_utc, block_id)
-                SELECT ?, type, start_datetime_utc, end_datetime_utc, block_id
-                FROM blackouts
-                WHERE profile_id = ?
-            ''', (new_profile_id, source_profile_id))
-        conn.commit()
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute('INSERT INTO profiles (name) VALUES (?)', (name,))
+            new_profile_id = c.lastrowid
+            if source_profile_id:
+                c.execute('''
+                    INSERT INTO rotations (profile_id, rotation_id, start_date, data, is_cancelled)
+                    SELECT ?, rotation_id, start_date, data, is_cancelled
+                    FROM rotations
+                    WHERE profile_id = ?
+                ''', (new_profile_id, source_profile_id))
+                c.execute(f'''
+                    INSERT INTO legs (rotation_db_id, profile_id, seq, {', '.join(LEG_COLUMNS)})
+                    SELECT nr.id, nr.profile_id, l.seq, {', '.join('l.' + col for col in LEG_COLUMNS)}
+                    FROM legs l
+                    JOIN rotations r ON r.id = l.rotation_db_id
+                    JOIN rotations nr ON nr.profile_id = ? AND nr.rotation_id IS r.rotation_id AND nr.start_date IS r.start_date
+                    WHERE r.profile_id = ?
+                ''', (new_profile_id, source_profile_id))
+                c.execute('''
+                    INSERT INTO blackouts (profile_id, type, start_datetime_utc, end_datetime_utc, block_id)
+                    SELECT ?, type, start_datetime_utc, end_datetime_utc, block_id
+                    FROM blackouts
+                    WHERE profile_id = ?
+                ''', (new_profile_id, source_profile_id))
         st.success(f"Profile '{name}' created!")
         return new_profile_id
     except sqlite3.IntegrityError:
@@ -217,52 +338,59 @@ def create_profile(name, source_profile_id=None):
     except Exception as e:
         st.error(f"Error creating profile: {e}")
         return None
-    finally:
-        conn.close()
 
 def delete_profile(profile_id):
-    conn = sqlite3.connect(DB_FILE)
-    conn.execute('PRAGMA foreign_keys = ON;')
-    c = conn.cursor()
     try:
-        c.execute('DELETE FROM profiles WHERE id = ?', (profile_id,))
-        conn.commit()
+        with db_connection() as conn:
+            conn.execute('DELETE FROM profiles WHERE id = ?', (profile_id,))
         st.success("Profile deleted.")
     except Exception as e:
         st.error(f"Error deleting profile: {e}")
-    finally:
-        conn.close()
 
 def save_rotation(profile_id, rotation_id, start_date, parsed_data):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     data_str = json.dumps(parsed_data)
     
     start_date_str = start_date if isinstance(start_date, str) else start_date.strftime('%Y-%m-%d')
     
     try:
-        c.execute('SELECT * FROM rotations WHERE profile_id = ? AND rotation_id = ? AND start_date = ?', (profile_id, rotation_id, start_date_str))
-        existing = c.fetchone()
-        if existing:
-            c.execute('''
-            UPDATE rotations SET data = ?, updated_at = CURRENT_TIMESTAMP, is_cancelled = 0
-            WHERE profile_id = ? AND rotation_id = ? AND start_date = ?
-            ''', (data_str, profile_id, rotation_id, start_date_str))
-        else:
-            c.execute('''
-            INSERT INTO rotations (profile_id, rotation_id, start_date, data)
-            VALUES (?, ?, ?, ?)
-            ''', (profile_id, rotation_id, start_date_str, data_str))
-        conn.commit()
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute('SELECT * FROM rotations WHERE profile_id = ? AND rotation_id = ? AND start_date = ?', (profile_id, rotation_id, start_date_str))
+            existing = c.fetchone()
+            if existing:
+                c.execute('''
+                UPDATE rotations SET data = ?, updated_at = CURRENT_TIMESTAMP, is_cancelled = 0
+                WHERE profile_id = ? AND rotation_id = ? AND start_date = ?
+                ''', (data_str, profile_id, rotation_id, start_date_str))
+                rotation_db_id = existing[0]
+            else:
+                c.execute('''
+                INSERT INTO rotations (profile_id, rotation_id, start_date, data)
+                VALUES (?, ?, ?, ?)
+                ''', (profile_id, rotation_id, start_date_str, data_str))
+                rotation_db_id = c.lastrowid
+            write_rotation_legs(c, rotation_db_id, profile_id, parsed_data, load_airports_map(c))
+            bump_data_version(c, profile_id)
     except Exception as e:
         st.error(f"Error saving rotation: {e}")
-    conn.close()
 
-def load_rotations(profile_id):
-    conn = sqlite3.connect(DB_FILE)
-    df = pd.read_sql_query("SELECT id, rotation_id, start_date, data, is_cancelled FROM rotations WHERE profile_id = ? ORDER BY id DESC", conn, params=(profile_id,))
+def rotation_window_clause(profile_id, start_date, end_date, alias='rotations'):
+    # A rotation is in the window if it starts inside it or has any leg departing inside it,
+    # so trips that straddle the window edge are still loaded whole.
+    if start_date is None or end_date is None:
+        return f"{alias}.profile_id = ?", [profile_id]
+    utc_tz = ZoneInfo('UTC')
+    start_utc = datetime.combine(start_date, time.min, tzinfo=utc_tz).isoformat()
+    end_utc = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=utc_tz).isoformat()
+    clause = f'''{alias}.profile_id = ? AND ({alias}.start_date BETWEEN ? AND ?
+        OR {alias}.id IN (SELECT rotation_db_id FROM legs WHERE profile_id = ? AND dep_utc >= ? AND dep_utc < ?))'''
+    return clause, [profile_id, start_date.isoformat(), end_date.isoformat(), profile_id, start_utc, end_utc]
+
+def load_rotations(profile_id, start_date=None, end_date=None, pool=None):
+    where, params = rotation_window_clause(profile_id, start_date, end_date)
+    with db_connection(pool) as conn:
+        df = pd.read_sql_query(f"SELECT id, rotation_id, start_date, data, is_cancelled, updated_at FROM rotations WHERE {where} ORDER BY id DESC", conn, params=params)
     df = df[df['is_cancelled'] == 0]
-    conn.close()
     unique_rot = {}
     for r in df.to_dict('records'):
         key = (r['rotation_id'], r['start_date'])
@@ -271,10 +399,67 @@ def load_rotations(profile_id):
     loaded = list(unique_rot.values())
     return loaded
 
+LEG_COLUMNS = [
+    'flt', 'dep', 'arr', 'date', 'dep_time', 'arr_date', 'arr_time', 'report_date', 'report_time',
+    'turn', 'layover_duration', 'hotel', 'report_utc', 'dep_utc', 'arr_utc', 'release_utc', 'block'
+]
+LEG_UTC_COLUMNS = ['report_utc', 'dep_utc', 'arr_utc', 'release_utc']
+
+def leg_row(f, airports_tz):
+    try:
+        utc_times = [dt.isoformat() for dt in leg_utc_times(f, airports_tz)]
+    except (KeyError, ValueError, TypeError):
+        # Unknown airport or bad times: keep the leg, the duty build reports it.
+        utc_times = [None] * 4
+    local = [f.get(col, 0.5 if col == 'turn' else None) for col in LEG_COLUMNS if col not in LEG_UTC_COLUMNS and col != 'block']
+    return local + utc_times + [f.get('block', 0)]
+
+def load_airports_map(c):
+    c.execute('SELECT code, tz FROM airports')
+    return dict(c.fetchall())
+
+def write_rotation_legs(c, rotation_db_id, profile_id, flights, airports_tz):
+    c.execute('DELETE FROM legs WHERE rotation_db_id = ?', (rotation_db_id,))
+    c.executemany(
+        f"INSERT INTO legs (rotation_db_id, profile_id, seq, {', '.join(LEG_COLUMNS)}) VALUES ({', '.join(['?'] * (len(LEG_COLUMNS) + 3))})",
+        [[rotation_db_id, profile_id, seq] + leg_row(f, airports_tz) for seq, f in enumerate(flights)]
+    )
+
+def refresh_airport_legs(c, code):
+    airports_tz = load_airports_map(c)
+    c.execute(f"SELECT id, {', '.join(LEG_COLUMNS)} FROM legs WHERE dep = ? OR arr = ?", (code, code))
+    rows = c.fetchall()
+    updates = []
+    for row in rows:
+        f = dict(zip(LEG_COLUMNS, row[1:]))
+        updates.append(leg_row(f, airports_tz)[-5:-1] + [row[0]])
+    c.executemany(f"UPDATE legs SET {', '.join(col + ' = ?' for col in LEG_UTC_COLUMNS)} WHERE id = ?", updates)
+
+def load_legs(profile_id, start_date=None, end_date=None, pool=None):
+    # Legs of the profile's active rotations as flight dicts, grouped by rotation row id.
+    # Optional date bounds select the same rotations as load_rotations, with all of their legs.
+    where, params = rotation_window_clause(profile_id, start_date, end_date, alias='r')
+    query = f'''
+        SELECT l.rotation_db_id, {', '.join('l.' + col for col in LEG_COLUMNS)}
+        FROM legs l JOIN rotations r ON r.id = l.rotation_db_id
+        WHERE {where} AND r.is_cancelled = 0
+    '''
+    query += ' ORDER BY l.rotation_db_id, l.seq'
+    
+    with db_connection(pool) as conn:
+        rows = conn.execute(query, params).fetchall()
+        
+    utc_tz = ZoneInfo('UTC')
+    legs_by_rotation = {}
+    for row in rows:
+        f = dict(zip(LEG_COLUMNS, row[1:]))
+        for col in LEG_UTC_COLUMNS:
+            if f[col] is not None:
+                f[col] = datetime.fromisoformat(f[col]).replace(tzinfo=utc_tz)
+        legs_by_rotation.setdefault(row[0], []).append(f)
+    return legs_by_rotation
+
 def save_blackout(profile_id, type_, start_dt, end_dt, block_id=None):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
-    
     if block_id is None:
         block_id = str(uuid.uuid4())
         
@@ -288,541 +473,182 @@ def save_blackout(profile_id, type_, start_dt, end_dt, block_id=None):
     else:
         end_utc_str = end_dt.astimezone(ZoneInfo('UTC')).isoformat()
     try:
-        c.execute('''
-        INSERT INTO blackouts (profile_id, type, start_datetime_utc, end_datetime_utc, block_id)
-        VALUES (?, ?, ?, ?, ?)
-        ''', (profile_id, type_, start_utc_str, end_utc_str, block_id))
-        conn.commit()
-        return c.lastrowid
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute('''
+            INSERT INTO blackouts (profile_id, type, start_datetime_utc, end_datetime_utc, block_id)
+            VALUES (?, ?, ?, ?, ?)
+            ''', (profile_id, type_, start_utc_str, end_utc_str, block_id))
+            new_id = c.lastrowid
+            bump_data_version(c, profile_id)
+        return new_id
     except Exception as e:
         st.error(f"Error saving blackout: {e}")
         return None
-    finally:
-        conn.close()
 
-def load_blackouts(profile_id):
-    conn = sqlite3.connect(DB_FILE)
-    df = pd.read_sql_query("SELECT * FROM blackouts WHERE profile_id = ? ORDER BY start_datetime_utc", conn, params=(profile_id,))
-    conn.close()
+def load_blackouts(profile_id, start_utc=None, end_utc=None, pool=None):
+    query = "SELECT * FROM blackouts WHERE profile_id = ?"
+    params = [profile_id]
+    if start_utc is not None and end_utc is not None:
+        # Anything overlapping [start_utc, end_utc); the start bound rides the (profile_id, start_datetime_utc) index.
+        query += " AND start_datetime_utc < ? AND end_datetime_utc > ?"
+        params += [end_utc.astimezone(ZoneInfo('UTC')).isoformat(), start_utc.astimezone(ZoneInfo('UTC')).isoformat()]
+    with db_connection(pool) as conn:
+        df = pd.read_sql_query(query + " ORDER BY start_datetime_utc", conn, params=params)
     return df.to_dict('records') if not df.empty else []
 
 def cancel_rotation(profile_id, rotation_id, start_date):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     try:
-        c.execute('UPDATE rotations SET is_cancelled = 1 WHERE profile_id = ? AND rotation_id = ? AND start_date = ?', (profile_id, rotation_id, start_date))
-        conn.commit()
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute('UPDATE rotations SET is_cancelled = 1 WHERE profile_id = ? AND rotation_id = ? AND start_date = ?', (profile_id, rotation_id, start_date))
+            bump_data_version(c, profile_id)
     except Exception as e:
         st.error(f"Error cancelling rotation: {e}")
-    conn.close()
 
 def delete_blackout(blackout_id):
-    conn = sqlite3.connect(DB_FILE)
-    conn.execute('PRAGMA foreign_keys = ON;')
-    c = conn.cursor()
     try:
-        c.execute('DELETE FROM blackouts WHERE id = ?', (blackout_id,))
-        conn.commit()
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute('UPDATE profiles SET data_version = data_version + 1 WHERE id = (SELECT profile_id FROM blackouts WHERE id = ?)', (blackout_id,))
+            c.execute('DELETE FROM blackouts WHERE id = ?', (blackout_id,))
     except Exception as e:
         st.error(f"Error deleting blackout: {e}")
-    finally:
-        conn.close()
 
 def delete_blackout_block(block_id):
-    conn = sqlite3.connect(DB_FILE)
-    conn.execute('PRAGMA foreign_keys = ON;')
-    c = conn.cursor()
     try:
-        c.execute('DELETE FROM blackouts WHERE block_id = ?', (block_id,))
-        conn.commit()
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute('UPDATE profiles SET data_version = data_version + 1 WHERE id IN (SELECT profile_id FROM blackouts WHERE block_id = ?)', (block_id,))
+            c.execute('DELETE FROM blackouts WHERE block_id = ?', (block_id,))
     except Exception as e:
         st.error(f"Error deleting blackout block: {e}")
-    finally:
-        conn.close()
 
 def clear_profile_data(profile_id):
-    conn = sqlite3.connect(DB_FILE)
-    conn.execute('PRAGMA foreign_keys = ON;')
-    c = conn.cursor()
     try:
-        c.execute('DELETE FROM rotations WHERE profile_id = ?', (profile_id,))
-        c.execute('DELETE FROM blackouts WHERE profile_id = ?', (profile_id,))
-        conn.commit()
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute('DELETE FROM legs WHERE profile_id = ?', (profile_id,))
+            c.execute('DELETE FROM rotations WHERE profile_id = ?', (profile_id,))
+            c.execute('DELETE FROM blackouts WHERE profile_id = ?', (profile_id,))
+            bump_data_version(c, profile_id)
     except Exception as e:
         st.error(f"Error clearing profile data: {e}")
-    finally:
-        conn.close()
 
 def change_rotation_start_date(rotation_db_id, new_start_date):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     try:
-        c.execute("SELECT start_date, data FROM rotations WHERE id = ?", (rotation_db_id,))
-        res = c.fetchone()
-        if not res:
-            st.error("Could not find rotation to move.")
-            return
-        
-        old_start_date = datetime.strptime(res[0], '%Y-%m-%d').date()
-        data = json.loads(res[1])
-        delta = new_start_date - old_start_date
-        
-        new_data = []
-        for f in data:
-            new_f_date = (datetime.strptime(f['date'], '%Y-%m-%d').date() + delta).strftime('%Y-%m-%d')
-            new_arr_date = (datetime.strptime(f['arr_date'], '%Y-%m-%d').date() + delta).strftime('%Y-%m-%d')
-            new_report_date = (datetime.strptime(f['report_date'], '%Y-%m-%d').date() + delta).strftime('%Y-%m-%d')
-            
-            f['date'] = new_f_date
-            f['arr_date'] = new_arr_date
-            f['report_date'] = new_report_date
-            new_data.append(f)
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT start_date, data, profile_id FROM rotations WHERE id = ?", (rotation_db_id,))
+            res = c.fetchone()
+            if not res:
+                st.error("Could not find rotation to move.")
+                return
+            
+            old_start_date = datetime.strptime(res[0], '%Y-%m-%d').date()
+            data = json.loads(res[1])
+            delta = new_start_date - old_start_date
+            
+            new_data = []
+            for f in data:
+                new_f_date = (datetime.strptime(f['date'], '%Y-%m-%d').date() + delta).strftime('%Y-%m-%d')
+                new_arr_date = (datetime.strptime(f['arr_date'], '%Y-%m-%d').date() + delta).strftime('%Y-%m-%d')
+                new_report_date = (datetime.strptime(f['report_date'], '%Y-%m-%d').date() + delta).strftime('%Y-%m-%d')
+                
+                f['date'] = new_f_date
+                f['arr_date'] = new_arr_date
+                f['report_date'] = new_report_date
+                new_data.append(f)
+                
+            new_data_str = json.dumps(new_data)
+            new_start_date_str = new_start_date.strftime('%Y-%m-%d')
             
-        new_data_str = json.dumps(new_data)
-        new_start_date_str = new_start_date.strftime('%Y-%m-%d')
-        
-        c.execute("UPDATE rotations SET start_date = ?, data = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (new_start_date_str, new_data_str, rotation_db_id))
-        conn.commit()
+            c.execute("UPDATE rotations SET start_date = ?, data = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (new_start_date_str, new_data_str, rotation_db_id))
+            write_rotation_legs(c, rotation_db_id, res[2], new_data, load_airports_map(c))
+            bump_data_version(c, res[2])
         st.success("Rotation moved successfully.")
     except Exception as e:
         st.error(f"Error moving rotation: {e}")
-    finally:
-        conn.close()
 
 def change_blackout_start_date(blackout_id, new_start_date_local):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     try:
-        c.execute("SELECT start_datetime_utc, end_datetime_utc FROM blackouts WHERE id = ?", (blackout_id,))
-        res = c.fetchone()
-        if not res:
-            st.error("Could not find event to move.")
-            return
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT start_datetime_utc, end_datetime_utc FROM blackouts WHERE id = ?", (blackout_id,))
+            res = c.fetchone()
+            if not res:
+                st.error("Could not find event to move.")
+                return
+                
+            old_start_utc = datetime.fromisoformat(res[0])
+            old_end_utc = datetime.fromisoformat(res[1])
+            duration = old_end_utc - old_start_utc
             
-        old_start_utc = datetime.fromisoformat(res[0])
-        old_end_utc = datetime.fromisoformat(res[1])
-        duration = old_end_utc - old_start_utc
-        
-        old_start_local = old_start_utc.astimezone(ZoneInfo(base_tz_str))
-        new_start_time = old_start_local.time()
-        
-        new_start_local = datetime.combine(new_start_date_local, new_start_time, tzinfo=ZoneInfo(base_tz_str))
-        new_end_local = new_start_local + duration
-        
-        new_start_utc_str = new_start_local.astimezone(ZoneInfo('UTC')).isoformat()
-        new_end_utc_str = new_end_local.astimezone(ZoneInfo('UTC')).isoformat()
-        
-        c.execute("UPDATE blackouts SET start_datetime_utc = ?, end_datetime_utc = ? WHERE id = ?", (new_start_utc_str, new_end_utc_str, blackout_id))
-        conn.commit()
+            old_start_local = old_start_utc.astimezone(ZoneInfo(base_tz_str))
+            new_start_time = old_start_local.time()
+            
+            new_start_local = datetime.combine(new_start_date_local, new_start_time, tzinfo=ZoneInfo(base_tz_str))
+            new_end_local = new_start_local + duration
+            
+            new_start_utc_str = new_start_local.astimezone(ZoneInfo('UTC')).isoformat()
+            new_end_utc_str = new_end_local.astimezone(ZoneInfo('UTC')).isoformat()
+            
+            c.execute("UPDATE blackouts SET start_datetime_utc = ?, end_datetime_utc = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (new_start_utc_str, new_end_utc_str, blackout_id))
+            c.execute("UPDATE profiles SET data_version = data_version + 1 WHERE id = (SELECT profile_id FROM blackouts WHERE id = ?)", (blackout_id,))
         st.success("Event moved successfully.")
     except Exception as e:
         st.error(f"Error moving event: {e}")
-    finally:
-        conn.close()
 
 def change_blackout_times(blackout_id, new_start_time, new_end_time):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     try:
-        c.execute("SELECT start_datetime_utc FROM blackouts WHERE id = ?", (blackout_id,))
-        res = c.fetchone()
-        if not res:
-            st.error("Could not find event to update.")
-            return
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute("SELECT start_datetime_utc FROM blackouts WHERE id = ?", (blackout_id,))
+            res = c.fetchone()
+            if not res:
+                st.error("Could not find event to update.")
+                return
+                
+            old_start_utc = datetime.fromisoformat(res[0])
+            old_start_local = old_start_utc.astimezone(ZoneInfo(base_tz_str))
+            event_date = old_start_local.date()
             
-        old_start_utc = datetime.fromisoformat(res[0])
-        old_start_local = old_start_utc.astimezone(ZoneInfo(base_tz_str))
-        event_date = old_start_local.date()
-        
-        new_start_local = datetime.combine(event_date, new_start_time, tzinfo=ZoneInfo(base_tz_str))
-        new_end_local = datetime.combine(event_date, new_end_time, tzinfo=ZoneInfo(base_tz_str))
-        
-        if new_end_time < new_start_time:
-            new_end_local += timedelta(days=1)
+            new_start_local = datetime.combine(event_date, new_start_time, tzinfo=ZoneInfo(base_tz_str))
+            new_end_local = datetime.combine(event_date, new_end_time, tzinfo=ZoneInfo(base_tz_str))
             
-        new_start_utc_str = new_start_local.astimezone(ZoneInfo('UTC')).isoformat()
-        new_end_utc_str = new_end_local.astimezone(ZoneInfo('UTC')).isoformat()
-        
-        c.execute("UPDATE blackouts SET start_datetime_utc = ?, end_datetime_utc = ? WHERE id = ?", (new_start_utc_str, new_end_utc_str, blackout_id))
-        conn.commit()
+            if new_end_time < new_start_time:
+                new_end_local += timedelta(days=1)
+                
+            new_start_utc_str = new_start_local.astimezone(ZoneInfo('UTC')).isoformat()
+            new_end_utc_str = new_end_local.astimezone(ZoneInfo('UTC')).isoformat()
+            
+            c.execute("UPDATE blackouts SET start_datetime_utc = ?, end_datetime_utc = ?, updated_at = CURRENT_TIMESTAMP WHERE id = ?", (new_start_utc_str, new_end_utc_str, blackout_id))
+            c.execute("UPDATE profiles SET data_version = data_version + 1 WHERE id = (SELECT profile_id FROM blackouts WHERE id = ?)", (blackout_id,))
         st.success("Event times updated successfully.")
     except Exception as e:
         st.error(f"Error updating event times: {e}")
-    finally:
-        conn.close()
 
-def load_airports_tz():
-    conn = sqlite3.connect(DB_FILE)
-    df = pd.read_sql_query("SELECT * FROM airports", conn)
-    conn.close()
+def load_airports_tz(pool=None):
+    with db_connection(pool) as conn:
+        df = pd.read_sql_query("SELECT * FROM airports", conn)
     loaded = {row['code']: row['tz'] for row in df.to_dict('records')} if not df.empty else {}
     return loaded
 
+@st.cache_resource(show_spinner=False)
+def get_airport_registry():
+    # Built once per process; save_airport clears it.
+    return AirportRegistry(load_airports_tz())
+
 def save_airport(code, tz):
-    conn = sqlite3.connect(DB_FILE)
-    c = conn.cursor()
     try:
-        c.execute('INSERT OR REPLACE INTO airports (code, tz) VALUES (?, ?)', (code.upper(), tz))
-        conn.commit()
+        with db_connection() as conn:
+            c = conn.cursor()
+            c.execute('INSERT OR REPLACE INTO airports (code, tz) VALUES (?, ?)', (code.upper(), tz))
+            refresh_airport_legs(c, code.upper())
+            c.execute('UPDATE profiles SET data_version = data_version + 1')
+        get_airport_registry.clear()
     except Exception as e:
         st.error(f"Error saving airport: {e}")
-    conn.close()
-
-def get_date_for_day(start_date, day):
-    if day < start_date.day:
-        next_month_start = (start_date.replace(day=28) + timedelta(days=4)).replace(day=1)
-        try:
-            return next_month_start.replace(day=day)
-        except ValueError:
-            last_day_of_month = calendar.monthrange(next_month_start.year, next_month_start.month)[1]
-            return next_month_start.replace(day=last_day_of_month)
-    else:
-        try:
-            return start_date.replace(day=day)
-        except ValueError:
-            last_day_of_month = calendar.monthrange(start_date.year, start_date.month)[1]
-            return start_date.replace(day=last_day_of_month)
-
-def find_effective_date(dump_text):
-    match = re.search(r'EFFECTIVE\s+([A-Z]{3})(\d{1,2})', dump_text, re.IGNORECASE)
-    if not match:
-        return None
-    month_str = match.group(1).upper()
-    day = int(match.group(2))
-    month_map = {'JAN': 1, 'FEB': 2, 'MAR': 3, 'APR': 4, 'MAY': 5, 'JUN': 6,
-                 'JUL': 7, 'AUG': 8, 'SEP': 9, 'OCT': 10, 'NOV': 11, 'DEC': 12}
-    month = month_map.get(month_str)
-    if not month:
-        return None
-    today = datetime.today().date()
-    current_year = today.year
-    try:
-        potential_date = datetime(current_year, month, day).date()
-        if (potential_date - today).days > 180:
-            return potential_date.replace(year=current_year - 1)
-        elif (today - potential_date).days > 180:
-             return potential_date.replace(year=current_year + 1)
-        else:
-            return potential_date
-    except ValueError:
-        return None
-
-def parse_hhmm_time(time_str):
-    if not isinstance(time_str, str):
-        return None
-        
-    cleaned_str = time_str.replace(":", "").replace(".", "").strip()
-    
-    if not cleaned_str:
-       return None
-       
-    padded_str = cleaned_str.zfill(4)
-    
-    if len(padded_str) == 4 and padded_str.isdigit():
-        try:
-            hh = int(padded_str[0:2])
-            mm = int(padded_str[2:4])
-            if 0 <= hh <= 23 and 0 <= mm <= 59:
-                return time(hh, mm)
-            else:
-                return None
-        except ValueError:
-            return None
-    return None
-
-def parse_time_str_to_float(time_str):
-    if not time_str:
-        return 0.0
-    
-    time_str = time_str.strip()
-    
-    if '.' in time_str:
-        try:
-            parts = time_str.split('.')
-            h = int(parts[0])
-            m_str = parts[1].ljust(2, '0')
-            m = int(m_str[:2])
-            return h + m / 60.0
-        except:
-             pass
-             
-    if ':' in time_str:
-        try:
-            parts = time_str.split(':')
-            h = int(parts[0])
-            m = int(parts[1])
-            return h + m / 60.0
-        except:
-            pass
-            
-    cleaned_str = time_str.replace(':', '').replace('.', '')
-    if cleaned_str.isdigit() and len(cleaned_str) <= 4:
-        padded_str = cleaned_str.zfill(4)
-        h = int(padded_str[:2])
-        m = int(padded_str[2:])
-        return h + m / 60.0
-    
-    try:
-        return float(time_str)
-    except:
-        return 0.0
-
-def parse_trip_dump(dump_text, effective_date):
-    start_date = effective_date
-    flights = []
-    report_times = {}
-    header_report = None
-    
-    lines = [line.strip() for line in dump_text.split('\n') if line.strip()]
-    
-    for line in lines:
-        if header_report is None and 'ACTUAL REPORT TIME' in line:
-            match = re.search(r'ACTUAL REPORT TIME (\d{4})', line)
-            if match:
-                hhmm = match.group(1)
-                h, m = divmod(int(hhmm), 100)
-                header_report = f"{h:02d}:{m:02d}"
-        
-        match_report = re.search(r'PAY REPORT TIME (\d{4})/(\d+)', line)
-        if match_report:
-            hhmm = match_report.group(1)
-            target_day = int(match_report.group(2))
-            h, m = divmod(int(hhmm), 100)
-            report_time = f"{h:02d}:{m:02d}"
-            report_times[target_day] = report_time
-    
-    if header_report and start_date.day not in report_times:
-        report_times[start_date.day] = header_report
-        
-    previous_date = start_date
-    
-    day_flight_re = re.compile(
-        r'^(\d{1,2})\s+([A-Z]{1,2})?\s*(\d+)\s+([A-Z]{3})\s*\S*\s*(\d{2}:?\d{2})\s+([A-Z]{3})(?:.\s*)?(\d{2}:?\d{2})\s+([\d.:]+)'
-    )
-    sub_flight_re = re.compile(
-        r'^(\d+)\s+([A-Z]{3})\s*\S*\s*(\d{2}:?\d{2})\s+([A-Z]{3})(?:.\s*)?(\d{2}:?\d{2})\s+([\d.:]+)'
-    )
-    current_day = None
-    current_date = None
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        match_day_flight = day_flight_re.match(line)
-        match_sub_flight = sub_flight_re.match(line)
-        
-        flight_data = None
-        
-        if match_day_flight:
-            current_day = int(match_day_flight.group(1))
-            
-            if current_date is None:
-                current_date = get_date_for_day(previous_date, current_day)
-            else:
-                current_date = get_date_for_day(current_date, current_day)
-    
-            previous_date = current_date
-            
-            flight_data = {
-                'day': current_day,
-                'flt': match_day_flight.group(3),
-                'dep_apt': match_day_flight.group(4),
-                'dep_time': match_day_flight.group(5).replace(':', ''),
-                'arr_apt': match_day_flight.group(6),
-                'arr_time': match_day_flight.group(7).replace(':', ''),
-                'block_str': match_day_flight.group(8),
-                'indicator': match_day_flight.group(2)
-            }
-        
-        elif match_sub_flight and current_day is not None:
-            flight_data = {
-                'day': current_day,
-                'flt': match_sub_flight.group(1),
-                'dep_apt': match_sub_flight.group(2),
-                'dep_time': match_sub_flight.group(3).replace(':', ''),
-                'arr_apt': match_sub_flight.group(4),
-                'arr_time': match_sub_flight.group(5).replace(':', ''),
-                'block_str': match_sub_flight.group(6),
-                'indicator': None
-            }
-        
-        if flight_data:
-            day = flight_data['day']
-            date_str = current_date.strftime('%Y-%m-%d')
-            
-            dep_h, dep_m = divmod(int(flight_data['dep_time']), 100)
-            arr_h, arr_m = divmod(int(flight_data['arr_time']), 100)
-            local_dep = f"{dep_h:02d}:{dep_m:02d}"
-            local_arr = f"{arr_h:02d}:{arr_m:02d}"
-            dep_minutes = dep_h * 60 + dep_m
-            arr_minutes = arr_h * 60 + arr_m
-            arr_date = current_date
-            
-            if arr_minutes < dep_minutes:
-                arr_date += timedelta(days=1)
-            arr_date_str = arr_date.strftime('%Y-%m-%d')
-            
-            block = parse_time_str_to_float(flight_data['block_str'])
-            if flight_data['indicator'] in ['D', 'DD', 'L']:
-                block = 0.0
-            
-            turn = 0.5
-            
-            report_local = report_times.get(day, None)
-            if not report_local:
-                report_local = header_report if day == start_date.day else 'MANUAL'
-            report_date_str = date_str
-            
-            layover_duration = None
-            hotel = None
-            if i + 1 < len(lines):
-                next_line = lines[i+1]
-                layover_match = re.match(r'^\s*(\d+)?\s*([A-Z]{3})\s+([\d.]+)\/(.*)', next_line)
-                if layover_match:
-                    layover_apt_match = layover_match.group(2)
-                    if layover_apt_match == flight_data['arr_apt']:
-                        layover_duration = layover_match.group(3)
-                        hotel = layover_match.group(4).strip()
-                        i += 1
-                        turn = 0.5
-                        
-            flights.append({
-                'date': date_str,
-                'dep': flight_data['dep_apt'],
-                'dep_time': local_dep,
-                'arr': flight_data['arr_apt'],
-                'arr_time': local_arr,
-                'arr_date': arr_date_str,
-                'report_time': report_local,
-                'report_date': report_date_str,
-                'block': block,
-                'turn': turn,
-                'flt': flight_data['flt'],
-                'layover_duration': layover_duration,
-                'hotel': hotel
-            })
-        
-        i += 1
-        
-    if flights:
-        flights[-1]['turn'] = 0.5
-        
-    return flights
-
-def parse_bid_dump(dump_text, start_date):
-    flights = []
-    day_offsets = {}
-    current_day_letter = None
-    current_date = None
-    first_report_time = None
-    first_report_date = None
-    
-    report_match = re.search(r'CHECK-IN AT (\d{2})\.(\d{2})', dump_text)
-    if report_match:
-        hh = report_match.group(1)
-        mm = report_match.group(2)
-        first_report_time = f"{hh}:{mm}"
-        
-    lines = [line for line in dump_text.split('\n') if line.strip()]
-    
-    flight_re = re.compile(
-        r'^\s*([A-Z])?\s*(I)?\s*(DH|L)?\s*(\d+)\s+([A-Z]{3})\s+(\d{4})\s+([A-Z]{3})\s+(\d{4})\s+([\d.]+)\s*([\d.]+)?'
-    )
-    i = 0
-    while i < len(lines):
-        line = lines[i]
-        match = flight_re.search(line)
-        if match:
-            day_letter, intl_indicator, is_dh, flt_num, dep_apt, dep_time, arr_apt, arr_time, block_str, turn_str = match.groups()
-            
-            if turn_str and '.' not in turn_str:
-                turn_str = None
-                
-            if day_letter:
-                current_day_letter = day_letter.upper()
-                offset = ord(current_day_letter) - ord('A')
-                day_offsets[current_day_letter] = offset
-                current_date = start_date + timedelta(days=offset)
-            if current_date is None:
-                if not flights:
-                    i += 1
-                    continue
-                last_flight_date_str = flights[-1]['date']
-                current_date = datetime.strptime(last_flight_date_str, '%Y-%m-%d').date()
-            
-            date_str = current_date.strftime('%Y-%m-%d')
-            
-            report_time_str = 'MANUAL'
-            report_date_str = date_str
-            
-            if current_day_letter and day_offsets.get(current_day_letter) == 0 and first_report_time:
-                is_first_flight_of_day = True
-                for f in flights:
-                    if f['date'] == date_str:
-                        is_first_flight_of_day = False
-                        break
-                        
-                if is_first_flight_of_day:
-                    report_time_str = first_report_time
-                    
-                if first_report_date is None:
-                        first_report_date = current_date
-                        
-            dep_h, dep_m = int(dep_time[:2]), int(dep_time[2:])
-            arr_h, arr_m = int(arr_time[:2]), int(arr_time[2:])
-            
-            local_dep = f"{dep_h:02d}:{dep_m:02d}"
-            local_arr = f"{arr_h:02d}:{arr_m:02d}"
-            dep_minutes = dep_h * 60 + dep_m
-            arr_minutes = arr_h * 60 + arr_m
-            arr_date = current_date
-            if arr_minutes < dep_minutes:
-                arr_date += timedelta(days=1)
-            arr_date_str = arr_date.strftime('%Y-%m-%d')
-            
-            block = parse_time_str_to_float(block_str)
-            
-            if is_dh_or_l:
-                block = 0.0
-                
-            turn = parse_time_str_to_float(turn_str)
-            if turn == 0.0:
-                turn = 0.5
-                
-            layover_duration = None
-            hotel = None
-            if i + 1 < len(lines):
-                next_line = lines[i+1]
-                layover_match = re.match(r'^\s*(\d+)?\s*([A-Z]{3})\s+([\d.]+)\/(.*)', next_line)
-                if layover_match:
-                    layover_apt_match = layover_match.group(2)
-                    if layover_apt_match == arr_apt:
-                        layover_duration = layover_match.group(3)
-                        hotel = layover_match.group(4).strip()
-                        i += 1
-                        turn = 0.5
-                        
-            flights.append({
-                'date': date_str,
-                'dep': dep_apt,
-                'dep_time': local_dep,
-                'arr': arr_apt,
-                'arr_time': local_arr,
-                'arr_date': arr_date_str,
-                'report_time': report_time_str,
-                'report_date': report_date_str,
-                'block': block,
-                'turn': turn,
-                'flt': flt_num,
-                'layover_duration': layover_duration,
-                'hotel': hotel
-            })
-            
-        i += 1
-        
-    if flights:
-        flights[-1]['turn'] = 0.5
-        
-    return flights
 
 def generate_civilian_export(rotation_dict, base_tz, base_tz_name):
     base_tz_short_name = base_tz_name.split(' ')[0]
@@ -877,16 +703,16 @@ def generate_civilian_export(rotation_dict, base_tz, base_tz_name):
             try:
                 if dep_apt not in AIRPORTS_TZ or arr_apt not in AIRPORTS_TZ:
                     return f"Error: Unknown airport timezone for {dep_apt} or {arr_apt}."
-                dep_tz = ZoneInfo(AIRPORTS_TZ[dep_apt])
-                arr_tz = ZoneInfo(AIRPORTS_TZ[arr_apt])
+                dep_tz = AIRPORTS_TZ[dep_apt]
+                arr_tz = AIRPORTS_TZ[arr_apt]
             except KeyError as e:
                 return f"Error: Unknown airport timezone for {e}."
                 
-            dep_local = datetime.strptime(flight['date'] + ' ' + flight['dep_time'], '%Y-%m-%d %H:%M').replace(tzinfo=dep_tz)
-            arr_local = datetime.strptime(flight['arr_date'] + ' ' + flight['arr_time'], '%Y-%m-%d %H:%M').replace(tzinfo=arr_tz)
+            dep_local = parse_local_datetime(flight['date'] + ' ' + flight['dep_time'])
+            arr_local = parse_local_datetime(flight['arr_date'] + ' ' + flight['arr_time'])
             
-            dep_base_tz = dep_local.astimezone(base_tz)
-            arr_base_tz = arr_local.astimezone(base_tz)
+            dep_base_tz = local_to_utc(dep_tz, dep_local).astimezone(base_tz)
+            arr_base_tz = local_to_utc(arr_tz, arr_local).astimezone(base_tz)
             
             time_str_base = f"{dep_base_tz.strftime('%a %d %I:%M%p')} - {arr_base_tz.strftime('%a %d %I:%M%p')}".lower()
             
@@ -918,212 +744,288 @@ def generate_civilian_export(rotation_dict, base_tz, base_tz_name):
         st.exception(e)
         return f"Error generating export: {e}"
 
-def generate_json_backup():
-    profile_data = {
-        "rotations": st.session_state.get('rotations', []),
-        "blackouts": st.session_state.get('blackouts', [])
-    }
-    return json.dumps(profile_data, indent=2)
-
-def parse_json_backup(file_contents, profile_id):
+# Version 1 backups were a single JSON document ({"rotations": [...], "blackouts": [...]}).
+# Version 2 is JSON Lines: a header naming the format and version, then one record per line.
+BACKUP_FORMAT = 'skedcheck-backup'
+BACKUP_VERSION = 2
+BACKUP_FETCH_ROWS = 500
+
+def write_json_backup(out, profile_id, pool=None):
+    # Streams the whole profile to a text stream straight from the DB cursors, a chunk of rows
+    # at a time, so the backup never exists as one document in memory.
+    pool = pool or get_connection_pool()
+    out.write(json.dumps({
+        'format': BACKUP_FORMAT,
+        'version': BACKUP_VERSION,
+        'created_at': datetime.now(ZoneInfo('UTC')).isoformat()
+    }) + '\n')
+    with pool.connection() as conn:
+        c = conn.execute('SELECT rotation_id, start_date, data FROM rotations WHERE profile_id = ? AND is_cancelled = 0 ORDER BY id DESC', (profile_id,))
+        seen = set()
+        while True:
+            rows = c.fetchmany(BACKUP_FETCH_ROWS)
+            if not rows:
+                break
+            lines = []
+            for rotation_id, start_date, data in rows:
+                if (rotation_id, start_date) in seen:
+                    continue
+                seen.add((rotation_id, start_date))
+                lines.append(json.dumps({'kind': 'rotation', 'rotation_id': rotation_id, 'start_date': start_date, 'data': data}) + '\n')
+            out.write(''.join(lines))
+            
+        c = conn.execute('SELECT type, start_datetime_utc, end_datetime_utc, block_id FROM blackouts WHERE profile_id = ? ORDER BY start_datetime_utc', (profile_id,))
+        while True:
+            rows = c.fetchmany(BACKUP_FETCH_ROWS)
+            if not rows:
+                break
+            out.write(''.join(
+                json.dumps({'kind': 'blackout', 'type': type_, 'start_datetime_utc': start, 'end_datetime_utc': end, 'block_id': block_id}) + '\n'
+                for type_, start, end, block_id in rows
+            ))
+
+def generate_json_backup(profile_id, compress=False, pool=None):
+    buffer = io.BytesIO()
+    raw = gzip.GzipFile(fileobj=buffer, mode='wb') if compress else buffer
+    out = io.TextIOWrapper(raw, encoding='utf-8', newline='\n')
+    write_json_backup(out, profile_id, pool)
+    out.flush()
+    out.detach()
+    if compress:
+        raw.close()
+    return buffer.getvalue()
+
+def read_json_backup(file_contents):
+    # Accepts either backup version, gzipped or not. Version 2 is read a line at a time.
+    if isinstance(file_contents, str):
+        file_contents = file_contents.encode('utf-8')
+    stream = io.BytesIO(file_contents)
+    if file_contents[:2] == b'\x1f\x8b':
+        stream = gzip.GzipFile(fileobj=stream)
+    lines = io.TextIOWrapper(stream, encoding='utf-8-sig')
+    
+    first_line = lines.readline()
     try:
-        data = json.loads(file_contents)
-        rotations = data.get('rotations', [])
-        blackouts = data.get('blackouts', [])
+        header = json.loads(first_line)
+    except json.JSONDecodeError:
+        header = None
+    if not (isinstance(header, dict) and header.get('format') == BACKUP_FORMAT):
+        return json.loads(first_line + lines.read())
+    if header.get('version') != BACKUP_VERSION:
+        raise ValueError(f"Unsupported backup version {header.get('version')!r}; this app reads versions 1 and {BACKUP_VERSION}.")
+        
+    data = {'rotations': [], 'blackouts': []}
+    for n, line in enumerate(lines, start=2):
+        if not line.strip():
+            continue
+        record = json.loads(line)
+        kind = record.pop('kind', None)
+        if kind == 'rotation':
+            data['rotations'].append(record)
+        elif kind == 'blackout':
+            data['blackouts'].append(record)
+        else:
+            raise ValueError(f"Line {n}: unknown record kind {kind!r}.")
+    return data
+
+BACKUP_BLACKOUT_TYPES = ('vacation', 'training', 'reserve')
+BACKUP_FLIGHT_FIELDS = ('dep', 'arr', 'date', 'dep_time', 'arr_date', 'arr_time')
+RESTORE_CHUNK_ROWS = 500
+
+def validate_json_backup(data):
+    # Checks every record before anything is written. Returns the rotations (deduplicated on
+    # rotation_id + start_date, last one wins, as repeated saves would), the blackouts and a
+    # list of problems; nothing should be restored if the list is not empty.
+    problems = []
+    if not isinstance(data, dict):
+        return [], [], ["The file does not contain a backup object."]
+    
+    rotations = {}
+    for n, rot in enumerate(data.get('rotations') or [], start=1):
+        try:
+            rotation_id = rot['rotation_id']
+            start_date = rot['start_date']
+            datetime.strptime(start_date, '%Y-%m-%d')
+            flights = json.loads(rot['data']) if isinstance(rot['data'], str) else rot['data']
+            if not isinstance(flights, list):
+                raise ValueError("flight data is not a list")
+            for f in flights:
+                missing = [field for field in BACKUP_FLIGHT_FIELDS if not isinstance(f.get(field), str)]
+                if missing:
+                    raise ValueError(f"flight is missing {', '.join(missing)}")
+                datetime.strptime(f['date'] + ' ' + f['dep_time'], '%Y-%m-%d %H:%M')
+                datetime.strptime(f['arr_date'] + ' ' + f['arr_time'], '%Y-%m-%d %H:%M')
+        except (KeyError, TypeError, ValueError, AttributeError) as e:
+            problems.append(f"Rotation #{n} ({rot.get('rotation_id', 'unknown') if isinstance(rot, dict) else 'unknown'}): {e}")
+            continue
+        rotations.pop((rotation_id, start_date), None)
+        rotations[(rotation_id, start_date)] = (rotation_id, start_date, flights)
         
-        rot_count = 0
-        for rot in rotations:
-            save_rotation(
-                profile_id,
-                rot['rotation_id'],
-                rot['start_date'],
-                json.loads(rot['data'])
+    blackouts = []
+    for n, b in enumerate(data.get('blackouts') or [], start=1):
+        try:
+            if b['type'] not in BACKUP_BLACKOUT_TYPES:
+                raise ValueError(f"unknown event type {b['type']!r}")
+            datetime.fromisoformat(b['start_datetime_utc'])
+            datetime.fromisoformat(b['end_datetime_utc'])
+        except (KeyError, TypeError, ValueError) as e:
+            problems.append(f"Event #{n}: {e}")
+            continue
+        blackouts.append((b['type'], b['start_datetime_utc'], b['end_datetime_utc'], b.get('block_id') or str(uuid.uuid4())))
+        
+    return list(rotations.values()), blackouts, problems
+
+def restore_backup_records(profile_id, rotations, blackouts, progress=None, pool=None, bump_version=True):
+    # Upserts a validated backup in one transaction: rotations on their (profile, rotation_id,
+    # start_date) key, then their legs, then the events. Any error rolls the whole restore back.
+    # Callers writing in several batches pass bump_version=False and bump once at the end.
+    total = max(1, len(rotations) * 2 + len(blackouts))
+    done = 0
+    
+    def step(n, text):
+        nonlocal done
+        done += n
+        if progress is not None:
+            progress(min(done / total, 1.0), text)
+            
+    with db_connection(pool) as conn:
+        c = conn.cursor()
+        for i in range(0, len(rotations), RESTORE_CHUNK_ROWS):
+            chunk = rotations[i:i + RESTORE_CHUNK_ROWS]
+            c.executemany('''
+            INSERT INTO rotations (profile_id, rotation_id, start_date, data) VALUES (?, ?, ?, ?)
+            ON CONFLICT (profile_id, rotation_id, start_date)
+            DO UPDATE SET data = excluded.data, updated_at = CURRENT_TIMESTAMP, is_cancelled = 0
+            ''', [(profile_id, rotation_id, start_date, json.dumps(flights)) for rotation_id, start_date, flights in chunk])
+            step(len(chunk), "Restoring rotations...")
+            
+        airports_tz = load_airports_map(c)
+        for i in range(0, len(rotations), RESTORE_CHUNK_ROWS):
+            chunk = rotations[i:i + RESTORE_CHUNK_ROWS]
+            # Row ids of just this chunk, looked up on the unique (profile, rotation_id, start_date) key.
+            keys = list({(rotation_id, start_date) for rotation_id, start_date, _ in chunk})
+            c.execute(
+                f"SELECT rotation_id, start_date, id FROM rotations WHERE profile_id = ? AND (rotation_id, start_date) IN (VALUES {', '.join(['(?, ?)'] * len(keys))})",
+                [profile_id] + [value for key in keys for value in key]
             )
-            rot_count += 1
-        
-        blackout_count = 0
-        for b in blackouts:
-            save_blackout(
-                profile_id,
-                b['type'],
-                b['start_datetime_utc'],
-                b['end_datetime_utc'],
-                b.get('block_id')
+            row_ids = {(rotation_id, start_date): row_id for rotation_id, start_date, row_id in c.fetchall()}
+            ids = [row_ids[(rotation_id, start_date)] for rotation_id, start_date, _ in chunk]
+            c.executemany('DELETE FROM legs WHERE rotation_db_id = ?', [(row_id,) for row_id in ids])
+            c.executemany(
+                f"INSERT INTO legs (rotation_db_id, profile_id, seq, {', '.join(LEG_COLUMNS)}) VALUES ({', '.join(['?'] * (len(LEG_COLUMNS) + 3))})",
+                [[row_id, profile_id, seq] + leg_row(f, airports_tz) for row_id, (_, _, flights) in zip(ids, chunk) for seq, f in enumerate(flights)]
             )
-            blackout_count += 1
+            step(len(chunk), "Restoring legs...")
             
-        st.success(f"Successfully imported {rot_count} rotations and {blackout_count} events.")
-        return True
-        
-    except json.JSONDecodeError:
+        for i in range(0, len(blackouts), RESTORE_CHUNK_ROWS):
+            chunk = blackouts[i:i + RESTORE_CHUNK_ROWS]
+            c.executemany('''
+            INSERT INTO blackouts (profile_id, type, start_datetime_utc, end_datetime_utc, block_id)
+            VALUES (?, ?, ?, ?, ?)
+            ''', [(profile_id,) + b for b in chunk])
+            step(len(chunk), "Restoring events...")
+            
+        if bump_version:
+            bump_data_version(c, profile_id)
+
+def parse_json_backup(file_contents, profile_id):
+    try:
+        data = read_json_backup(file_contents)
+    except (json.JSONDecodeError, UnicodeDecodeError, OSError, EOFError):
         st.error("Error: This does not appear to be a valid JSON backup file.")
         return False
+    except ValueError as e:
+        st.error(f"Error: {e}")
+        return False
+        
+    rotations, blackouts, problems = validate_json_backup(data)
+    if problems:
+        shown = "\n".join(f"- {p}" for p in problems[:10])
+        more = f"\n- ...and {len(problems) - 10} more" if len(problems) > 10 else ""
+        st.error(f"Backup not restored: {len(problems)} invalid record(s).\n{shown}{more}")
+        return False
+        
+    progress_bar = st.progress(0.0, text="Restoring backup...")
+    try:
+        restore_backup_records(profile_id, rotations, blackouts, lambda value, text: progress_bar.progress(value, text=text))
     except Exception as e:
-        st.error(f"An error occurred during import: {e}")
+        progress_bar.empty()
+        st.error(f"An error occurred during import, nothing was restored: {e}")
         return False
+    progress_bar.empty()
+    
+    st.success(f"Successfully imported {len(rotations)} rotations and {len(blackouts)} events.")
+    return True
 
-def generate_ical_export(processed_duties, calendar_blackouts):
-    utc_tz = ZoneInfo('UTC')
-    cal_lines = [
-        "BEGIN:VCALENDAR",
-        "VERSION:2.0",
-        "PRODID:-//SkedCheckApp//EN",
+BID_INGEST_BATCH = 250
+
+def bid_packet_rotations(pairings):
+    return [
+        (pairing_id, pairing['start_date'].strftime('%Y-%m-%d'), pairing['flights'])
+        for pairing_id, pairing in pairings.items() if pairing['flights']
     ]
-    
-    def dt_to_ical(dt):
-        return dt.astimezone(utc_tz).strftime('%Y%m%dT%H%M%SZ')
-        
-    for duty in processed_duties:
-        uid = str(uuid.uuid4())
-        start_utc = duty['report_utc']
-        end_utc = duty['release_utc']
-        
-        if duty['type'] == 'flight':
-            fdp_flights = duty.get('flights', [duty.get('flight')])
-            if not fdp_flights: continue
-            first_flight = fdp_flights[0]
-            last_flight = fdp_flights[-1]
-            
-            route = f"{first_flight['dep']}-{last_flight['arr']}"
-            if len(fdp_flights) > 1:
-                route = f"{first_flight['dep']}...{last_flight['arr']}"
-            
-            summary = f"✈️ {duty['rotation_id']} ({route})"
-            
-            description_parts = [
-                f"Rotation: {duty['rotation_id']}",
-                f"FDP: {hours_to_hhmm(duty['duty_hours'])}",
-                f"Block: {hours_to_hhmm(duty['block'])}",
-                "--- Flights ---"
-            ]
-            for f in fdp_flights:
-                flt_num = f.get('flt', f.get('flt_num', ''))
-                description_parts.append(
-                    f" {flt_num} {f['dep']} {f['dep_time']} - {f['arr']} {f['arr_time']}"
-                )
-            
-            description = "\\n".join(description_parts)
-            location = f"{first_flight['dep']} to {last_flight['arr']}"
-        elif duty['type'] == 'training':
-             summary = f" 🧑‍✈️ TRAINING: {duty['rotation_id']}"
-             description = "Training Duty"
-             location = "Training Center"
-        elif duty['type'] == 'reserve':
-            summary = f" RES: {duty['rotation_id']}"
-            description = "Reserve Duty"
-            location = "Base"
-            
-        cal_lines.extend([
-            "BEGIN:VEVENT",
-            f"UID:{uid}",
-            f"DTSTAMP:{dt_to_ical(datetime.now())}",
-            f"DTSTART:{dt_to_ical(start_utc)}",
-            f"DTEND:{dt_to_ical(end_utc)}",
-            f"SUMMARY:{summary}",
-            f"DESCRIPTION:{description}",
-            f"LOCATION:{location}",
-            "END:VEVENT"
-        ])
-        
-    for event in calendar_blackouts:
-        if event['type'] == 'vacation':
-            uid = str(uuid.uuid4())
-            start_utc = event['start_utc']
-            end_utc = event['end_utc']
-            
-            cal_lines.extend([
-                "BEGIN:VEVENT",
-                f"UID:{uid}",
-                f"DTSTAMP:{dt_to_ical(datetime.now())}",
-                f"DTSTART;VALUE=DATE:{start_utc.strftime('%Y%m%d')}",
-                f"DTEND;VALUE=DATE:{(end_utc + timedelta(days=1)).strftime('%Y%m%d')}",
-                "SUMMARY:🌴 VACATION",
-                "DESCRIPTION:Vacation Days",
-                "END:VEVENT"
-            ])
-    cal_lines.append("END:VCALENDAR")
-    return "\n".join(cal_lines)
+
+def run_bid_ingest(job, dump_text, start_date, profile_id, pool):
+    # Runs on its own thread so the page stays usable; job is a plain dict the page polls.
+    # Each batch of pairings is its own transaction, so the write lock is never held for
+    # the whole packet and other sessions can keep saving. The data version is bumped once,
+    # after the last batch (or after a failure, for the batches already saved).
+    try:
+        job.update(stage="Parsing pairings", done=0, total=0)
+        pairings = parse_bid_packet_bulk(dump_text, start_date, progress=lambda done, total: job.update(done=done, total=total))
+        rotations = bid_packet_rotations(pairings)
+        job.update(stage="Saving rotations", done=0, total=len(rotations))
+        saved = 0
+        try:
+            for i in range(0, len(rotations), BID_INGEST_BATCH):
+                batch = rotations[i:i + BID_INGEST_BATCH]
+                restore_backup_records(profile_id, batch, [], pool=pool, bump_version=False)
+                saved = job['done'] = i + len(batch)
+        finally:
+            if saved:
+                with db_connection(pool) as conn:
+                    bump_data_version(conn.cursor(), profile_id)
+        job.update(state='done', saved=len(rotations), empty=len(pairings) - len(rotations))
+    except Exception as e:
+        job.update(state='error', error=str(e))
+
+def start_bid_ingest(dump_text, start_date, profile_name):
+    profile_id = create_profile(profile_name)
+    if profile_id is None:
+        return None
+    job = {'state': 'running', 'profile_id': profile_id, 'profile_name': profile_name, 'stage': "Starting", 'done': 0, 'total': 0}
+    threading.Thread(
+        target=run_bid_ingest, args=(job, dump_text, start_date, profile_id, get_connection_pool()),
+        name='skedcheck-bid-ingest', daemon=True
+    ).start()
+    return job
+
+@st.fragment(run_every=1.0)
+def bid_ingest_progress():
+    # Only rendered while an import runs, so the timer stops with it.
+    job = st.session_state.get('bid_ingest_job')
+    if job is None:
+        return
+    if job['state'] != 'running':
+        st.rerun()
+    st.progress(job['done'] / job['total'] if job['total'] else 0.0, text=f"{job['stage']}: {job['done']} of {job['total']}")
 
 def parse_ical_import(file_contents, profile_id, base_tz):
     try:
-        cal = Calendar(file_contents)
-        events = sorted(cal.events, key=lambda e: e.begin)
-        
-        parsed_flights = []
-        flight_re = re.compile(r'(\w{2,3})\s*(\d+)\s*([A-Z]{3})-([A-Z]{3})')
-        simple_flight_re = re.compile(r'Flight\s*(\d+)')
+        rotations_to_save, skipped = parse_ical_rotations(file_contents, AIRPORT_REGISTRY)
+        for message in skipped:
+            st.warning(message)
         
-        for event in events:
-            summary = event.name or ""
-            description = event.description or ""
-            event_text = f"{summary} {description}"
-            
-            match = flight_re.search(event_text)
-            
-            if match:
-                flt_num = match.group(2)
-                dep_apt = match.group(3)
-                arr_apt = match.group(4)
-                
-                dep_utc = event.begin.datetime
-                arr_utc = event.end.datetime
-                
-                if dep_apt not in AIRPORTS_TZ or arr_apt not in AIRPORTS_TZ:
-                    st.warning(f"Skipping flight {flt_num} ({dep_apt}-{arr_apt}) on {dep_utc.date()}: Unknown airport code. Please add it manually.")
-                    continue
-                    
-                dep_local = dep_utc.astimezone(ZoneInfo(AIRPORTS_TZ[dep_apt]))
-                arr_local = arr_utc.astimezone(ZoneInfo(AIRPORTS_TZ[arr_apt]))
-                
-                block_hours = (arr_utc - dep_utc).total_seconds() / 3600
-                
-                flight_data = {
-                    'date': dep_local.strftime('%Y-%m-%d'),
-                    'dep': dep_apt,
-                    'dep_time': dep_local.strftime('%H:%M'),
-                    'arr': arr_apt,
-                    'arr_time': arr_local.strftime('%H:%M'),
-                    'arr_date': arr_local.strftime('%Y-%m-%d'),
-                    'report_time': 'MANUAL',
-                    'report_date': dep_local.strftime('%Y-%m-%d'),
-                    'block': block_hours,
-                    'turn': 0.5,
-                    'flt': flt_num,
-                    'dep_utc': dep_utc,
-                    'arr_utc': arr_utc
-                }
-                parsed_flights.append(flight_data)
-        
-        if not parsed_flights:
+        if not rotations_to_save:
             st.error("No valid flight data found in iCal file. Check if flights are in 'FLT 123 AAA-BBB' format.")
             return False
             
-        rotations_to_save = []
-        current_rotation = []
-        last_flight_time = None
-        
-        for flight in sorted(parsed_flights, key=lambda x: x['dep_utc']):
-            if not last_flight_time or (flight['dep_utc'] - last_flight_time).total_seconds() < 36 * 3600:
-                current_rotation.append(flight)
-            else:
-                rotations_to_save.append(current_rotation)
-                current_rotation = [flight]
-            last_flight_time = flight['arr_utc'].astimezone(ZoneInfo('UTC'))
-            
-        if current_rotation:
-            rotations_to_save.append(current_rotation)
-            
         saved_count = 0
         for rot in rotations_to_save:
-            if rot:
-                start_date = rot[0]['date']
-                rot_id = f"iCal-{start_date}"
-                for f in rot:
-                    f.pop('dep_utc', None)
-                    f.pop('arr_utc', None)
-                
-                save_rotation(profile_id, rot_id, start_date, rot)
-                saved_count += 1
+            start_date = rot[0]['date']
+            rot_id = f"iCal-{start_date}"
+            save_rotation(profile_id, rot_id, start_date, rot)
+            saved_count += 1
         
         st.success(f"Successfully imported {saved_count} rotations from iCal file.")
         return True
@@ -1131,265 +1033,59 @@ def parse_ical_import(file_contents, profile_id, base_tz):
         st.error(f"An error occurred during iCal import: {e}")
         return False
 
-class FAR117Calculator:
-    def __init__(self):
-        self.duties = []
-        self.last_release_utc = None
-        self.acclimated = True
-        self.unacclimated_until = None
-        self.last_offset = None
-        
-    def check_30_in_168(self, start_time):
-        window_start = start_time - timedelta(hours=168)
-        relevant_duties = [d for d in self.duties if d['release_utc'] > window_start and d['report_utc'] < start_time]
-        if not relevant_duties:
-            return True
-        relevant_duties = sorted(relevant_duties, key=lambda d: d['report_utc'])
-        rests = []
-        prev_end = window_start
-        for d in relevant_duties:
-            if d['report_utc'] > prev_end:
-                rest = (d['report_utc'] - prev_end).total_seconds() / 3600
-                rests.append(rest)
-            prev_end = max(prev_end, d['release_utc'])
-        if start_time > prev_end:
-            rest = (start_time - prev_end).total_seconds() / 3600
-            rests.append(rest)
-        max_rest = max(rests) if rests else 168.0
-        return max_rest >= 30
-    
-    def add_generic_duty(self, report_utc, release_utc, is_flight_duty=False):
-        if is_flight_duty:
-            if not self.check_30_in_168(report_utc):
-                return False
-                
-            if self.last_release_utc:
-                rest_hours = (report_utc - self.last_release_utc).total_seconds() / 3600
-                if rest_hours < 10:
-                    return False
-        
-        if self.last_release_utc and report_utc < self.last_release_utc:
-             return False
-             
-        self.last_release_utc = release_utc
-        self.duties.append({'report_utc': report_utc, 'release_utc': release_utc})
-        return True
-    
-    def add_flight(self, date_str, dep_airport, local_dep_time, arr_airport, local_arr_time, arr_date_str=None, report_time=None, report_date_str=None, block=None, turn=0.0):
-        pass
-
-def get_daily_remaining_range(day_data, processed_duties, base_tz):
-    # 1. Setup Timestamps for "Today"
-    # We define the reference point 't' as the end of the selected day in UTC.
-    day_start = datetime(day_data.year, day_data.month, day_data.day, 0, 0, 0, tzinfo=base_tz)
-    day_end = datetime(day_data.year, day_data.month, day_data.day, 23, 59, 59, tzinfo=base_tz)
-    day_start_utc = day_start.astimezone(ZoneInfo('UTC'))
-    day_end_utc = day_end.astimezone(ZoneInfo('UTC'))
-    
-    t_now = day_end_utc
-
-    # 2. Check: Am I legal RIGHT NOW based on the past? (The Backward Look)
-    # ---------------------------------------------------------
-    
-    # --- 672 Block Check (Backward) ---
-    used_block_672_backward = 0.0
-    window_start_672 = t_now - timedelta(hours=672)
-    
-    for duty in processed_duties:
-        if duty['type'] == 'flight' and duty['block'] > 0:
-            flights_in_duty = duty.get('flights', [])
-            if not flights_in_duty and duty.get('flight'):
-                 flights_in_duty = [duty['flight']]
-            
-            for flight in flights_in_duty:
-                if not flight: continue
-                dep_utc = flight.get('dep_utc')
-                arr_utc = flight.get('arr_utc')
-                block = flight.get('block', 0)
-                
-                if not dep_utc or not arr_utc or block == 0: continue
-                
-                # Check intersection with the 672h window
-                overlap_start = max(dep_utc, window_start_672)
-                overlap_end = min(arr_utc, t_now)
-                
-                if overlap_end > overlap_start:
-                    fraction = (overlap_end - overlap_start).total_seconds() / (arr_utc - dep_utc).total_seconds()
-                    used_block_672_backward += fraction * block
-
-    # --- 168 FDP Check (Backward) ---
-    used_fdp_168_backward = 0.0
-    window_start_168 = t_now - timedelta(hours=168)
-    
-    for duty in processed_duties:
-        if duty['type'] == 'flight':
-            report_utc = duty['report_utc']
-            release_utc = duty['release_utc']
-            
-            overlap_start = max(report_utc, window_start_168)
-            overlap_end = min(release_utc, t_now)
-            
-            if overlap_end > overlap_start:
-                duration = (overlap_end - overlap_start).total_seconds() / 3600
-                used_fdp_168_backward += duration
-
-    # 3. Check: Will flying today break a FUTURE trip? (The Forward Constraint)
-    # ---------------------------------------------------------
-    # We assume 'Today' adds to the bucket. We must find the smallest 'slack' 
-    # in any future window that overlaps with 'Today'.
-
-    min_future_block_slack = 100.0
-    min_future_fdp_slack = 60.0
-
-    # Filter for duties that start AFTER today
-    future_duties = [d for d in processed_duties if d['report_utc'] > t_now]
-
-    for future_duty in future_duties:
-        # FUTURE CHECK: BLOCK (672h)
-        if future_duty['type'] == 'flight':
-            # The critical moment is the END of this future flight leg/duty
-            # (Strictly speaking, legality is checked at report, but the 
-            # limits are rolling. We check at the future duty report time 
-            # to see if 'today' is inside its lookback).
-            
-            future_check_point = future_duty['report_utc'] 
-            
-            # If the future trip is more than 672 hours away, 
-            # today's flying won't affect it.
-            if (future_check_point - t_now).total_seconds() / 3600 > 672:
-                continue
-                
-            # Calculate how much block is ALREADY scheduled in that future window
-            # (excluding today, because we are trying to find today's room)
-            future_window_start = future_check_point - timedelta(hours=672)
-            used_in_future_window = 0.0
-            
-            for d in processed_duties:
-                # We skip duties that happen on "Today" (between day_start_utc and day_end_utc)
-                # because that is the 'variable' we are solving for.
-                # We only count fixed past flying and fixed future flying.
-                if d['report_utc'] >= day_start_utc and d['release_utc'] <= day_end_utc:
-                    continue
-                
-                if d['type'] == 'flight' and d['block'] > 0:
-                     flights_in_duty = d.get('flights', []) or ([d['flight']] if d.get('flight') else [])
-                     for flt in flights_in_duty:
-                        if not flt: continue
-                        dep = flt.get('dep_utc')
-                        arr = flt.get('arr_utc')
-                        blk = flt.get('block', 0)
-                        if not dep or not arr: continue
-                        
-                        overlap_start = max(dep, future_window_start)
-                        overlap_end = min(arr, future_check_point)
-                        
-                        if overlap_end > overlap_start:
-                             fraction = (overlap_end - overlap_start).total_seconds() / (arr - dep).total_seconds()
-                             used_in_future_window += fraction * blk
-            
-            slack = 100.0 - used_in_future_window
-            if slack < min_future_block_slack:
-                min_future_block_slack = slack
-
-        # FUTURE CHECK: FDP (168h)
-        # Note: 168h is much shorter. Future constraints only apply if the future trip 
-        # is within 168h (7 days) of today.
-        if future_duty['type'] == 'flight':
-            future_report = future_duty['report_utc']
-            
-            if (future_report - t_now).total_seconds() / 3600 <= 168:
-                future_window_start = future_report - timedelta(hours=168)
-                used_in_future_window = 0.0
-                
-                for d in processed_duties:
-                    # Skip "Today"
-                    if d['report_utc'] >= day_start_utc and d['release_utc'] <= day_end_utc:
-                        continue
-                        
-                    if d['type'] == 'flight':
-                         overlap_start = max(d['report_utc'], future_window_start)
-                         overlap_end = min(d['release_utc'], future_report)
-                         
-                         if overlap_end > overlap_start:
-                             duration = (overlap_end - overlap_start).total_seconds() / 3600
-                             used_in_future_window += duration
-                             
-                slack = 60.0 - used_in_future_window
-                if slack < min_future_fdp_slack:
-                    min_future_fdp_slack = slack
-
-    # 4. Final Calculation
-    # ---------------------------------------------------------
-    remaining_block_backward = max(0.0, 100.0 - used_block_672_backward)
-    remaining_fdp_backward = max(0.0, 60.0 - used_fdp_168_backward)
-    
-    # The actual remaining is the MINIMUM of what history allows 
-    # and what the future schedule permits.
-    final_remaining_block = min(remaining_block_backward, min_future_block_slack)
-    final_remaining_fdp = min(remaining_fdp_backward, min_future_fdp_slack)
-
-    # 5. Rest Calculation (Standard Backward check for 30 in 168)
-    # Note: 30-in-168 is a binary "Go/No-Go" status check, usually not a "bucket" of time.
-    # We keep the original logic here but ensure it checks strictly backward from now.
-    max_rest = 0.0
-    window_start_168_rest = t_now - timedelta(hours=168)
-    
-    relevant_duties = [d for d in processed_duties 
-                       if d['type'] in ['flight', 'training'] 
-                       and d['release_utc'] > window_start_168_rest 
-                       and d['report_utc'] < t_now]
-                       
-    if not relevant_duties:
-         max_rest = 168.0
-    else:
-        relevant_duties = sorted(relevant_duties, key=lambda d: d['report_utc'])
-        rests = []
-        prev_end = window_start_168_rest
-        
-        for duty in relevant_duties:
-            if duty['report_utc'] > prev_end:
-                rest_duration = (duty['report_utc'] - prev_end).total_seconds() / 3600
-                rests.append(rest_duration)
-            prev_end = max(prev_end, duty['release_utc'])
-        
-        if t_now > prev_end:
-            final_rest = (t_now - prev_end).total_seconds() / 3600
-            rests.append(final_rest)
-            
-        max_rest = max(rests) if rests else 168.0
-        
-    has_flight_duty_today = any(
-        d['type'] == 'flight' and
-        d['report_utc'] >= day_start_utc and
-        d['report_utc'] <= day_end_utc
-        for d in processed_duties
-    )
-    
-    fdp_exceeded = used_fdp_168_backward > 60
-    has_30h_conflict = max_rest < 30
-    rest_conflict = has_flight_duty_today and has_30h_conflict
-
-    return {
-        'min_block': max(0.0, final_remaining_block),
-        'max_block': max(0.0, final_remaining_block), # Max/Min logic can be expanded if 'Today' is variable, currently they are same
-        'min_fdp': max(0.0, final_remaining_fdp),
-        'max_fdp': max(0.0, final_remaining_fdp),
-        'rest_conflict': rest_conflict,
-        'fdp_exceeded': (has_flight_duty_today and fdp_exceeded)
-    }
+@st.cache_resource(max_entries=32, show_spinner=False)
+def load_profile_schedule(profile_id, data_version, base_tz_str, data_window, _rotations, _blackouts, _airports_tz, _legs=None):
+    # Keyed on the profile's data version and loaded date window, so reruns that don't touch
+    # the schedule skip parsing entirely. The result is shared across sessions: treat it as read-only.
+    return assemble_schedule(_rotations, _blackouts, _airports_tz, base_tz_str, _legs)
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def load_full_profile_schedule(profile_id, data_version, base_tz_str):
+    # Whole-profile schedule for exports; reads straight from the DB on a cache miss.
+    return assemble_schedule(load_rotations(profile_id), load_blackouts(profile_id), load_airports_tz(), base_tz_str, load_legs(profile_id))
+
+@st.cache_resource(max_entries=8, show_spinner=False)
+def load_profile_ical_export(profile_id, data_version, base_tz_str):
+    schedule = load_full_profile_schedule(profile_id, data_version, base_tz_str)
+    return generate_ical_export(schedule['processed_duties'], schedule['calendar_blackouts'])
+
+@st.cache_resource(max_entries=4, show_spinner=False)
+def load_pairing_screen(profile_id, data_version, candidate_profile_id, candidate_version, base_tz_str):
+    # Every pairing of a what-if profile checked against the whole of this profile's schedule.
+    schedule = load_full_profile_schedule(profile_id, data_version, base_tz_str)
+    airports_tz = load_airports_tz()
+    candidates = build_duties(load_rotations(candidate_profile_id), [], airports_tz, base_tz_str, load_legs(candidate_profile_id))
+    return screen_pairings(schedule, candidates['processed_duties'], airports_tz, base_tz_str)
+
+FEED_HOST = os.environ.get('SKEDCHECK_FEED_HOST', '127.0.0.1')
+FEED_PORT = int(os.environ.get('SKEDCHECK_FEED_PORT', '8599'))
+# Address calendar apps reach the feed at (e.g. https://skedcheck.example.com behind a proxy);
+# defaults to this machine's host and port.
+FEED_PUBLIC_URL = os.environ.get('SKEDCHECK_FEED_PUBLIC_URL', '').rstrip('/')
+
+def render_profile_feed(pool, profile_id, tz_name):
+    # Runs on the feed server's threads, outside any script run, so it reads through the pool it was given.
+    schedule = assemble_schedule(load_rotations(profile_id, pool=pool), load_blackouts(profile_id, pool=pool), load_airports_tz(pool), tz_name, load_legs(profile_id, pool=pool))
+    return generate_ical_export(schedule['processed_duties'], schedule['calendar_blackouts'])
+
+@st.cache_resource(show_spinner=False)
+def start_ical_feed():
+    # One subscription server per process. None when disabled (SKEDCHECK_FEED_PORT=0) or the port is taken.
+    if not FEED_PORT:
+        return None
+    pool = get_connection_pool()
+    feed = ICalFeed(partial(load_data_version, pool=pool), partial(render_profile_feed, pool), tz_options[tz_options_list[0]], partial(load_feed_token, pool=pool))
+    try:
+        return ICalFeedServer((FEED_HOST, FEED_PORT), feed).start()
+    except OSError:
+        return None
 
-def hours_to_hhmm(hours):
-    if hours <= 0:
-        return "00:00"
-    h = int(hours)
-    m_float = (hours - h) * 60
-    m = int(round(m_float))
-    
-    if m == 60:
-        h += 1
-        m = 0
-        
-    return f"{h:02d}:{m:02d}"
+def ical_feed_url(profile_id, tz_name):
+    base_url = FEED_PUBLIC_URL
+    if not base_url:
+        host = 'localhost' if FEED_HOST in ('', '0.0.0.0', '127.0.0.1') else FEED_HOST
+        base_url = f"http://{host}:{FEED_PORT}"
+    return f"{base_url}/ical/{profile_id}/{profile_feed_token(profile_id)}.ics?tz={tz_name}"
 
 def copy_to_clipboard_js(text_to_copy, button_id):
     js = f"""
@@ -1436,7 +1132,8 @@ def copy_to_clipboard_js(text_to_copy, button_id):
     return js
 
 init_db()
-AIRPORTS_TZ = load_airports_tz()
+AIRPORT_REGISTRY = get_airport_registry()
+AIRPORTS_TZ = AIRPORT_REGISTRY.tz_names
 all_profiles = load_profiles()
 profile_map = {p['name']: p['id'] for p in all_profiles}
 profile_id_map = {p['id']: p['name'] for p in all_profiles}
@@ -1473,12 +1170,54 @@ if "select_date" in query_params:
 elif 'edit_event_date_picker' not in st.session_state:
     st.session_state.edit_event_date_picker = datetime.today().date()
 
-def load_data_into_state(profile_id):
-    st.session_state.rotations = load_rotations(profile_id)
-    st.session_state.blackouts = load_blackouts(profile_id)
+# Only rotations and blackouts that can affect the visible calendar are held in session state:
+# the 12 displayed weeks (and the Manage date) padded by the 672-hour lookback/lookahead plus a day
+# of time zone slack. The loaded window carries extra prefetch so small picker moves don't hit the DB.
+CALENDAR_WEEKS = 12
+DATA_WINDOW_PADDING = timedelta(days=29)
+DATA_WINDOW_PREFETCH = timedelta(weeks=8)
+
+def default_calendar_start(today):
+    current_week_start = today - timedelta(days=(today.weekday() + 1) % 7)
+    return current_week_start - timedelta(weeks=2)
+
+def required_data_window():
+    calendar_start = st.session_state.get('calendar_start_date') or default_calendar_start(datetime.today().date())
+    week_start = calendar_start - timedelta(days=(calendar_start.weekday() + 1) % 7)
+    manage_date = st.session_state.edit_event_date_picker
+    start = min(week_start, manage_date) - DATA_WINDOW_PADDING
+    end = max(week_start + timedelta(weeks=CALENDAR_WEEKS), manage_date) + DATA_WINDOW_PADDING
+    return start, end
+
+def data_window_covers(loaded, needed):
+    return loaded is not None and loaded[0] <= needed[0] and needed[1] <= loaded[1]
+
+def load_data_into_state(profile_id, data_window=None):
+    if data_window is None:
+        data_window = st.session_state.get('data_window')
+    if not data_window_covers(data_window, required_data_window()):
+        needed_start, needed_end = required_data_window()
+        data_window = (needed_start - DATA_WINDOW_PREFETCH, needed_end + DATA_WINDOW_PREFETCH)
+    start_date, end_date = data_window
+    utc_tz = ZoneInfo('UTC')
+    st.session_state.data_version = load_data_version(profile_id)
+    with perf.stage('load_rotations'):
+        st.session_state.rotations = load_rotations(profile_id, start_date, end_date)
+    with perf.stage('load_legs'):
+        st.session_state.legs = load_legs(profile_id, start_date, end_date)
+    with perf.stage('load_blackouts'):
+        st.session_state.blackouts = load_blackouts(
+            profile_id,
+            datetime.combine(start_date, time.min, tzinfo=utc_tz),
+            datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=utc_tz)
+        )
+    st.session_state.data_window = data_window
     st.session_state.data_loaded_for_profile = profile_id
 
-if 'data_loaded_for_profile' not in st.session_state or st.session_state.data_loaded_for_profile != st.session_state.active_profile_id:
+if ('data_loaded_for_profile' not in st.session_state
+        or st.session_state.data_loaded_for_profile != st.session_state.active_profile_id
+        or st.session_state.get('data_version') != load_data_version(st.session_state.active_profile_id)
+        or not data_window_covers(st.session_state.get('data_window'), required_data_window())):
     load_data_into_state(st.session_state.active_profile_id)
     
 with col_prof:
@@ -1535,185 +1274,20 @@ selected_tz_name = st.session_state.selected_tz_name
 base_tz_str = tz_options[selected_tz_name]
 base_tz = ZoneInfo(base_tz_str)
 # --- END FIX ---
-rotations = st.session_state.get('rotations', [])
-blackouts = st.session_state.get('blackouts', [])
-
-calendar_blackouts = []
-processed_duties = []
+with perf.stage('schedule'):
+    schedule = load_profile_schedule(
+        active_profile_id, st.session_state.data_version, base_tz_str, st.session_state.data_window,
+        st.session_state.get('rotations', []), st.session_state.get('blackouts', []), AIRPORTS_TZ,
+        st.session_state.get('legs')
+    )
+processed_duties = schedule['processed_duties']
+calendar_blackouts = schedule['calendar_blackouts']
 utc_tz = ZoneInfo('UTC')
-error_in_processing = False
-
-vacation_events = []
-training_events = []
-reserve_events = []
-for b in blackouts:
-    start_utc = datetime.fromisoformat(b['start_datetime_utc'])
-    end_utc = datetime.fromisoformat(b['end_datetime_utc'])
-    
-    # MODIFIED: Map types
-    event_type_map = {'vacation': 'VAC', 'training': 'TRNG', 'reserve': 'RES'}
-    event_id = event_type_map.get(b['type'], 'EVENT')
-    
-    event_obj = {
-        'type': b['type'],
-        'id': b['id'],
-        'label': event_id,
-        'start_utc': start_utc,
-        'end_utc': end_utc,
-        'block_id': b.get('block_id')
-    }
-    
-    if b['type'] == 'vacation':
-        vacation_events.append(event_obj)
-    # UPDATED: Standard 'training' check
-    elif b['type'] == 'training':
-        training_events.append(event_obj)
-    elif b['type'] == 'reserve':
-        reserve_events.append(event_obj)
-        
-rotation_covered_dates = set()
-for rot in rotations:
-    try:
-        flights = json.loads(rot['data'])
-        if not flights:
-            continue
-        min_date = datetime.strptime(rot['start_date'], '%Y-%m-%d').date()
-        max_date = max(datetime.strptime(f['arr_date'], '%Y-%m-%d').date() for f in flights)
-        date = min_date
-        
-        while date <= max_date:
-            rotation_covered_dates.add(date)
-            date += timedelta(days=1)
-    except:
-        pass
-        
-    flights_by_day = {}
-    
-    for f in flights:
-        if f['dep'] not in AIRPORTS_TZ or f['arr'] not in AIRPORTS_TZ:
-            st.error(f"Error processing rotation {rot['rotation_id']}. Unknown airport: {f['dep']} or {f['arr']}. Please add it via the 'Add Airport Timezone' tool and re-submit this rotation.", icon="✈️")
-            error_in_processing = True
-            continue
-            
-        dep_tz = ZoneInfo(AIRPORTS_TZ[f['dep']])
-        report_tz = dep_tz
-        arr_tz = ZoneInfo(AIRPORTS_TZ[f['arr']])
-        
-        try:
-            dep_local = datetime.strptime(f['date'] + ' ' + f['dep_time'], '%Y-%m-%d %H:%M').replace(tzinfo=dep_tz)
-            arr_local = datetime.strptime(f['arr_date'] + ' ' + f['arr_time'], '%Y-%m-%d %H:%M').replace(tzinfo=arr_tz)
-        except ValueError as e:
-            st.error(f"Rotation {rot['rotation_id']} has invalid time data: {e}")
-            error_in_processing = True
-            continue
-            
-        if f['report_time'] and f['report_time'] != 'MANUAL':
-            try:
-                report_local = datetime.strptime(f['report_date'] + ' ' + f['report_time'], '%Y-%m-%d %H:%M').replace(tzinfo=report_tz)
-            except ValueError:
-                report_local = dep_local - timedelta(hours=1.5)
-        else:
-            report_local = dep_local - timedelta(hours=1.5)
-            
-        report_utc = report_local.astimezone(utc_tz)
-        dep_utc = dep_local.astimezone(utc_tz)
-        arr_utc = arr_local.astimezone(utc_tz)
-        release_utc = arr_utc + timedelta(hours=f.get('turn', 0.5))
-        
-        f['report_utc'] = report_utc
-        f['dep_utc'] = dep_utc
-        f['arr_utc'] = arr_utc
-        f['release_utc'] = release_utc
-        
-        report_date_str = f['report_date']
-        if report_date_str not in flights_by_day:
-            flights_by_day[report_date_str] = []
-        flights_by_day[report_date_str].append(f)
-        
-    for report_date, flights_on_this_day in flights_by_day.items():
-        if not flights_on_this_day:
-            continue
-            
-        first_flight = flights_on_this_day[0]
-        last_flight = flights_on_this_day[-1]
-        
-        fdp_obj = {
-            'type': 'flight',
-            'report_utc': first_flight['report_utc'],
-            'dep_utc': first_flight['dep_utc'],
-            'arr_utc': last_flight['arr_utc'],
-            'release_utc': last_flight['release_utc'],
-            'duty_hours': (last_flight['release_utc'] - first_flight['report_utc']).total_seconds() / 3600,
-            'block': sum(fl.get('block', 0) for fl in flights_on_this_day),
-            'rotation_id': rot['rotation_id'],
-            'flights': list(flights_on_this_day),
-            'flight': first_flight,
-            'rotation_db_id': rot['id'],
-            'rotation_start_date': rot['start_date']
-        }
-        processed_duties.append(fdp_obj)
-        
-calendar_blackouts.extend(vacation_events)
-
-calendar_blackouts.extend(training_events)
-
-for event in training_events:
-    # UPDATED: Add training as 'training' type to processed_duties for rest calculation
-    processed_duties.append({
-        'type': 'training', 
-        'report_utc': event['start_utc'],
-        'dep_utc': event['start_utc'],
-        'arr_utc': event['end_utc'],
-        'release_utc': event['end_utc'],
-        'duty_hours': (event['end_utc'] - event['start_utc']).total_seconds() / 3600,
-        'block': 0.0,
-        'rotation_id': event['label'],
-        'flight': None,
-        'flights': []
-    })
-    
-for event in reserve_events:
-    reserve_day = event['start_utc'].astimezone(base_tz).date()
-    if reserve_day in rotation_covered_dates:
-        continue
-        
-    is_overridden = False
-    event_midpoint_utc = event['start_utc'] + (event['end_utc'] - event['start_utc']) / 2
-            
-    for vac in vacation_events:
-        if vac['start_utc'] <= event_midpoint_utc <= vac['end_utc']:
-            is_overridden = True
-            break
-    if is_overridden: continue
-    
-    # Check against training
-    for trng in training_events:
-        if trng['start_utc'] <= event_midpoint_utc <= trng['end_utc']:
-            is_overridden = True
-            break
-    if is_overridden: continue
-    
-    calendar_blackouts.append(event)
-    processed_duties.append({
-        'type': 'reserve',
-        'report_utc': event['start_utc'],
-        'dep_utc': event['start_utc'],
-        'arr_utc': event['end_utc'],
-        'release_utc': event['end_utc'],
-        'duty_hours': (event['end_utc'] - event['start_utc']).total_seconds() / 3600,
-        'block': 0.0,
-        'rotation_id': event['label'],
-        'flight': None,
-        'flights': []
-    })
-    
-processed_duties.sort(key=lambda duty: duty['report_utc'])
+for message, icon in schedule['errors']:
+    st.error(message, icon=icon)
+error_in_processing = bool(schedule['errors'])
 
-calc = FAR117Calculator()
-if not error_in_processing:
-    for duty in processed_duties:
-        is_flight_duty = duty['type'] == 'flight' # UPDATED: Only flight counts for main FDP calc
-        calc.add_generic_duty(duty['report_utc'], duty['release_utc'], is_flight_duty=is_flight_duty)
+calc = schedule['calculator']
         
 tab1, tab2, tab3 = st.tabs(["Calendar & Details", "Input & Manage", "Help & About"])
 
@@ -1722,29 +1296,11 @@ with tab1:
     
     today = datetime.now(tz=base_tz).date()
     
-    rotation_display_ranges = {}
-    for rot in st.session_state.rotations:
-        try:
-            flights = json.loads(rot['data'])
-            if not flights:
-                continue
-            min_date = datetime.strptime(rot['start_date'], '%Y-%m-%d').date()
-            max_date = max(datetime.strptime(f['arr_date'], '%Y-%m-%d').date() for f in flights)
-            rotation_display_ranges[rot['id']] = {
-                'id': rot['rotation_id'],
-                'start': min_date,
-                'end': max_date,
-                'db_id': rot['id'],
-                'raw_data': rot
-            }
-        except (json.JSONDecodeError, ValueError, TypeError):
-            st.error(f"Could not display rotation {rot.get('rotation_id', 'Unknown')}. Data may be corrupt or incomplete.")
+    rotation_display_ranges = schedule['rotation_display_ranges']
+    for message in schedule['display_errors']:
+        st.error(message)
             
-    weekday = today.weekday()
-    current_week_start = today - timedelta(days=(weekday + 1) % 7)
-    current_default = current_week_start - timedelta(weeks=2)
-    
-    default_start = current_default
+    default_start = default_calendar_start(today)
     
     if 'calendar_start_date' not in st.session_state:
         st.session_state.calendar_start_date = default_start
@@ -1891,13 +1447,40 @@ with tab1:
     chart_avg_blocks = []
     chart_conflicts = 0
     
+    window_index = schedule['window_index']
+    grid_days = [week_start + timedelta(days=i) for i in range(CALENDAR_WEEKS * 7)]
+    summary_cache = st.session_state.get('day_summary_cache')
+    if summary_cache is None or summary_cache.key != (active_profile_id, base_tz_str):
+        summary_cache = st.session_state.day_summary_cache = DaySummaryCache(active_profile_id, base_tz_str)
+    with perf.stage('day_summaries'):
+        summary_cache.update(window_index, st.session_state.data_window)
+        grid_summaries = summary_cache.grid_summaries(grid_days, base_tz)
+    if "check_incremental" in st.query_params:
+        stale_days = summary_cache.verify(grid_days, base_tz)
+        if stale_days:
+            st.error(f"Incremental legality check failed for {len(stale_days)} day(s): {', '.join(str(d) for d in stale_days)}")
+    
+    # Per-duty Table A/B limits from the calculator pass, keyed by local report date.
+    duty_limit_notes = {}
+    for limits in calc.duty_limits:
+        report_day = limits['report_utc'].astimezone(base_tz).date()
+        if limits['fdp_exceeded']:
+            duty_limit_notes.setdefault(report_day, []).append(
+                f"FDP {hours_to_hhmm(limits['fdp_hours'])} over {hours_to_hhmm(limits['fdp_limit'])} limit ({'Table C' if limits['augmented'] else 'Table B'})"
+            )
+        if limits['flight_time_exceeded']:
+            duty_limit_notes.setdefault(report_day, []).append(
+                f"Flight time {hours_to_hhmm(limits['flight_hours'])} over {hours_to_hhmm(limits['flight_time_limit'])} limit ({'augmented' if limits['augmented'] else 'Table A'})"
+            )
+    
+    html_timer = perf.start('calendar_html')
     html = '<table class="calendar-table">'
     html += '<tr>' + ''.join(f'<th>{day}</th>' for day in days_of_week) + '</tr>'
     
-    for week in range(12):
+    for week in range(CALENDAR_WEEKS):
         html += '<tr>'
         for day_idx in range(7):
-            day_data = week_start + timedelta(days=week*7 + day_idx)
+            day_data = grid_days[week*7 + day_idx]
             day_type = ''
             class_name = ''
             
@@ -1920,10 +1503,10 @@ with tab1:
                         class_name = class_name_map.get(event['type'], 'rotation-id')
                         break
                         
-            summary = get_daily_remaining_range(day_data, processed_duties, base_tz)
+            summary = grid_summaries[week*7 + day_idx]
             
             cell_class = 'calendar-cell'
-            if summary['min_block'] <= 0 or summary['min_fdp'] <= 0 or summary['rest_conflict'] or summary['fdp_exceeded']:
+            if summary['min_block'] <= 0 or summary['min_fdp'] <= 0 or summary['rest_conflict'] or summary['fdp_exceeded'] or day_data in duty_limit_notes:
                 cell_class += ' conflict'
                 chart_conflicts += 1
             elif summary['min_block'] < 10 or summary['min_fdp'] < 10:
@@ -1939,6 +1522,8 @@ with tab1:
                 f"Rest Conflict: {'Yes' if summary['rest_conflict'] else 'No'}\n"
                 f"FDP Exceeded: {'Yes' if summary['fdp_exceeded'] else 'No'}"
             )
+            for note in duty_limit_notes.get(day_data, []):
+                tooltip += f"\nDuty Limit: {note}"
             
             html += f'<td class="{cell_class}" title="{tooltip}">'
             
@@ -1958,6 +1543,7 @@ with tab1:
             
         html += '</tr>'
     html += '</table>'
+    html_timer.stop()
     
     calendar_container = st.container()
     
@@ -2017,31 +1603,47 @@ with tab2:
             st.subheader("Export")
             st.caption("Download your data to back it up or share it.")
             
-            ical_data = generate_ical_export(processed_duties, calendar_blackouts)
-            st.download_button(
-                label="Export Full Calendar (iCal)",
-                data=ical_data,
-                file_name="SkedCheck_Schedule.ics",
-                mime="text/calendar"
-            )
+            # The full-profile calendar is only built once asked for, then kept until the
+            # profile's data or the base time zone changes.
+            ical_key = (active_profile_id, st.session_state.data_version, base_tz_str)
+            def prepare_ical_export_callback(key):
+                st.session_state.ical_export_key = key
+            if st.session_state.get('ical_export_key') != ical_key:
+                st.button("Prepare Calendar Export (iCal)", on_click=prepare_ical_export_callback, args=(ical_key,))
+            else:
+                with perf.stage('export_ical'):
+                    ical_data = load_profile_ical_export(*ical_key)
+                st.download_button(
+                    label="Export Full Calendar (iCal)",
+                    data=ical_data,
+                    file_name="SkedCheck_Schedule.ics",
+                    mime="text/calendar",
+                    on_click="ignore"
+                )
             
-            json_data = generate_json_backup()
+            if start_ical_feed() is not None:
+                st.caption("Or subscribe to this feed in your calendar app to keep it in sync with this profile:")
+                st.code(ical_feed_url(active_profile_id, base_tz_str), language=None)
             
+            # Written only when the button is clicked, on Streamlit's download thread.
+            compress_backup = st.checkbox("Compress backup (gzip)", key="compress_backup")
             st.download_button(
                 label="Backup Profile (JSON)",
-                data=json_data,
-                file_name=f"{profile_id_map[st.session_state.active_profile_id]}_backup.json",
-                mime="application/json"
+                data=partial(generate_json_backup, active_profile_id, compress_backup, get_connection_pool()),
+                file_name=f"{profile_id_map[st.session_state.active_profile_id]}_backup.jsonl" + (".gz" if compress_backup else ""),
+                mime="application/gzip" if compress_backup else "application/x-ndjson",
+                on_click="ignore"
             )
             
             st.markdown("---")
             st.subheader("Import")
             st.caption("Upload a backup file or a calendar file from your airline.")
             
-            uploaded_json = st.file_uploader("Restore Profile from JSON Backup", type=['json'])
-            if uploaded_json is not None:
-                file_contents = uploaded_json.getvalue().decode("utf-8")
-                if parse_json_backup(file_contents, active_profile_id):
+            uploaded_json = st.file_uploader("Restore Profile from JSON Backup", type=['json', 'jsonl', 'gz'])
+            # The uploader keeps its file across reruns; restore each upload once.
+            if uploaded_json is not None and st.session_state.get('restored_backup_id') != uploaded_json.file_id:
+                if parse_json_backup(uploaded_json.getvalue(), active_profile_id):
+                    st.session_state.restored_backup_id = uploaded_json.file_id
                     load_data_into_state(active_profile_id)
                     st.rerun()
                 else:
@@ -2190,7 +1792,22 @@ with tab2:
         bid_start_date = st.date_input("Start Date", value=datetime.today(), key="bid_start")
         bid_data = st.text_area("Bid Package Rotation Data", height=200, placeholder="Paste your bid package rotation here...")
         if st.button("Parse and Submit Bid Rotation"):
-            if bid_data:
+            packet = parse_bid_packet(bid_data, bid_start_date) if bid_data else {}
+            if len(packet) > 1:
+                # Several pairings pasted at once: every "#<pairing>" becomes its own rotation.
+                rotations = bid_packet_rotations(packet)
+                if rotations:
+                    try:
+                        restore_backup_records(active_profile_id, rotations, [])
+                    except Exception as e:
+                        st.error(f"Error saving bid rotations, nothing was saved: {e}")
+                    else:
+                        st.success(f"Saved {len(rotations)} bid rotations to profile '{profile_id_map[active_profile_id]}'")
+                        load_data_into_state(active_profile_id)
+                        st.rerun()
+                else:
+                    st.error("No flights parsed. Check rotation format.")
+            elif bid_data:
                 parsed_flights = parse_bid_dump(bid_data, bid_start_date)
                 if parsed_flights:
                     df_parsed = pd.DataFrame(parsed_flights)
@@ -2208,6 +1825,67 @@ with tab2:
             else:
                 st.warning("Paste bid data first.")
                 
+        st.markdown("---")
+        st.subheader("Bulk Import (Whole Bid Packet)")
+        st.caption("Loads every pairing of a monthly bid packet into a new what-if profile. It runs in the background, so you can keep using the app meanwhile.")
+        bid_packet_file = st.file_uploader("Bid Packet (.txt)", type=['txt'], key="bid_packet_file")
+        bid_packet_profile = st.text_input("What-if Profile Name", value=f"Bid {bid_start_date.strftime('%b %Y')}", key="bid_packet_profile")
+        bid_job = st.session_state.get('bid_ingest_job')
+        if bid_job is not None and bid_job['state'] == 'running':
+            bid_ingest_progress()
+        elif bid_job is not None:
+            del st.session_state.bid_ingest_job
+            if bid_job['state'] == 'done':
+                st.success(f"Imported {bid_job['saved']} pairings into profile '{bid_job['profile_name']}'.")
+            else:
+                st.error(f"Bid packet import failed: {bid_job['error']}")
+        if st.button("Import Bid Packet", disabled=bid_packet_file is None or (bid_job is not None and bid_job['state'] == 'running')):
+            job = start_bid_ingest(bid_packet_file.getvalue().decode('utf-8', errors='replace'), bid_start_date, bid_packet_profile.strip())
+            if job is not None:
+                st.session_state.bid_ingest_job = job
+                st.rerun()
+                
+    with st.expander("🔎 Screen Bid Pairings"):
+        st.caption("Checks every pairing of another profile (e.g. an imported bid packet) against this profile's whole schedule and ranks the ones you could legally add.")
+        screen_profiles = {name: pid for pid, name in profile_id_map.items() if pid != active_profile_id}
+        if not screen_profiles:
+            st.info("Import a bid packet into a what-if profile first.")
+        else:
+            screen_name = st.selectbox("Pairings From Profile", list(screen_profiles), key="screen_profile")
+            screen_profile_id = screen_profiles[screen_name]
+            if st.button("Screen Pairings"):
+                st.session_state.screen_profile_id = screen_profile_id
+            if st.session_state.get('screen_profile_id') == screen_profile_id:
+                with st.spinner("Screening pairings..."):
+                    screen_rows = load_pairing_screen(
+                        active_profile_id, st.session_state.data_version, screen_profile_id, load_data_version(screen_profile_id), base_tz_str
+                    )
+                if not screen_rows:
+                    st.info(f"No pairings with flights in profile '{screen_name}'.")
+                else:
+                    st.write(f"**{sum(row['legal'] for row in screen_rows)}** of {len(screen_rows)} pairings can be added legally.")
+                    col_legal, col_binding = st.columns(2)
+                    with col_legal:
+                        screen_legal_only = st.checkbox("Legal pairings only", value=True, key="screen_legal_only")
+                    with col_binding:
+                        screen_binding = st.multiselect("Binding Constraint", list(SCREEN_CONSTRAINTS.values()), key="screen_binding")
+                    df_screen = pd.DataFrame([{
+                        'Pairing': row['pairing'],
+                        'Start': row['start_date'],
+                        'Duties': row['duties'],
+                        'Legs': row['legs'],
+                        'Block': hours_to_hhmm(row['block']),
+                        'Legal': row['legal'],
+                        'Binding Constraint': SCREEN_CONSTRAINTS[row['binding']],
+                        'Margin (h)': round(row['margin'], 1),
+                        'Violations': ", ".join(SCREEN_CONSTRAINTS[rule] for rule in row['violations'])
+                    } for row in screen_rows])
+                    if screen_legal_only:
+                        df_screen = df_screen[df_screen['Legal']]
+                    if screen_binding:
+                        df_screen = df_screen[df_screen['Binding Constraint'].isin(screen_binding)]
+                    st.dataframe(df_screen, use_container_width=True, hide_index=True)
+                    
     with st.expander("🗓️ Add Other Events"):
         st.subheader("Add Vacation (Full Days)")
         vac_start_date = st.date_input("Vacation Start", value=datetime.today(), key="vac_start")
@@ -2334,7 +2012,7 @@ with tab3:
             * **Calendar Grid:** This shows an 12-week view of your schedule. The times on each date show the lowest available FDP and Block hours for that day. This is based on past flying and scheduled flying.
                 * **Blue:** The day is legal and has sufficient rest.
                 * **Yellow:** You are approaching a block or FDP limit.
-                * **Red:** The day has a rest conflict, FDP violation, or block limit violation.
+                * **Red:** The day has a rest conflict, FDP violation, or block limit violation, or a duty reporting that day exceeds its FAR 117 Table A/B FDP or flight time limit (hover the day for details).
             * **Modify Input:** Select a date on the "Manage Date" picker to modify the event. You can also get a nicely formatted version of the rotation for sending.
             
             ### 2. ✍️ How to Add Your Schedule
@@ -2351,7 +2029,9 @@ with tab3:
             * **From Bid Package:**
                 1.  Open the **"Add Bid Package Rotation"** expander.
                 2.  **Select the correct "Start Date"** for the rotation.
-                3.  Paste your bid package text and submit.
+                3.  Paste your bid package text and submit. To add several pairings at once, paste them together; each `#<pairing>` header (with an optional start date like `05MAR`) becomes its own rotation.
+                4.  For a whole monthly bid packet, use **"Bulk Import (Whole Bid Packet)"** in the same expander: upload the packet as a .txt file and name the what-if profile it goes into. The import runs in the background with a progress bar.
+                5.  Then open **"Screen Bid Pairings"**, pick that profile and click **"Screen Pairings"** to see which pairings fit legally on top of your current schedule. The table is ranked by how much room each pairing leaves; the binding constraint is the FAR 117 rule closest to (or past) its limit.
 
             * **Add Vacation, Training, or Reserve:**
                 1.  Open the **"Add Other Events"** expander.
@@ -2372,7 +2052,8 @@ with tab3:
             * **Backup and Export:**
                 1.  In the `Input & Manage` tab, open **"Import / Export Profile"**.
                 2.  **"Backup Profile (JSON)"** saves a file you can restore later.
-                3.  **"Export Full Calendar (iCal)"** creates a file for Google Calendar, Outlook, etc.
+                3.  **"Prepare Calendar Export (iCal)"**, then **"Export Full Calendar (iCal)"**, creates a file for Google Calendar, Outlook, etc. Events keep the same IDs between exports, so re-importing updates them instead of adding duplicates.
+                4.  The calendar feed URL shown under the export can be added as a subscription in your calendar app, which then picks up changes on its own. It is served from the machine running SkedCheck (port 8599, or `SKEDCHECK_FEED_PORT`; set it to 0 to turn the feed off). The link is private to the profile: anyone who has it can read that schedule, so share it like a password. To subscribe from another device, set `SKEDCHECK_FEED_HOST` to an address it can reach (e.g. `0.0.0.0`) and `SKEDCHECK_FEED_PUBLIC_URL` to the address it should use (e.g. `http://192.168.1.20:8599`).
         """)
     
     st.subheader("⚠️ Important Disclaimers")
@@ -2476,5 +2157,32 @@ with tab3:
         """
     )
 
+# Stage timings for the last few reruns. Reruns cut short by st.rerun() are not recorded.
+PERF_HISTORY_RUNS = 20
+perf_run = perf.finish_run()
+st.session_state.perf_history = (st.session_state.get('perf_history', []) + [perf_run.as_dict()])[-PERF_HISTORY_RUNS:]
+
+with st.expander("⏱️ Performance"):
+    perf_history = st.session_state.perf_history[::-1]
+    st.caption(f"Milliseconds per stage for the last {len(perf_history)} reruns, newest first. Nested stages are included in their parent (e.g. build_duties in schedule); blank means the stage didn't run, usually because the result was cached.")
+    perf_rows = []
+    for run in perf_history:
+        row = {'time': datetime.fromtimestamp(run['started_at']).strftime('%H:%M:%S'), 'total': run['total_s'] * 1000}
+        row.update({name: stats['seconds'] * 1000 for name, stats in run['stages'].items()})
+        row.update(run['counters'])
+        perf_rows.append(row)
+    st.dataframe(pd.DataFrame(perf_rows).round(1), hide_index=True, use_container_width=True)
+    
+    st.checkbox("Capture cProfile on every rerun", key="perf_profile", help="Same as adding ?profile to the URL.")
+    if perf_history[0]['profile']:
+        st.code(perf_history[0]['profile'], language=None)
+        
+    st.download_button(
+        label="Download Timings (JSON)",
+        data=json.dumps(perf_history, indent=2),
+        file_name="skedcheck_performance.json",
+        mime="application/json"
+    )
+
 st.markdown("---")
 st.caption("© 2025 Tim Hibbetts. All rights reserved. | Built with Streamlit | Data stored in SQLite DB | TZ via pytz")
\ No newline at end of file
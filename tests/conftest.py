@@ -0,0 +1,7 @@
+import os
+import sys
+
+# Tests import the skedcheck package and the synthetic schedule generator straight from the tree.
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'benchmarks'))
@@ -0,0 +1,114 @@
+import json
+import random
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from skedcheck import DaySummaryCache, RollingWindowIndex, build_duties
+from synthetic import generate_schedule
+
+# Random schedule edits as the app makes them (move a rotation, cancel it, change leg or event
+# times), each followed by an incremental cache update compared against a full rebuild.
+def move_rotation(rotations, blackouts, rng):
+    rot = rng.choice(rotations)
+    delta = timedelta(days=rng.randint(-10, 10))
+    flights = json.loads(rot['data'])
+    for f in flights:
+        for key in ('date', 'arr_date', 'report_date'):
+            f[key] = (datetime.strptime(f[key], '%Y-%m-%d').date() + delta).strftime('%Y-%m-%d')
+    rot['data'] = json.dumps(flights)
+    rot['start_date'] = (datetime.strptime(rot['start_date'], '%Y-%m-%d').date() + delta).strftime('%Y-%m-%d')
+
+def cancel_rotation(rotations, blackouts, rng):
+    # Cancelled rotations are filtered out when the schedule is loaded.
+    rotations.remove(rng.choice(rotations))
+
+def update_leg_times(rotations, blackouts, rng):
+    rot = rng.choice(rotations)
+    flights = json.loads(rot['data'])
+    f = rng.choice(flights)
+    shift = timedelta(minutes=rng.choice([-90, -45, -15, 15, 45, 90]))
+    for date_key, time_key in (('date', 'dep_time'), ('arr_date', 'arr_time')):
+        moved = datetime.strptime(f[date_key] + ' ' + f[time_key], '%Y-%m-%d %H:%M') + shift
+        f[date_key], f[time_key] = moved.strftime('%Y-%m-%d'), moved.strftime('%H:%M')
+    rot['data'] = json.dumps(flights)
+
+def update_blackout_times(rotations, blackouts, rng):
+    b = rng.choice(blackouts)
+    start = datetime.fromisoformat(b['start_datetime_utc']) + timedelta(hours=rng.randint(-6, 6))
+    end = max(start + timedelta(hours=1), datetime.fromisoformat(b['end_datetime_utc']) + timedelta(hours=rng.randint(-6, 6)))
+    b['start_datetime_utc'], b['end_datetime_utc'] = start.isoformat(), end.isoformat()
+
+EDITS = [move_rotation, cancel_rotation, update_leg_times, update_blackout_times]
+
+def assert_matches_full_rebuild(cached, duties, days, base_tz):
+    # Block and FDP are exact in whole seconds, so cached days must equal a rebuild exactly,
+    # through the grid and the per-day path alike.
+    fresh = RollingWindowIndex(duties)
+    for day_data, summary, expected in zip(days, cached, fresh.grid_summaries(days, base_tz)):
+        assert summary == expected, day_data
+        assert summary == fresh.day_summary(day_data, base_tz), day_data
+
+@pytest.mark.parametrize('seed', range(4))
+def test_incremental_matches_full_rebuild(seed):
+    rng = random.Random(seed)
+    data = generate_schedule(250, seed=seed)
+    rotations = [dict(rot) for rot in data['rotations']]
+    blackouts = [dict(b) for b in data['blackouts']]
+    base_tz = ZoneInfo(data['base_tz'])
+    days = [data['start'] - timedelta(days=30) + timedelta(days=i) for i in range((data['end'] - data['start']).days + 60)]
+    data_window = (days[0], days[-1])
+
+    def rebuild():
+        schedule = build_duties(rotations, blackouts, data['airports_tz'], data['base_tz'])
+        assert not schedule['errors']
+        return RollingWindowIndex(schedule['processed_duties'])
+
+    cache = DaySummaryCache(1, data['base_tz'])
+    cache.update(rebuild(), data_window)
+    cache.grid_summaries(days, base_tz)
+    for _ in range(25):
+        rng.choice(EDITS)(rotations, blackouts, rng)
+        index = rebuild()
+        cache.update(index, data_window)
+        assert_matches_full_rebuild(cache.grid_summaries(days, base_tz), index.duties, days, base_tz)
+
+def test_exact_limit_days_match_full_rebuild():
+    # Seed 5 has exactly 60h of FDP in the windows around 2024-03-02. Those days are kept across
+    # an edit two months later and must still read as legal with nothing left.
+    data = generate_schedule(120, seed=5)
+    rotations = list(data['rotations'])
+    base_tz = ZoneInfo(data['base_tz'])
+    days = [data['start'] + timedelta(days=i) for i in range((data['end'] - data['start']).days + 1)]
+
+    def rebuild():
+        return RollingWindowIndex(build_duties(rotations, data['blackouts'], data['airports_tz'], data['base_tz'])['processed_duties'])
+
+    cache = DaySummaryCache(1, data['base_tz'])
+    cache.update(rebuild(), (days[0], days[-1]))
+    cache.grid_summaries(days, base_tz)
+    rotations.remove(max(rotations, key=lambda rot: rot['start_date']))
+    index = rebuild()
+    cache.update(index, (days[0], days[-1]))
+    assert date(2024, 3, 2) in cache.summaries
+
+    cached = cache.grid_summaries(days, base_tz)
+    assert_matches_full_rebuild(cached, index.duties, days, base_tz)
+    at_limit = [cached[days.index(date(2024, 3, day))] for day in (1, 2, 3)]
+    assert [summary['min_fdp'] for summary in at_limit] == [0.0, 0.0, 0.0]
+    assert at_limit[1]['fdp_exceeded'] is False
+    assert cache.verify(days, base_tz) == []
+
+def test_days_outside_data_window_are_dropped():
+    data = generate_schedule(60)
+    base_tz = ZoneInfo(data['base_tz'])
+    index = RollingWindowIndex(build_duties(data['rotations'], data['blackouts'], data['airports_tz'], data['base_tz'])['processed_duties'])
+    days = [data['start'] + timedelta(days=i) for i in range(60)]
+    cache = DaySummaryCache(1, data['base_tz'])
+    cache.update(index, (days[0], days[-1]))
+    cache.grid_summaries(days, base_tz)
+    assert len(cache.summaries) == 60
+
+    cache.update(index, (days[20], days[39]))
+    assert sorted(cache.summaries) == days[20:40]
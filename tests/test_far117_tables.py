@@ -0,0 +1,57 @@
+import pytest
+
+from skedcheck import AUGMENTED_FLIGHT_TIME_LIMIT, FDP_TABLE_B, FDP_TABLE_C_MAX, FLIGHT_TIME_TABLE_A
+
+# The tables as printed in 14 CFR part 117, one row per report-time band (acclimated time).
+TABLE_A_ROWS = [
+    ((0, 4), 8.0),    # 0000-0459
+    ((5, 19), 9.0),   # 0500-1959
+    ((20, 23), 8.0),  # 2000-2359
+]
+
+# Table B: max FDP (hours) for 1, 2, 3, 4, 5, 6, 7+ flight segments.
+TABLE_B_ROWS = [
+    ((0, 3), (9, 9, 9, 9, 9, 9, 9)),                   # 0000-0359
+    ((4, 4), (10, 10, 10, 10, 9, 9, 9)),               # 0400-0459
+    ((5, 5), (12, 12, 12, 12, 11.5, 11, 10.5)),        # 0500-0559
+    ((6, 6), (13, 13, 12, 12, 11.5, 11, 10.5)),        # 0600-0659
+    ((7, 11), (14, 14, 13, 13, 12.5, 12, 11.5)),       # 0700-1159
+    ((12, 12), (13, 13, 13, 13, 12.5, 12, 11.5)),      # 1200-1259
+    ((13, 16), (12, 12, 12, 12, 11.5, 11, 10.5)),      # 1300-1659
+    ((17, 21), (12, 12, 11, 11, 10, 9, 9)),            # 1700-2159
+    ((22, 22), (11, 11, 10, 10, 9, 9, 9)),             # 2200-2259
+    ((23, 23), (10, 10, 10, 9, 9, 9, 9)),              # 2300-2359
+]
+
+# Table C, 4 pilots with class 1 rest facilities.
+TABLE_C_4_PILOTS_CLASS_1_ROWS = [
+    ((0, 5), 17.0),    # 0000-0559
+    ((6, 6), 18.5),    # 0600-0659
+    ((7, 12), 19.0),   # 0700-1259
+    ((13, 16), 18.5),  # 1300-1659
+    ((17, 23), 17.0),  # 1700-2359
+]
+
+def expand(rows):
+    hours = {}
+    for (first, last), value in rows:
+        for hour in range(first, last + 1):
+            hours[hour] = value
+    assert sorted(hours) == list(range(24))
+    return [hours[hour] for hour in range(24)]
+
+@pytest.mark.parametrize('hour', range(24))
+def test_table_a(hour):
+    assert FLIGHT_TIME_TABLE_A[hour] == expand(TABLE_A_ROWS)[hour]
+
+@pytest.mark.parametrize('hour', range(24))
+def test_table_b(hour):
+    assert tuple(FDP_TABLE_B[hour]) == expand(TABLE_B_ROWS)[hour]
+
+@pytest.mark.parametrize('hour', range(24))
+def test_table_c(hour):
+    assert FDP_TABLE_C_MAX[hour] == expand(TABLE_C_4_PILOTS_CLASS_1_ROWS)[hour]
+
+def test_table_lengths():
+    assert len(FLIGHT_TIME_TABLE_A) == len(FDP_TABLE_B) == len(FDP_TABLE_C_MAX) == 24
+    assert AUGMENTED_FLIGHT_TIME_LIMIT == 17.0
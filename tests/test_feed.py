@@ -0,0 +1,30 @@
+from skedcheck import ICalFeed
+
+TOKENS = {1: 'Zm9vYmFyLWJheg_1', 2: 'cXV4LXF1dXgtMg_2'}
+
+def make_feed():
+    return ICalFeed(
+        lambda profile_id: 5 if profile_id in TOKENS or profile_id == 3 else None,
+        lambda profile_id, tz_name: f"BEGIN:VCALENDAR\nX-PROFILE:{profile_id}\nX-TZ:{tz_name}\nEND:VCALENDAR\n",
+        'America/Los_Angeles',
+        TOKENS.get
+    )
+
+def test_feed_needs_the_profile_token():
+    feed = make_feed()
+    status, headers, body = feed.respond(f"/ical/1/{TOKENS[1]}.ics?tz=Asia/Tokyo", {})
+    assert status == 200
+    assert b"X-PROFILE:1" in body and b"X-TZ:Asia/Tokyo" in body
+    assert feed.respond(f"/ical/1/{TOKENS[1]}.ics?tz=Asia/Tokyo", {'If-None-Match': headers['ETag']})[0] == 304
+
+    # Another profile's token, a guessed one, none at all, or a profile without a token.
+    assert feed.respond(f"/ical/1/{TOKENS[2]}.ics", {})[0] == 404
+    assert feed.respond("/ical/2/guess.ics", {})[0] == 404
+    assert feed.respond("/ical/1.ics", {})[0] == 404
+    assert feed.respond("/ical/3/anything.ics", {})[0] == 404
+    assert feed.respond("/ical/9/anything.ics", {})[0] == 404
+
+def test_wrong_token_looks_like_a_missing_profile():
+    feed = make_feed()
+    assert feed.respond("/ical/2/guess.ics", {}) == feed.respond("/ical/9/guess.ics", {})
+    assert feed.respond("/ical/2/guess.ics?tz=Nope/Zone", {})[0] == 404
@@ -0,0 +1,29 @@
+import json
+import os
+from datetime import date
+
+import pytest
+
+from skedcheck import parse_trip_dump
+
+# Trip dumps (clean and mangled: junk lines, stray carriage returns, HH:MM times, missing or
+# reordered report lines) with the flights the parser returned before the single-pass rewrite.
+# Any change to parse_trip_dump output shows up here.
+GOLDEN_DIR = os.path.join(os.path.dirname(__file__), 'golden', 'trip_dumps')
+CASES = sorted(name[:-4] for name in os.listdir(GOLDEN_DIR) if name.endswith('.txt'))
+
+def load_case(name):
+    with open(os.path.join(GOLDEN_DIR, name + '.txt'), newline='') as f:
+        text = f.read()
+    with open(os.path.join(GOLDEN_DIR, name + '.json')) as f:
+        expected = json.load(f)
+    return text, date.fromisoformat(expected['effective']), expected['flights']
+
+def test_corpus_present():
+    assert len(CASES) >= 100
+
+@pytest.mark.parametrize('name', CASES)
+def test_parse_trip_dump_matches_golden(name):
+    text, effective, flights = load_case(name)
+    assert parse_trip_dump(text, effective) == flights
+    assert parse_trip_dump(iter(text.split('\n')), effective) == flights
@@ -0,0 +1,189 @@
+import json
+import random
+from datetime import datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from skedcheck import (
+    BLOCK_LIMIT_HOURS, BLOCK_WINDOW_HOURS, FDP_LIMIT_HOURS, FDP_WINDOW_HOURS, MIN_REST_HOURS, REST_WINDOW_HOURS,
+    SCREEN_CONSTRAINTS, FAR117Calculator, assemble_schedule, build_duties, screen_pairings
+)
+from synthetic import AIRPORTS_TZ, BASE_TZ, generate_schedule, make_leg
+
+# Screening margins checked against the naive approach: merge the pairing into the profile,
+# rebuild the schedule and rerun the rolling-window index and the FAR117Calculator over it.
+SEEDS = 8
+
+def overlap_hours(start, end, intervals):
+    return max([0.0] + [(min(end, hi) - max(start, lo)) / 3600 for lo, hi in intervals])
+
+def shift_rotation(rot, shift):
+    flights = json.loads(rot['data'])
+    for f in flights:
+        for key in ('date', 'arr_date', 'report_date'):
+            f[key] = (datetime.strptime(f[key], '%Y-%m-%d').date() + shift).strftime('%Y-%m-%d')
+    start = (datetime.strptime(rot['start_date'], '%Y-%m-%d').date() + shift).strftime('%Y-%m-%d')
+    return dict(rot, start_date=start, data=json.dumps(flights))
+
+def touches(t, intervals, window_hours):
+    return bool(intervals) and min(start for start, _, _ in intervals) < t < max(end for _, end, _ in intervals) + window_hours * 3600
+
+def min_slack(timeline, window_hours, limit, check_points):
+    return min([limit] + [limit - timeline.window(t - window_hours * 3600, t) for t in check_points])
+
+def full_recompute(base, pairing_rotation, base_tz):
+    merged = assemble_schedule(base['rotations'] + [pairing_rotation], base['blackouts'], base['airports_tz'], base_tz)
+    duties = merged['processed_duties']
+    index = merged['window_index']
+    own = [i for i, d in enumerate(duties) if d.get('rotation_db_id') == pairing_rotation['id']]
+    others = [d for i, d in enumerate(duties) if i not in own]
+    span_start = min(index.report_ts[i] for i in own)
+    span_end = max(index.release_ts[i] for i in own)
+    margins = {}
+
+    def bind(rule, margin):
+        margins[rule] = min(margin, margins.get(rule, margin))
+
+    conflict = overlap_hours(span_start, span_end, [
+        (d['report_utc'].timestamp(), d['release_utc'].timestamp()) for d in others if d['type'] in ('flight', 'training')
+    ])
+    if conflict > 0:
+        bind('overlap', -conflict)
+    vacation = overlap_hours(span_start, span_end, [
+        (e['start_utc'].timestamp(), e['end_utc'].timestamp()) for e in merged['calendar_blackouts'] if e['type'] == 'vacation'
+    ])
+    if vacation > 0:
+        bind('vacation', -vacation)
+
+    # The calculator checks 10h rest in front of each flight duty, from the duty before it.
+    for i in own + [own[-1] + 1]:
+        if 0 < i < len(duties) and duties[i]['type'] == 'flight' and (i in own or i - 1 in own):
+            bind('min_rest_10', (index.report_ts[i] - index.release_ts[i - 1]) / 3600 - 10)
+
+    own_points = {index.report_ts[i] for i in own} | {index.release_ts[i] for i in own}
+    legs = [leg for i in own for leg in index.duty_legs.get(i, ())]
+    fdps = [index.duty_fdp[i] for i in own if i in index.duty_fdp]
+    intervals = {'block_672': legs, 'fdp_168': fdps}
+    overall = {}
+    for rule, timeline, window_hours, limit in (
+        ('block_672', index.block, BLOCK_WINDOW_HOURS, BLOCK_LIMIT_HOURS),
+        ('fdp_168', index.fdp, FDP_WINDOW_HOURS, FDP_LIMIT_HOURS)
+    ):
+        # Own reports and releases plus every flight duty report whose window holds part of the pairing.
+        touched = own_points | {t for t in index.flight_report_ts if touches(t, intervals[rule], window_hours)}
+        margins[rule] = min_slack(timeline, window_hours, limit, touched)
+        overall[rule] = min_slack(timeline, window_hours, limit, own_points | set(index.flight_report_ts))
+
+    for t in [index.report_ts[i] for i in own] + [t for t in index.flight_report_ts if span_start <= t < span_end + REST_WINDOW_HOURS * 3600]:
+        bind('30_in_168', index.max_rest_before(t) - MIN_REST_HOURS)
+
+    own_reports = {duties[i]['report_utc'] for i in own}
+    calc = merged['calculator']
+    for limits in calc.duty_limits:
+        if limits['report_utc'] in own_reports:
+            bind('fdp_table_c' if limits['augmented'] else 'fdp_table_b', limits['fdp_limit'] - limits['fdp_hours'])
+            bind('flight_time_augmented' if limits['augmented'] else 'flight_time_table_a', limits['flight_time_limit'] - limits['flight_hours'])
+    # The calculator drops a duty that breaks a rest rule (it also counts reserve toward
+    # 30-in-168), so acclimation from there on follows a history the screener does not.
+    accepted = not any(v['report_utc'] in own_reports for v in calc.violations if v['rule'] in ('overlap', 'min_rest_10', '30_in_168'))
+    # Duties released before their report (bad leg times) have no rest order to compare.
+    reach = REST_WINDOW_HOURS * 3600
+    clean = not any(
+        index.release_ts[i] < index.report_ts[i] and span_start - reach < index.report_ts[i] < span_end + reach
+        for i in range(len(duties))
+    )
+    return margins, overall, intervals, accepted, clean
+
+def compare_pairings(base, rotations, compared):
+    base_tz = base['base_tz']
+    schedule = assemble_schedule(base['rotations'], base['blackouts'], base['airports_tz'], base_tz)
+    assert not schedule['errors']
+    base_index = schedule['window_index']
+    candidate_duties = build_duties(rotations, [], base['airports_tz'], base_tz)['processed_duties']
+    rows = screen_pairings(schedule, candidate_duties, base['airports_tz'], base_tz)
+    assert len(rows) == len(rotations)
+    assert {rule for row in rows for rule in row['margins']} <= set(SCREEN_CONSTRAINTS)
+
+    by_id = {rot['id']: rot for rot in rotations}
+    for row in rows:
+        expected, overall, intervals, accepted, clean = full_recompute(base, by_id[row['rotation_db_id']], base_tz)
+        margins = row['margins']
+        rules = set(SCREEN_CONSTRAINTS)
+        if 'overlap' in margins or not clean:
+            # Interleaved base duties change the rest order and acclimation; only the
+            # conflicts themselves are comparable.
+            rules = {'overlap', 'vacation'}
+        elif not accepted:
+            rules -= {'fdp_table_b', 'fdp_table_c', 'flight_time_table_a', 'flight_time_augmented'}
+        for rule in rules:
+            assert (rule in margins) == (rule in expected), (row['pairing'], rule)
+            if rule in margins:
+                assert margins[rule] == pytest.approx(expected[rule], abs=1e-6), (row['pairing'], rule)
+                compared[rule] = compared.get(rule, 0) + 1
+        # The schedule-wide minimum of a full recompute also counts windows made only of base
+        # duties, which the margins leave out.
+        for rule, timeline, window_hours, limit in (
+            ('block_672', base_index.block, BLOCK_WINDOW_HOURS, BLOCK_LIMIT_HOURS),
+            ('fdp_168', base_index.fdp, FDP_WINDOW_HOURS, FDP_LIMIT_HOURS)
+        ):
+            base_only = [t for t in base_index.flight_report_ts if not touches(t, intervals[rule], window_hours)]
+            assert overall[rule] == pytest.approx(min(margins[rule], min_slack(timeline, window_hours, limit, base_only)), abs=1e-6)
+    return rows
+
+def test_margins_match_full_recompute():
+    compared = {}
+    for seed in range(SEEDS):
+        # Candidate pairings from another schedule over the same dates, moved by up to a few
+        # days so they land next to, on top of and between the base duties.
+        rng = random.Random(seed)
+        rotations = [
+            shift_rotation(dict(rot, id=10000 + n), timedelta(days=rng.randint(-3, 3)))
+            for n, rot in enumerate(generate_schedule(120, seed=100 + seed)['rotations'])
+        ]
+        compare_pairings(generate_schedule(120, seed=seed), rotations, compared)
+    # Every constraint was actually compared.
+    assert set(compared) == set(SCREEN_CONSTRAINTS)
+
+def rotation(rotation_db_id, legs):
+    flights = [make_leg(1000 + n, *leg) for n, leg in enumerate(legs)]
+    return {'id': rotation_db_id, 'rotation_id': str(rotation_db_id), 'start_date': flights[0]['date'], 'data': json.dumps(flights), 'is_cancelled': 0}
+
+def reserve(blackout_id, start, end):
+    base_tz = ZoneInfo(BASE_TZ)
+    return {
+        'id': blackout_id, 'type': 'reserve', 'block_id': f"res-{blackout_id}",
+        'start_datetime_utc': start.replace(tzinfo=base_tz).astimezone(ZoneInfo('UTC')).isoformat(),
+        'end_datetime_utc': end.replace(tzinfo=base_tz).astimezone(ZoneInfo('UTC')).isoformat()
+    }
+
+def test_reserve_and_acclimation_match_full_recompute():
+    base = {
+        'base_tz': BASE_TZ,
+        'airports_tz': dict(AIRPORTS_TZ),
+        # A one-way trip that leaves the crew in Tokyo, not yet acclimated there.
+        'rotations': [rotation(1, [('SEA', 'NRT', datetime(2024, 3, 4, 11, 0), 10.5, datetime(2024, 3, 4, 9, 30))])],
+        'blackouts': [
+            reserve(1, datetime(2024, 3, 12, 2, 0), datetime(2024, 3, 12, 8, 0)),
+            reserve(2, datetime(2024, 3, 14, 14, 0), datetime(2024, 3, 14, 22, 0))
+        ]
+    }
+    rotations = [
+        # Home from Tokyo under 36h after arriving, still on Seattle time.
+        rotation(10, [('NRT', 'SEA', datetime(2024, 3, 6, 10, 0), 9.5, datetime(2024, 3, 6, 8, 30))]),
+        # Reports the afternoon of a reserve day; that reserve gives way to the pairing.
+        rotation(11, [('SEA', 'DEN', datetime(2024, 3, 12, 13, 0), 2.5, datetime(2024, 3, 12, 12, 0)),
+                      ('DEN', 'SEA', datetime(2024, 3, 12, 17, 0), 2.75)]),
+        # Reports early the morning after an evening reserve, which stays.
+        rotation(12, [('SEA', 'LAX', datetime(2024, 3, 15, 6, 0), 2.5, datetime(2024, 3, 15, 5, 0))])
+    ]
+    rows = {row['rotation_db_id']: row for row in compare_pairings(base, rotations, {})}
+
+    duty = build_duties([rotations[0]], [], base['airports_tz'], BASE_TZ)['processed_duties'][0]
+    alone = FAR117Calculator(base['airports_tz'])
+    limits = alone.check_duty_limits(duty['report_utc'], duty['flights'])
+    assert limits['acclimated']
+    rule = 'fdp_table_c' if limits['augmented'] else 'fdp_table_b'
+    assert rows[10]['margins'][rule] != pytest.approx(limits['fdp_limit'] - limits['fdp_hours'])
+    assert rows[11]['margins']['min_rest_10'] > 0
+    assert rows[12]['margins']['min_rest_10'] == pytest.approx(7 - 10)
@@ -0,0 +1,95 @@
+from datetime import date, datetime, timedelta
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from skedcheck import RollingWindowIndex, build_duties
+from synthetic import generate_schedule
+
+# Schedules that use exactly the 60h FDP or 100h block limit, with a duty or leg cut by the
+# window edge. A window right at the limit is legal and leaves exactly nothing.
+UTC = ZoneInfo('UTC')
+
+def utc(*args):
+    return datetime(*args, tzinfo=UTC)
+
+def flight_duty(report, minutes, block_minutes=None):
+    # One leg, an hour after report, released half an hour after arrival.
+    dep = report + timedelta(hours=1)
+    arr = dep + timedelta(minutes=minutes - 90)
+    block = (minutes - 90 if block_minutes is None else block_minutes) / 60
+    return {
+        'type': 'flight', 'report_utc': report, 'release_utc': arr + timedelta(minutes=30),
+        'dep_utc': dep, 'arr_utc': arr, 'block': block,
+        'flights': [{'dep_utc': dep, 'arr_utc': arr, 'block': block}]
+    }
+
+def summaries(duties, days, path, base_tz=UTC):
+    index = RollingWindowIndex(duties)
+    if path == 'scalar':
+        return [index.day_summary(day_data, base_tz) for day_data in days]
+    return index.grid_summaries(days, base_tz)
+
+def fdp_at_limit(extra_minutes=0):
+    # The 168h window ending 2024-03-10 23:59:59 starts at 2024-03-03 23:59:59 and holds the
+    # last 3h25m of the first duty.
+    return [
+        flight_duty(utc(2024, 3, 3, 20, 44, 59), 400),
+        flight_duty(utc(2024, 3, 5, 4), 625),
+        flight_duty(utc(2024, 3, 6, 4), 520),
+        flight_duty(utc(2024, 3, 7, 4), 665),
+        flight_duty(utc(2024, 3, 8, 4), 525),
+        flight_duty(utc(2024, 3, 9, 4), 590),
+        flight_duty(utc(2024, 3, 10, 4), 470 + extra_minutes)
+    ]
+
+@pytest.mark.parametrize('path', ['scalar', 'grid'])
+def test_fdp_window_at_limit_is_not_exceeded(path):
+    days = [date(2024, 3, 1) + timedelta(days=i) for i in range(14)]
+    summary = summaries(fdp_at_limit(), days, path)[days.index(date(2024, 3, 10))]
+    assert summary['fdp_exceeded'] is False
+    assert summary['min_fdp'] == 0.0
+
+@pytest.mark.parametrize('path', ['scalar', 'grid'])
+def test_fdp_window_over_limit_is_exceeded(path):
+    summary = summaries(fdp_at_limit(extra_minutes=1), [date(2024, 3, 10)], path)[0]
+    assert summary['fdp_exceeded'] is True
+    assert summary['min_fdp'] == 0.0
+
+@pytest.mark.parametrize('path', ['scalar', 'grid'])
+def test_future_fdp_window_at_limit_leaves_nothing(path):
+    # The lookback from the 2024-04-10 06:00 report holds exactly 60h, 3h20m of it from the end
+    # of the first duty; any flying on 2024-04-03 would push it over.
+    duties = [
+        flight_duty(utc(2024, 4, 2, 21, 40), 700),
+        flight_duty(utc(2024, 4, 4, 6), 500),
+        flight_duty(utc(2024, 4, 5, 6), 550),
+        flight_duty(utc(2024, 4, 6, 6), 500),
+        flight_duty(utc(2024, 4, 7, 5), 640),
+        flight_duty(utc(2024, 4, 8, 4), 710),
+        flight_duty(utc(2024, 4, 9, 6), 500),
+        flight_duty(utc(2024, 4, 10, 6), 300)
+    ]
+    summary = summaries(duties, [date(2024, 4, 2), date(2024, 4, 3)], path)[1]
+    assert summary['min_fdp'] == 0.0
+    assert summary['fdp_exceeded'] is False
+
+@pytest.mark.parametrize('path', ['scalar', 'grid'])
+def test_block_window_at_limit_leaves_nothing(path):
+    # The 672h window ending 2024-05-31 23:59:59 starts at 2024-05-03 23:59:59, 2h into the first
+    # leg. The legs in between are blocked 7h05m for 7h15m in the air.
+    duties = [flight_duty(utc(2024, 5, 3, 21, 59, 59), 270)]
+    duties += [flight_duty(utc(2024, 5, 6 + 2 * i, 6), 525, 425) for i in range(12)]
+    duties.append(flight_duty(utc(2024, 5, 31, 4), 870))
+    summary = summaries(duties, [date(2024, 5, 30), date(2024, 5, 31)], path)[1]
+    assert summary['min_block'] == 0.0
+    assert summary['fdp_exceeded'] is False
+
+@pytest.mark.parametrize('path', ['scalar', 'grid'])
+def test_generated_schedule_at_fdp_limit(path):
+    # A generated schedule with exactly 60h of FDP in the 168h windows around 2024-03-02.
+    data = generate_schedule(120, seed=5)
+    duties = build_duties(data['rotations'], data['blackouts'], data['airports_tz'], data['base_tz'])['processed_duties']
+    found = summaries(duties, [date(2024, 3, 1), date(2024, 3, 2), date(2024, 3, 3)], path, ZoneInfo(data['base_tz']))
+    assert [summary['min_fdp'] for summary in found] == [0.0, 0.0, 0.0]
+    assert found[1]['fdp_exceeded'] is False